@@ -0,0 +1,353 @@
+### HELP cmd line args:
+###
+###  -n 10000 -r 5
+###  -n 10000 -r 5 --proto_plus
+###  --imports -r 5 --max_import_ms 100
+###  --e2e -n 10000 -r 3 --latency 0.05 --pages 2 --seeds 100 -w 8
+###
+### SEE `how_to.md`
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import get_keyword_ideas as gki
+
+from google.auth.credentials import AnonymousCredentials # google-auth
+from google.ads.googleads.client import GoogleAdsClient # google-ads
+
+
+BENCH_IDEAS   = 10000 # ideas in synthetic response
+BENCH_REPEATS = 5     # best of N runs
+BENCH_OUT_AS  = ['table', 'dict', 'compact', 'text']
+BENCH_LATENCY = 0.0   # fake server latency per call, seconds
+BENCH_PAGES   = 1     # pages per fake GenerateKeywordIdeas response
+BENCH_SEEDS   = 100   # seed keywords in batch scenarios
+BENCH_WORKERS = 8     # parallel requests in batch scenarios
+BENCH_HEAVY   = ['google.ads.googleads.client', 'google.ads.googleads.errors', 'grpc', 'pandas', 'numpy', 'pyarrow', 'asyncio'] # must not be loaded by `import get_keyword_ideas`
+
+
+def __bench_client__(use_proto_plus: bool = False) -> GoogleAdsClient:
+    return GoogleAdsClient(credentials=AnonymousCredentials(), developer_token='bench', login_customer_id='1234567890', version=gki.API_VERSION, use_proto_plus=use_proto_plus)
+
+
+def make_response(client: GoogleAdsClient, ideas: int = BENCH_IDEAS, months: int = 12, seed: int = 1, prefix: str = 'keyword idea'):
+    '''
+    Synthetic GenerateKeywordIdeaResponse.
+    @ideas - ideas count
+    @months - monthly search volumes per idea
+    @prefix - ideas text prefix
+    '''
+
+    rnd = random.Random(seed)
+    response = client.get_type("GenerateKeywordIdeaResponse")
+    for x in range(ideas):
+        idea = client.get_type("GenerateKeywordIdeaResult")
+        idea.text = f'{prefix} {x}'
+        metrics = idea.keyword_idea_metrics
+        metrics.avg_monthly_searches = rnd.randint(10, 100000)
+        metrics.competition = rnd.randint(2, 4)
+        metrics.competition_index = rnd.randint(0, 100)
+        metrics.low_top_of_page_bid_micros = rnd.randint(10000, 1000000)
+        metrics.high_top_of_page_bid_micros = metrics.low_top_of_page_bid_micros * 3
+        for m in range(months):
+            volume = client.get_type("MonthlySearchVolume")
+            volume.year = 2024 + (m // 12)
+            volume.month = 2 + (m % 12) # MonthOfYear: JANUARY = 2
+            volume.monthly_searches = rnd.randint(0, 100000)
+            metrics.monthly_search_volumes.append(volume)
+        response.results.append(idea)
+    response.total_size = ideas
+    return response
+
+
+def __legacy_convert__(list_keywords, out_as: str):
+    '''
+    Reference per-format loops (as before the columnar converter).
+    '''
+
+    results = list_keywords.results
+    if out_as == 'table':
+        import pandas as pd
+        list_to_out = []
+        for x in range(len(results)):
+            list_months = []
+            list_searches = []
+            list_annotations = []
+            for y in results[x].keyword_idea_metrics.monthly_search_volumes:
+                list_months.append(f'{y.year}-{str(y.month-1).zfill(2)}')
+                list_searches.append(y.monthly_searches)
+            for y in results[x].keyword_annotations.concepts:
+                list_annotations.append(y.concept_group.name)
+            list_to_out.append([
+                     results[x].text,
+                     results[x].keyword_idea_metrics.avg_monthly_searches,
+                     str(results[x].keyword_idea_metrics.competition),
+                     results[x].keyword_idea_metrics.competition_index,
+                     ', '.join(str(i) for i in list_searches),
+                     ', '.join(str(i) for i in list_months),
+                     ', '.join(str(i) for i in list_annotations),
+                     results[x].keyword_idea_metrics.low_top_of_page_bid_micros,
+                     results[x].keyword_idea_metrics.high_top_of_page_bid_micros, ])
+        return pd.DataFrame(list_to_out, columns = gki.TABLE_COLUMNS)
+    if out_as in ['dict','list']:
+        list_to_out = []
+        for x in range(len(results)):
+            list_months = []
+            list_searches = []
+            list_annotations = []
+            for y in results[x].keyword_idea_metrics.monthly_search_volumes:
+                list_months.append(f'{y.year}-{str(y.month-1).zfill(2)}')
+                list_searches.append(y.monthly_searches)
+            for y in results[x].keyword_annotations.concepts:
+                list_annotations.append(y.concept_group.name)
+            list_to_out.append({
+                    "keyword":      results[x].text,
+                    "avg_monthly_searches": results[x].keyword_idea_metrics.avg_monthly_searches,
+                    "comp_level":   str(results[x].keyword_idea_metrics.competition),
+                    "comp_index":   results[x].keyword_idea_metrics.competition_index,
+                    "searches":     list_searches,
+                    "past_months":  list_months,
+                    "annotations":  list_annotations,
+                    "low_top_of_page_bid_micros": results[x].keyword_idea_metrics.low_top_of_page_bid_micros,
+                    "high_top_of_page_bid_micros": results[x].keyword_idea_metrics.high_top_of_page_bid_micros, })
+        return list_to_out
+    if out_as == 'compact':
+        list_to_out = []
+        for x in range(len(results)):
+            list_to_out.append({
+                    "keyword":      results[x].text,
+                    "avg_monthly_searches": results[x].keyword_idea_metrics.avg_monthly_searches,
+                    "comp_level":   str(results[x].keyword_idea_metrics.competition),
+                    "comp_index":   results[x].keyword_idea_metrics.competition_index, })
+        return list_to_out
+    if out_as == 'text':
+        text_to_out = ''
+        for idea in results:
+            text_to_out += f'- "{idea.text}" has "{idea.keyword_idea_metrics.avg_monthly_searches}" avg monthly searches & "{idea.keyword_idea_metrics.competition}" competition.\n'
+        return text_to_out
+
+
+def __best_of__(fn, repeats: int) -> tuple:
+    best, result = None, None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def __same__(a, b) -> bool:
+    if hasattr(a, 'equals'): return a.astype(str).equals(b.astype(str))
+    return a == b
+
+
+def bench_convert(ideas: int = BENCH_IDEAS, repeats: int = BENCH_REPEATS, use_proto_plus: bool = False) -> list:
+    '''
+    Benchmark `out_as` conversion: legacy per-format loops vs columnar converter.
+    Returns list of (out_as, legacy seconds, columnar seconds, same output).
+    '''
+
+    response = make_response(__bench_client__(use_proto_plus), ideas)
+    res = []
+    for out_as in BENCH_OUT_AS:
+        legacy, legacy_out = __best_of__(lambda: __legacy_convert__(response, out_as), repeats)
+        columnar, columnar_out = __best_of__(lambda: gki.__convert_ideas__(response, out_as=out_as), repeats)
+        res.append((out_as, legacy, columnar, __same__(legacy_out, columnar_out)))
+    return res
+
+
+class FakeKeywordPlanner:
+    '''
+    In-process gRPC server with fake KeywordPlanIdeaService.GenerateKeywordIdeas and GeoTargetConstantService.SuggestGeoTargetConstants
+    (synthetic responses, no network and no quota). Connect with `KeywordPlannerSession(client, channel_target=server.target)`.
+    @ideas - ideas per GenerateKeywordIdeas response (all pages), ideas text starts with the first seed keyword
+    @pages - pages per response (`next_page_token`)
+    @latency - seconds each call waits before response
+    @months - monthly search volumes per idea
+    @geos - suggestions per geo name in SuggestGeoTargetConstants response (first one is the country)
+    '''
+
+    def __init__(self, ideas: int = BENCH_IDEAS, pages: int = BENCH_PAGES, latency: float = BENCH_LATENCY, months: int = 12, geos: int = 1, workers: int = 64):
+        self.ideas, self.pages, self.latency, self.months, self.geos, self.workers = ideas, max(1, pages), latency, months, max(1, geos), workers
+        self.client = __bench_client__(False)
+        self.lock = threading.Lock()
+        self.responses = {} # (first seed, page) -> serialized response
+        self.calls = 0
+        self.server = self.target = None
+
+    def __count__(self):
+        with self.lock: self.calls += 1
+
+    def __ideas__(self, data: bytes, context) -> bytes:
+        self.__count__()
+        request = type(self.client.get_type("GenerateKeywordIdeasRequest")).FromString(data)
+        page = int(request.page_token or 0)
+        prefix = (list(request.keyword_seed.keywords) or list(request.keyword_and_url_seed.keywords) or [request.url_seed.url or 'url'])[0]
+        if (res := self.responses.get((prefix, page))) is None:
+            size = self.ideas // self.pages + (1 if page < self.ideas % self.pages else 0)
+            response = make_response(self.client, size, self.months, hash((prefix, page)), f'{prefix} {page}')
+            if page + 1 < self.pages: response.next_page_token = str(page + 1)
+            with self.lock: res = self.responses[(prefix, page)] = response.SerializeToString()
+        if self.latency: time.sleep(self.latency)
+        return res
+
+    def __geos__(self, data: bytes, context) -> bytes:
+        self.__count__()
+        request = type(self.client.get_type("SuggestGeoTargetConstantsRequest")).FromString(data)
+        response = self.client.get_type("SuggestGeoTargetConstantsResponse")
+        for x, name in enumerate(request.location_names.names):
+            for y in range(self.geos):
+                target = response.geo_target_constant_suggestions.add().geo_target_constant
+                target.resource_name = f'geoTargetConstants/{2000 + x * 1000 + y}'
+                target.country_code = name
+                target.target_type = 'Country' if y == 0 else 'City'
+                target.name = name if y == 0 else f'{name} city {y}'
+        if self.latency: time.sleep(self.latency)
+        return response.SerializeToString()
+
+    def start(self) -> str:
+        import grpc # google-ads dependency
+        services = f'google.ads.googleads.{gki.API_VERSION}.services'
+        handlers = [
+            grpc.method_handlers_generic_handler(f'{services}.KeywordPlanIdeaService', {'GenerateKeywordIdeas': grpc.unary_unary_rpc_method_handler(self.__ideas__)}),
+            grpc.method_handlers_generic_handler(f'{services}.GeoTargetConstantService', {'SuggestGeoTargetConstants': grpc.unary_unary_rpc_method_handler(self.__geos__)}), ]
+        self.server = grpc.server(ThreadPoolExecutor(self.workers), handlers=handlers, options=[("grpc.max_send_message_length", 64 * 1024 * 1024)])
+        self.target = f'127.0.0.1:{self.server.add_insecure_port("127.0.0.1:0")}'
+        self.server.start()
+        return self.target
+
+    def stop(self):
+        if self.server: self.server.stop(None)
+        self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def __not_installed__(*modules) -> str | None:
+    '''
+    Skip reason of scenario if any of optional modules is not installed (None - all installed).
+    '''
+
+    import importlib.util
+    return next((f'{m} is not installed' for m in modules if importlib.util.find_spec(m) is None), None)
+
+
+def __e2e_scenarios__(seeds: list, workers: int, folder: str) -> list:
+    '''
+    End-to-end scenarios: (name, callable(session) -> result), or (name, skip reason) if scenario needs not installed module.
+    '''
+
+    common = {'geo_cache': False, 'ideas_cache': False}
+    res = [(f'out_as={out_as}', lambda session, out_as=out_as: gki.get_keyword_ideas('US,CA', 'en', seeds[:1], session=session, out_as=out_as, **common)) 
+           for out_as in BENCH_OUT_AS + ['default']]
+    exports = [('jsonl', {'jsonl_file': f'{folder}/ideas.jsonl'}, None), ('csv', {'out_as': 'table', 'csv_file': f'{folder}/ideas.csv'}, None), 
+               ('excel', {'out_as': 'table', 'excel_file': f'{folder}/ideas.xlsx'}, __not_installed__('openpyxl')), 
+               ('html', {'out_as': 'table', 'html_file': f'{folder}/ideas.html'}, None), # pandas writes html itself (lxml is for reading)
+               ('parquet', {'parquet_file': f'{folder}/ideas.parquet'}, __not_installed__('pyarrow')), ('arrow', {'arrow_file': f'{folder}/ideas.arrow'}, __not_installed__('pyarrow'))]
+    res += [(f'export {name}', skip or (lambda session, kw=kw: gki.get_keyword_ideas('US,CA', 'en', seeds[:1], session=session, **{'out_as': 'default', **common, **kw}))) 
+            for name, kw, skip in exports]
+    res += [(f'batch {len(seeds)} seeds x{workers}', lambda session: gki.get_keyword_ideas_batch(seeds, 'US,CA', 'en', session=session, out_as='compact', max_workers=workers, **common))]
+    res += [(f'matrix 8 markets x{workers}', lambda session: gki.get_keyword_ideas_matrix('US:en;CA:en;GB:en;AU:en;DE:de;AT:de;FR:fr;ES:es', seeds[:gki.MAX_SEED_KEYWORDS], session=session, 
+            out_as='compact', max_workers=workers, **common))]
+
+    async def agather(session, count: int):
+        semaphore = asyncio.Semaphore(workers)
+        res = await asyncio.gather(*[gki.aget_keyword_ideas('US,CA', 'en', [seed], session=session, out_as='compact', semaphore=semaphore, **common) for seed in seeds[:count]])
+        await session.aclose() # async channel is bound to the event loop
+        return res
+    res += [(f'async {min(len(seeds), 50)} calls x{workers}', lambda session: asyncio.run(agather(session, 50)))]
+    return res
+
+
+def bench_e2e(ideas: int = BENCH_IDEAS, repeats: int = BENCH_REPEATS, use_proto_plus: bool = False, latency: float = BENCH_LATENCY, 
+              pages: int = BENCH_PAGES, seeds: int = BENCH_SEEDS, workers: int = BENCH_WORKERS) -> list:
+    '''
+    Benchmark `get_keyword_ideas` end to end (client -> gRPC -> fake server -> conversion -> export) per `out_as`, export and concurrent scenarios.
+    Returns list of (scenario, best seconds, server calls per run, stage seconds per run), best seconds is None for skipped scenario (stages - {'skipped': reason}).
+    '''
+
+    res = []
+    with FakeKeywordPlanner(ideas, pages, latency) as server, tempfile.TemporaryDirectory() as folder:
+        session = gki.KeywordPlannerSession(__bench_client__(use_proto_plus), channel_target=server.target)
+        try:
+            for name, scenario in __e2e_scenarios__([f'seed {x}' for x in range(seeds)], workers, folder):
+                if type(scenario) is str: 
+                    res.append((name, None, 0, {'skipped': scenario}))
+                    continue
+                scenario(session) # warm up (lazy imports, server responses)
+                server.calls = 0
+                gki.get_stage_metrics(reset=True)
+                best, _ = __best_of__(lambda: scenario(session), repeats)
+                stages = {k: v['seconds'] / repeats for k, v in gki.get_stage_metrics(reset=True).items()}
+                res.append((name, best, server.calls // repeats, stages))
+        finally: session.close()
+    return res
+
+
+def bench_import(repeats: int = BENCH_REPEATS) -> tuple:
+    '''
+    Benchmark `import get_keyword_ideas` in fresh interpreters.
+    Returns (best seconds, heavy modules loaded by import).
+    '''
+
+    code = f'import sys, time, json; t = time.perf_counter(); import get_keyword_ideas; t = time.perf_counter() - t; print(json.dumps([t, [m for m in {BENCH_HEAVY!r} if m in sys.modules]]))'
+    best, heavy = None, []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', code], cwd=Path(gki.__file__).parent, capture_output=True, text=True, check=True).stdout
+        elapsed, heavy = json.loads(out.strip().splitlines()[-1])
+        best = elapsed if best is None else min(best, elapsed)
+    return best, heavy
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmarks keyword ideas processing on synthetic responses (no network)")
+    parser.add_argument("-n","--ideas",type=int,required=False,default=BENCH_IDEAS,help="Ideas in synthetic response",)
+    parser.add_argument("-r","--repeats",type=int,required=False,default=BENCH_REPEATS,help="Best of N runs",)
+    parser.add_argument("--proto_plus",action="store_true",help="Use proto-plus messages (use_proto_plus=True)",)
+    parser.add_argument("--e2e",action="store_true",help="Benchmark end to end calls with local fake gRPC server",)
+    parser.add_argument("--latency",type=float,required=False,default=BENCH_LATENCY,help="Fake server latency per call, seconds (--e2e)",)
+    parser.add_argument("--pages",type=int,required=False,default=BENCH_PAGES,help="Pages per fake response (--e2e)",)
+    parser.add_argument("--seeds",type=int,required=False,default=BENCH_SEEDS,help="Seed keywords in batch scenarios (--e2e)",)
+    parser.add_argument("-w","--workers",type=int,required=False,default=BENCH_WORKERS,help="Parallel requests in batch scenarios (--e2e)",)
+    parser.add_argument("--imports",action="store_true",help="Benchmark `import get_keyword_ideas` only",)
+    parser.add_argument("--max_import_ms",type=float,required=False,help="Exit with code 1 if import is slower or loads heavy modules",)
+    args = parser.parse_args()
+
+    if args.e2e:
+        print(f'End to end with fake server: {args.ideas} ideas in {args.pages} page(s), latency {args.latency}s (best of {args.repeats}, proto_plus={args.proto_plus}):\n')
+        print(f' {"scenario":<26} {"best, s":>8} {"calls":>6} {"rpc, s":>8} {"convert, s":>11} {"export, s":>10}')
+        for name, best, calls, stages in bench_e2e(args.ideas, args.repeats, args.proto_plus, args.latency, args.pages, args.seeds, args.workers):
+            if best is None: print(f' {name:<26} skipped: {stages["skipped"]}')
+            else: print(f' {name:<26} {best:>8.3f} {calls:>6} {stages.get("rpc", 0):>8.3f} {stages.get("convert", 0):>11.3f} {stages.get("export", 0):>10.3f}')
+        print()
+        print('calls - fake server calls per run, rpc/convert/export - stage seconds per run summed over calls (overlap in concurrent scenarios)\n')
+        sys.exit(0)
+
+    if args.imports:
+        best, heavy = bench_import(args.repeats)
+        print(f'Import get_keyword_ideas (best of {args.repeats}): {best*1000:.1f} ms, heavy modules: {", ".join(heavy) or "none"}\n')
+        if args.max_import_ms is not None and (best * 1000 > args.max_import_ms or heavy): sys.exit(1)
+        sys.exit(0)
+
+    print(f'Convert {args.ideas} ideas (best of {args.repeats}, proto_plus={args.proto_plus}):\n')
+    print(f' {"out_as":<10} {"legacy, s":>10} {"columnar, s":>12} {"speedup":>8}  same')
+    for out_as, legacy, columnar, same in bench_convert(args.ideas, args.repeats, args.proto_plus):
+        print(f' {out_as:<10} {legacy:>10.3f} {columnar:>12.3f} {legacy/columnar:>7.1f}x  {same}')
+    print()
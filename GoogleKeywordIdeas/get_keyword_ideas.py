@@ -5,46 +5,107 @@
 ###  -g "ES" -l "ES" -k "implantes dentales"
 ###  -g "DE" -l "DE" -k "zahnimplantate"
 ###  -g "DE,DK" -l "DE" -k "zahnimplantate"
+###  -m "US,CA:EN;DE:DE;ES:ES" -k "dental implants"
+###  -g "US" -l "EN" -f "./seeds.txt" -r
+###  -g "US" -l "EN" -f "./seeds.txt" -a "./account1.yaml,./account2.yaml"
+###  -g "US" -l "EN" -k "dental implants" --min_searches 100 --exclude "free,cheap" --sort_by "-yoy" --top 50 --trends
 ###
 ### SEE `how_to.md`
 
+import re
 import sys
+import csv
 import json
+import random
+import hashlib
+import time
+import sqlite3
 import argparse
+import contextlib
 import datetime
+import threading
 
 from pathlib import Path
-from google.ads.googleads.client import GoogleAdsClient # google-ads
-from google.ads.googleads.errors import GoogleAdsException # google-ads
+from collections import deque, OrderedDict
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # https://developers.google.com/google-ads/api/reference/data/geotargets
 # https://developers.google.com/google-ads/api/docs/targeting/location-targeting
 DEFAULT_LOCATION_IDS = ["2840"]  # USA Location ID
+GEO_TARGETS_CSV      = "./geotargets.csv"        # Google geotargets CSV to pre-seed geo cache with (if exists)
+GEO_CACHE_PATH       = "./geo_targets_cache.db"  # geo cache SQLite file (None - memory only)
+GEO_CACHE_TTL        = 30 * 24 * 3600            # geo cache TTL in seconds
+IDEAS_CACHE_PATH     = "./ideas_cache.db"        # keyword ideas cache SQLite file (None - memory only), see `ideas_cache` kwarg
+IDEAS_CACHE_TTL      = 24 * 3600                 # keyword ideas cache TTL in seconds
+METRICS_STORE_PATH   = "./keyword_metrics.db"    # keyword metrics history SQLite file, see `refresh_keyword_ideas`
+METRICS_RECHECK      = 24 * 3600                 # seconds to wait before asking again seeds which got no latest month yet
 
 # https://developers.google.com/google-ads/api/reference/data/codes-formats#expandable-7
 DEFAULT_LANGUAGE_ID  = 1000      # English Language ID
 LANGUAGES_CODES      = [{"name":"Arabic","code":"ar","id":1019},{"name":"Bengali","code":"bn","id":1056},{"name":"Bulgarian","code":"bg","id":1020},{"name":"Catalan","code":"ca","id":1038},{"name":"Chinese (simplified)","code":"zh_CN","id":1017},{"name":"Chinese (traditional)","code":"zh_TW","id":1018},{"name":"Croatian","code":"hr","id":1039},{"name":"Czech","code":"cs","id":1021},{"name":"Danish","code":"da","id":1009},{"name":"Dutch","code":"nl","id":1010},{"name":"English","code":"en","id":1000},{"name":"Estonian","code":"et","id":1043},{"name":"Filipino","code":"tl","id":1042},{"name":"Finnish","code":"fi","id":1011},{"name":"French","code":"fr","id":1002},{"name":"German","code":"de","id":1001},{"name":"Greek","code":"el","id":1022},{"name":"Gujarati","code":"gu","id":1072},{"name":"Hebrew","code":"iw","id":1027},{"name":"Hindi","code":"hi","id":1023},{"name":"Hungarian","code":"hu","id":1024},{"name":"Icelandic","code":"is","id":1026},{"name":"Indonesian","code":"id","id":1025},{"name":"Italian","code":"it","id":1004},{"name":"Japanese","code":"ja","id":1005},{"name":"Kannada","code":"kn","id":1086},{"name":"Korean","code":"ko","id":1012},{"name":"Latvian","code":"lv","id":1028},{"name":"Lithuanian","code":"lt","id":1029},{"name":"Malay","code":"ms","id":1102},{"name":"Malayalam","code":"ml","id":1098},{"name":"Marathi","code":"mr","id":1101},{"name":"Norwegian","code":"no","id":1013},{"name":"Persian","code":"fa","id":1064},{"name":"Polish","code":"pl","id":1030},{"name":"Portuguese","code":"pt","id":1014},{"name":"Punjabi","code":"pa","id":1110},{"name":"Romanian","code":"ro","id":1032},{"name":"Russian","code":"ru","id":1031},{"name":"Serbian","code":"sr","id":1035},{"name":"Slovak","code":"sk","id":1033},{"name":"Slovenian","code":"sl","id":1034},{"name":"Spanish","code":"es","id":1003},{"name":"Swedish","code":"sv","id":1015},{"name":"Tamil","code":"ta","id":1130},{"name":"Telugu","code":"te","id":1131},{"name":"Thai","code":"th","id":1044},{"name":"Turkish","code":"tr","id":1037},{"name":"Ukrainian","code":"uk","id":1036},{"name":"Urdu","code":"ur","id":1041},{"name":"Vietnamese","code":"vi","id":1040}]
+LANGUAGES_BY_CODE    = {e['code'].lower(): e['id'] for e in LANGUAGES_CODES}     # lookup indexes for `get_lang_code`
+LANGUAGES_BY_NAME    = {e['name'].lower(): e['id'] for e in LANGUAGES_CODES}
+LANGUAGES_BY_ID      = {str(e['id']): e['id'] for e in LANGUAGES_CODES}
 
 # https://github.com/googleads/google-ads-python/blob/main/google-ads.yaml
 YAML_PATH            = "./google-ads.yaml" # Google Ads Credintals
+API_VERSION          = "v17"               # Google Ads API Version
 
 # `default` (returns google response as is) or `table` (returns pandas dataFrame) 
 #   or `dict`|`list` (returns optimized dict array) or `compact` (returns compact dict array) or `text`
+#   or `ideas` (returns compact KeywordIdeas container with dict-like items)
 DEFAULT_IDEAS_OUT_AS = "dict"              
+IDEAS_OUT_AS         = ['table', 'dict', 'list', 'compact', 'text', 'ideas'] # converted formats
 
+# https://developers.google.com/google-ads/api/reference/rpc/latest/KeywordSeed
+MAX_SEED_KEYWORDS    = 10                  # max keywords per GenerateKeywordIdeasRequest
+DEFAULT_BATCH_WORKERS = 4                  # parallel requests in `get_keyword_ideas_batch`
+ITER_PAGE_SIZE       = 1000                # ideas per page in `iter_keyword_ideas` if no page_size (API default is one page of up to 10000)
 
-def __get_ideas__(client: GoogleAdsClient, customer_id: str, geo_targets: str | list, language_id: int, keywords: str | list | None, page_url: str | None, **kwargs) -> dict:
+# jsonl/parquet/arrow export of ideas
+EXPORT_KWARGS        = ['jsonl_file', 'parquet_file', 'arrow_file'] # see `IdeasExporter`
+EXPORT_BATCH_SIZE    = 10000               # ideas per written batch in `export_keyword_ideas`
+
+# filter and rank stage of converted results, see `__filter_columns__`
+FILTER_KWARGS        = ['min_searches', 'max_searches', 'min_comp_index', 'max_comp_index', 'min_bid_micros', 'max_bid_micros', 
+                        'min_yoy', 'max_yoy', 'min_trend', 'max_trend', 'min_seasonality', 'max_seasonality', 
+                        'include', 'exclude', 'include_regex', 'exclude_regex', 'sort_by', 'top', 'trends'] # see `__filter_columns__`
+TREND_COLUMNS        = {'yoy': 'YoY', 'three_month': '3 Month Change', 'trend': 'Trend', 'seasonality': 'Seasonality', 'peak_month': 'Peak Month'} # see `__columns_trends__`
+SORT_COLUMNS         = ['keyword', 'avg_monthly_searches', 'comp_level', 'comp_index', 'low_top_of_page_bid_micros', 'high_top_of_page_bid_micros'] + list(TREND_COLUMNS)
+TREND_HISTORY_MONTHS = 14                  # months of searches requested when `yoy` is needed (API default is 12; +1 if latest month has no data yet)
+MAX_HISTORY_MONTHS   = 48                  # API keeps 4 years of monthly searches
+
+# https://developers.google.com/google-ads/api/docs/best-practices/quotas
+# https://developers.google.com/google-ads/api/docs/best-practices/rate-limits
+RATE_LIMIT_QPS       = None                # client-side requests per second for all calls in process (None - not limited), see `set_rate_limit`
+RATE_LIMIT_BURST     = 1                   # requests allowed at once above RATE_LIMIT_QPS
+RETRY_ATTEMPTS       = 5                   # retries on RETRY_STATUSES (0 - no retries)
+RETRY_BASE_DELAY     = 1.0                 # first retry delay in seconds, doubled for next retries
+RETRY_MAX_DELAY      = 60.0                # max retry delay in seconds
+RETRY_STATUSES       = ['RESOURCE_EXHAUSTED', 'UNAVAILABLE', 'DEADLINE_EXCEEDED', 'INTERNAL']
+POOL_STRATEGIES      = ['quota', 'least_loaded', 'round_robin'] # account routing of CredentialPool
+POOL_QUOTA_COOLDOWN  = 300.0               # seconds account is out of rotation after RESOURCE_EXHAUSTED (or API retry delay if longer)
+POOL_AUTH_COOLDOWN   = 3600.0              # seconds account is out of rotation after UNAUTHENTICATED, PERMISSION_DENIED or token refresh error
+POOL_AUTH_STATUSES   = ['UNAUTHENTICATED', 'PERMISSION_DENIED']
+POOL_MAX_WAIT        = 600.0               # max seconds to wait for account when all are out of rotation
+POOL_ACCOUNT_KEYS    = ['name', 'yaml_path', 'credintals', 'session', 'client', 'customer_id', 'qps', 'burst', 'daily_quota'] # account spec keys
+
+
+def __build_ideas_request__(session: "KeywordPlannerSession", customer_id: str, geo_targets: str | list, language_id: int, keywords: str | list | None, page_url: str | None, /, **kwargs):
     '''
     @kwargs:
     - adult: False|True
     - with_annotations: False|True
+    - page_size: ideas per page (0 - by API default)
+    - history_months: months of monthly searches up to latest month (0 - by API default, last 12 months; see `__history_months__`)
     '''
     
-    keyword_plan_idea_service = client.get_service("KeywordPlanIdeaService")
+    client = session.client
     # keyword_competition_level_enum = (client.enums.KeywordPlanCompetitionLevelEnum) # -- where it used?
     keyword_plan_network = (client.enums.KeywordPlanNetworkEnum.GOOGLE_SEARCH_AND_PARTNERS)
     # geo_targets = __map_locations_ids_to_resource_names__(client, geo_targets) # -- not need
-    language_id = client.get_service("GoogleAdsService").language_constant_path(language_id)
+    language_id = session.ads_service.language_constant_path(language_id)
     keyword_annotation = (client.enums.KeywordPlanKeywordAnnotationEnum) # -- deprecated
 
     if not (keywords or page_url): 
@@ -60,6 +121,13 @@ def __get_ideas__(client: GoogleAdsClient, customer_id: str, geo_targets: str |
     request.include_adult_keywords = bool(kwargs.get('adult', False))
     request.keyword_plan_network = keyword_plan_network
     if bool(kwargs.get('with_annotations', False)): request.keyword_annotation = keyword_annotation # -- deprecated
+    if page_size := kwargs.get('page_size'): request.page_size = int(page_size)
+    if history_months := __history_months__(**kwargs): # API returns months of range it has data for
+        year, month = map(int, __latest_month__().split('-'))
+        start_year, start_month = divmod(year * 12 + month - history_months, 12)
+        year_month_range = request.historical_metrics_options.year_month_range
+        year_month_range.start.year, year_month_range.start.month = start_year, start_month + 2 # MonthOfYear: JANUARY = 2
+        year_month_range.end.year, year_month_range.end.month = year, month + 1
 
     if keywords and type(keywords) is str: keywords = list(set([kw.strip() for kw in keywords.split(',')]))
 
@@ -79,15 +147,98 @@ def __get_ideas__(client: GoogleAdsClient, customer_id: str, geo_targets: str |
         request.keyword_and_url_seed.url = page_url
         request.keyword_and_url_seed.keywords.extend(keywords)
 
-    keyword_ideas = keyword_plan_idea_service.generate_keyword_ideas(request=request)
+    return request
+
+
+def __get_ideas__(session: "KeywordPlannerSession", customer_id: str, geo_targets: str | list, language_id: int, keywords: str | list | None, page_url: str | None, /, **kwargs) -> dict:
+    '''
+    @kwargs - see `__build_ideas_request__`, plus:
+    - stream_pages: True (next pages are requested while iterating result, as `iter_keyword_ideas` does; by default all pages are read here)
+    '''
+    
+    request = __build_ideas_request__(session, customer_id, geo_targets, language_id, keywords, page_url, **kwargs)
+    if (cache := __ideas_cache_of__(**kwargs)) and (cached := cache.get_response(session, request)) is not None: 
+        with __stage__('rpc', **kwargs) as event: event.update({'method': 'GenerateKeywordIdeas', 'cached': True, 'ideas': len(cached.results)})
+        return cached
+    if pool := kwargs.get('credential_pool'): # account of pool (only on cache miss), all pages are read on it
+        keyword_ideas = pool.run(lambda **options: __pages_to_response__(options['session'], 
+            __get_ideas__(options['session'], options['customer_id'], geo_targets, language_id, keywords, page_url, **options)), **{**kwargs, 'ideas_cache': None})
+        return cache.set_response(session, request, keyword_ideas) if cache else keyword_ideas
+    pages = __ideas_pages__(session, request, **kwargs)
+    keyword_ideas = IdeasPager(pages if kwargs.get('stream_pages') and not cache else list(pages))
     
     # if __name__ == "__main__":
     #     for idea in keyword_ideas:
     #         print(f'- "{idea.text}" has "{idea.keyword_idea_metrics.avg_monthly_searches}" avg monthly searches & "{idea.keyword_idea_metrics.competition}" competition.\n')
 
+    if cache: keyword_ideas = cache.set_response(session, request, __pages_to_response__(session, keyword_ideas))
     return keyword_ideas
 
 
+def __ideas_pages__(session: "KeywordPlannerSession", request, /, **kwargs):
+    '''
+    GenerateKeywordIdeaResponse pages one by one (next page is requested when previous one is consumed),
+    every page is own `rpc` stage and call of `__call_with_retry__` (rate limit, retries, call metrics).
+    '''
+    
+    traced = __traced__(**kwargs)
+    try:
+        for page in range(sys.maxsize):
+            with __stage__('rpc', **kwargs) as event:
+                event.update({'method': 'GenerateKeywordIdeas', 'page': page})
+                if traced: event['request_bytes'] = __byte_size__(request)
+                # first page of GAPIC pager only, next pages are requested here
+                __REQUEST_IDS__.last = None
+                response = __call_with_retry__(session, lambda: next(iter(session.ideas_service.generate_keyword_ideas(request=request).pages)), **kwargs)
+                event.update({'ideas': len(response.results), 'request_id': __REQUEST_IDS__.last})
+                if traced: event['response_bytes'] = __byte_size__(response)
+            yield response
+            if not response.next_page_token: break
+            request.page_token = response.next_page_token
+    finally: request.page_token = ''
+
+
+class IdeasPager:
+    '''
+    GenerateKeywordIdeas pages as GAPIC pager: iterates ideas of all pages, other attributes are of current page (ex: `total_size`).
+    @pages - GenerateKeywordIdeaResponse list or iterator (see `__ideas_pages__`), first page is read at once
+    '''
+    
+    def __init__(self, pages):
+        self.__pages = iter(pages)
+        self._response = next(self.__pages)
+    
+    @property
+    def pages(self):
+        yield self._response
+        for self._response in self.__pages: yield self._response
+    
+    def __iter__(self):
+        for page in self.pages: yield from page.results
+    
+    def __getattr__(self, name: str):
+        return getattr(self._response, name)
+
+
+def __pages_to_response__(session: "KeywordPlannerSession", keyword_ideas):
+    '''
+    Collect all pages of GenerateKeywordIdeas pager to one GenerateKeywordIdeaResponse.
+    '''
+    
+    response = session.client.get_type("GenerateKeywordIdeaResponse")
+    response.results.extend(__all_ideas__(keyword_ideas))
+    response.total_size = keyword_ideas.total_size
+    return response
+
+
+def __all_ideas__(keyword_ideas):
+    '''
+    All ideas of GenerateKeywordIdeas pager (IdeasPager or GAPIC pager) or response.
+    '''
+    
+    return keyword_ideas if hasattr(keyword_ideas, 'pages') else keyword_ideas.results
+
+
 def __map_locations_ids_to_resource_names__(client, location_ids):
     """
     Converts a list of location IDs to resource names.
@@ -98,89 +249,466 @@ def __map_locations_ids_to_resource_names__(client, location_ids):
     """
     
     if location_ids and type(location_ids) is str: location_ids = list(set([l.strip() for l in location_ids.split(',')]))
-    build_resource_name = client.get_service("GeoTargetConstantService").geo_target_constant_path
+    build_resource_name = __as_session__(client).geo_service.geo_target_constant_path
     return [build_resource_name(location_id) for location_id in location_ids]
 
 
 def get_lang_code(code: str) -> int:
     '''
     Find out language codes from ref.
-    @code - 2-symbols lang code (ex: `en`, `es` or `zh_CN`)
+    @code - 2-symbols lang code (ex: `en`, `es` or `zh_CN`), language name (ex: `English`) or id (ex: `1000`)
     '''
     
     code = 'en' if not code else str(code).lower()
-    for e in LANGUAGES_CODES:
-        if e['code'] == code: return e['id']
-        if e["name"].lower() == code: return e['id']
-        if str(e['id']) == code: return e['id']
-    return None
+    return LANGUAGES_BY_CODE.get(code) or LANGUAGES_BY_NAME.get(code) or LANGUAGES_BY_ID.get(code)
 
 
-def get_geo_targets(client: GoogleAdsClient, names: str | list, what: str = 'Country', locale: str | None = None, country_code: str | None = None):
+def __ads_exception_type__() -> type:
     '''
-    Find out geos names.
-    @names - geo names (ex: `US` or `US,CA` or `[US,CA]` ...)    
-    @what - geo type (None or `Any` or `Country`)
-    @locale - lang locale (ex: None or `en` or `es` or `zh_CN` ...)
-    @country_code - country code 2-symbols iso (ex: `US` or `CA` ...)
+    GoogleAdsException class (google-ads is imported on first use, not on module import).
+    '''
+    
+    from google.ads.googleads.errors import GoogleAdsException # google-ads
+    return GoogleAdsException
+
+
+class TieredCache:
+    '''
+    Two-level cache: in-process LRU + on-disk SQLite store, entries expire after `ttl`.
+    @path - SQLite file (None - memory only)
+    @ttl - seconds to keep entries (None - forever)
+    @max_items - in-process LRU size
+    @max_bytes - in-process LRU size in bytes of values (None - not limited)
+    @max_rows - on-disk store size, oldest written entries are evicted first (None - not limited)
+    '''
+    
+    def __init__(self, path: str | None = None, ttl: float | None = None, max_items: int = 1024, max_bytes: int | None = None, max_rows: int | None = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.memory = OrderedDict() # key -> (expires, value)
+        self.memory_bytes = 0
+        self.lock = threading.RLock()
+        self.db = None
+        self.hits = self.misses = self.evictions = 0
+
+    def __db__(self) -> sqlite3.Connection | None:
+        if self.db is None and self.path:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value BLOB)')
+        return self.db
+
+    def __remember__(self, key: str, expires: float | None, value):
+        self.__forget__(key)
+        self.memory[key] = (expires, value)
+        self.memory_bytes += len(value)
+        while len(self.memory) > 1 and (len(self.memory) > self.max_items or (self.max_bytes and self.memory_bytes > self.max_bytes)):
+            self.__forget__(next(iter(self.memory)))
+            self.evictions += 1
+
+    def __forget__(self, key: str):
+        if (item := self.memory.pop(key, None)) is not None: self.memory_bytes -= len(item[1])
+
+    def get(self, key: str):
+        '''
+        Get cached value or None if not found or expired.
+        '''
+        
+        now = time.time()
+        with self.lock:
+            if (item := self.memory.get(key)) is not None:
+                if item[0] is None or item[0] > now: 
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                self.__forget__(key)
+            if (db := self.__db__()) and (row := db.execute('SELECT expires, value FROM cache WHERE key = ?', (key,)).fetchone()):
+                if row[0] is None or row[0] > now: 
+                    self.__remember__(key, row[0], row[1])
+                    self.hits += 1
+                    return row[1]
+                db.execute('DELETE FROM cache WHERE key = ?', (key,))
+                db.commit()
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value, ttl: float | None = None):
+        '''
+        Put value (str or bytes for disk store) to cache.
+        @ttl - seconds to keep entry (default cache `ttl`)
+        '''
+        
+        ttl = ttl or self.ttl
+        expires = time.time() + ttl if ttl else None
+        with self.lock:
+            self.__remember__(key, expires, value)
+            if db := self.__db__():
+                db.execute('INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)', (key, expires, value))
+                if self.max_rows and (over := db.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_rows) > 0:
+                    db.execute('DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY rowid LIMIT ?)', (over,))
+                    self.evictions += over
+                db.commit()
+
+    def invalidate(self, prefix: str | None = None):
+        '''
+        Remove entries starting with `prefix` (None - all entries) from both levels.
+        '''
+        
+        with self.lock:
+            for key in [k for k in self.memory if not prefix or k.startswith(prefix)]: self.__forget__(key)
+            if db := self.__db__():
+                if prefix: db.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+                else: db.execute('DELETE FROM cache')
+                db.commit()
+
+    def stats(self) -> dict:
+        '''
+        Cache counters: hits, misses, evictions, memory items and bytes.
+        '''
+        
+        with self.lock: 
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'items': len(self.memory), 'bytes': self.memory_bytes}
+
+    def close(self):
+        with self.lock:
+            if self.db: self.db.close()
+            self.db = None
+
+
+class GeoTargetsCache(TieredCache):
+    '''
+    Cache for `get_geo_targets` results keyed by (names, what, locale, country_code).
+    Countries are cached one by one, so `US,CA` and `US` share entries.
+    @path, @ttl, @max_items - see TieredCache
+    @csv_path - Google geotargets CSV to pre-seed countries from (https://developers.google.com/google-ads/api/data/geotargets)
+    '''
+    
+    def __init__(self, path: str | None = GEO_CACHE_PATH, ttl: float | None = GEO_CACHE_TTL, max_items: int = 1024, csv_path: str | None = None):
+        super().__init__(path, ttl, max_items)
+        if csv_path and Path(csv_path).is_file(): self.seed_from_csv(csv_path)
+
+    @staticmethod
+    def __key__(names: list, what: str | None, locale: str | None, country_code: str | None) -> str:
+        if what == 'Country': return f'geo:Country:{",".join(names)}' # resource names of countries not depend on locale
+        return f'geo:{what or "Any"}:{locale or ""}:{country_code or ""}:{",".join(names)}'
+
+    def get_targets(self, names: list, what: str | None = 'Country', locale: str | None = None, country_code: str | None = None) -> list | None:
+        '''
+        Get cached geo target resource names or None if not cached.
+        '''
+        
+        if not names: return None
+        if (value := self.get(self.__key__(names, what, locale, country_code))) is not None: return json.loads(value)
+        if what != 'Country' or len(names) == 1: return None
+        res = []
+        for name in names:
+            if (value := self.get(self.__key__([name], what, locale, country_code))) is None: return None
+            res.extend(json.loads(value))
+        return res
+
+    def set_targets(self, names: list, what: str | None, locale: str | None, country_code: str | None, targets: list, by_country: dict | None = None):
+        '''
+        Put geo target resource names to cache.
+        @by_country - resource names by country code (for what = `Country`)
+        '''
+        
+        if not names: return
+        if what != 'Country': return self.set(self.__key__(names, what, locale, country_code), json.dumps(targets))
+        for name in names: self.set(self.__key__([name], what, locale, country_code), json.dumps((by_country or {}).get(name, [])))
+
+    def seed_from_csv(self, csv_path: str = GEO_TARGETS_CSV, ttl: float | None = None) -> int:
+        '''
+        Pre-seed countries from Google geotargets CSV (`Criteria ID`, `Country Code`, `Target Type`, ...).
+        Already loaded file (same path and modification time) is skipped.
+        @ttl - seconds to keep entries (default cache `ttl`)
+        Returns number of countries loaded.
+        '''
+        
+        marker = f'csv:{Path(csv_path).resolve()}:{Path(csv_path).stat().st_mtime}'
+        if self.get(marker) is not None: return 0
+        count = 0
+        with open(csv_path, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                if row.get('Target Type') != 'Country' or row.get('Status', 'Active') != 'Active': continue
+                self.set(self.__key__([row['Country Code'].upper()], 'Country', None, None), json.dumps([f'geoTargetConstants/{row["Criteria ID"]}']), ttl)
+                count += 1
+        self.set(marker, str(count), ttl)
+        return count
+
+
+GEO_CACHE = None # default GeoTargetsCache, see `get_geo_cache`
+__CACHES_LOCK__ = threading.Lock()
+
+
+def get_geo_cache() -> GeoTargetsCache:
+    '''
+    Get default geo cache (GEO_CACHE_PATH, GEO_CACHE_TTL, pre-seeded from GEO_TARGETS_CSV if exists).
+    To drop cached geos call `get_geo_cache().invalidate()`.
+    '''
+    
+    global GEO_CACHE
+    with __CACHES_LOCK__:
+        if GEO_CACHE is None: GEO_CACHE = GeoTargetsCache(GEO_CACHE_PATH, GEO_CACHE_TTL, csv_path=GEO_TARGETS_CSV)
+    return GEO_CACHE
+
+
+class IdeasCache(TieredCache):
+    '''
+    Cache for GenerateKeywordIdeas responses (raw protobuf bytes, all pages) keyed by normalized request:
+    sorted unique keywords, page url, geo target resource names, language, network and adult flag.
+    @path, @ttl, @max_items, @max_bytes, @max_rows - see TieredCache
+    '''
+    
+    def __init__(self, path: str | None = IDEAS_CACHE_PATH, ttl: float | None = IDEAS_CACHE_TTL, max_items: int = 256, max_bytes: int | None = 256 * 1024 * 1024, max_rows: int | None = 100000):
+        super().__init__(path, ttl, max_items, max_bytes, max_rows)
+
+    @staticmethod
+    def __key__(request) -> str:
+        keywords = list(request.keyword_seed.keywords) + list(request.keyword_and_url_seed.keywords)
+        key = {
+            'keywords': sorted(set([kw.strip().lower() for kw in keywords])),
+            'url': request.url_seed.url or request.keyword_and_url_seed.url,
+            'geos': sorted(set(request.geo_target_constants)),
+            'lang': request.language,
+            'adult': bool(request.include_adult_keywords),
+            'network': int(request.keyword_plan_network),
+            'annotation': [int(a) for a in request.keyword_annotation],
+            'page_size': request.page_size, 
+            **({'history': [r.start.year, int(r.start.month), r.end.year, int(r.end.month)]} if (r := request.historical_metrics_options.year_month_range).start.year else {}), }
+        return 'ideas:' + hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def get_response(self, session: "KeywordPlannerSession", request):
+        '''
+        Get cached GenerateKeywordIdeaResponse for request or None.
+        '''
+        
+        if (data := self.get(self.__key__(request))) is None: return None
+        return __from_bytes__(type(session.client.get_type("GenerateKeywordIdeaResponse")), data)
+
+    def set_response(self, session: "KeywordPlannerSession", request, response):
+        '''
+        Put GenerateKeywordIdeaResponse for request to cache, returns response.
+        '''
+        
+        self.set(self.__key__(request), __to_bytes__(response))
+        return response
+
+
+IDEAS_CACHE = None # default IdeasCache, see `get_ideas_cache`
+
+
+def get_ideas_cache() -> IdeasCache:
+    '''
+    Get default keyword ideas cache (IDEAS_CACHE_PATH, IDEAS_CACHE_TTL), used with `ideas_cache=True`.
+    '''
+    
+    global IDEAS_CACHE
+    with __CACHES_LOCK__:
+        if IDEAS_CACHE is None: IDEAS_CACHE = IdeasCache()
+    return IDEAS_CACHE
+
+
+def __ideas_cache_of__(**kwargs) -> IdeasCache | None:
+    if (cache := kwargs.get('ideas_cache')) is True: return get_ideas_cache()
+    return cache or None
+
+
+class MetricsStore:
+    '''
+    Keyword metrics history (SQLite) for incremental refresh, per market (geo targets, language and page url):
+     - seeds - seed keyword -> latest month of its last response and time of last request
+     - ideas - idea keyword -> latest metrics (avg monthly searches, competition, bids, annotations)
+     - searches - idea keyword -> monthly searches by month (`YYYY-MM`), new months are merged to history
+    @path - SQLite file (`:memory:` - memory only)
     '''
     
-    gtc_service = client.get_service("GeoTargetConstantService")
-    gtc_request = client.get_type("SuggestGeoTargetConstantsRequest")
+    def __init__(self, path: str = METRICS_STORE_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = None
+
+    def __db__(self) -> sqlite3.Connection:
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.executescript('''
+                CREATE TABLE IF NOT EXISTS seeds (seed TEXT, market TEXT, last_month TEXT, checked REAL, PRIMARY KEY (seed, market));
+                CREATE TABLE IF NOT EXISTS seed_ideas (seed TEXT, market TEXT, keyword TEXT, PRIMARY KEY (seed, market, keyword));
+                CREATE TABLE IF NOT EXISTS ideas (keyword TEXT, market TEXT, avg_monthly_searches INTEGER, competition INTEGER, competition_index INTEGER, 
+                    low_top_of_page_bid_micros INTEGER, high_top_of_page_bid_micros INTEGER, annotations TEXT, updated REAL, PRIMARY KEY (keyword, market));
+                CREATE TABLE IF NOT EXISTS searches (keyword TEXT, market TEXT, month TEXT, searches INTEGER, PRIMARY KEY (keyword, market, month));
+                CREATE TEMP TABLE IF NOT EXISTS wanted (seed TEXT PRIMARY KEY);''')
+        return self.db
+
+    def stale_seeds(self, seeds: list, market: str, latest_month: str, recheck: float | None = METRICS_RECHECK) -> list:
+        '''
+        Seeds to request again: never requested, or latest stored month is older than `latest_month` 
+        and last request is older than `recheck` seconds (API may publish month later).
+        '''
+        
+        checked_before = time.time() - (recheck or 0)
+        with self.lock:
+            db = self.__db__()
+            known = {row[0]: row[1:] for x in range(0, len(seeds), 500) 
+                     for row in db.execute(f'SELECT seed, last_month, checked FROM seeds WHERE market = ? AND seed IN ({",".join("?" * len(seeds[x:x+500]))})', (market, *seeds[x:x+500]))}
+        return [seed for seed in seeds if (k := known.get(seed)) is None or ((k[0] or '') < latest_month and (k[1] or 0) < checked_before)]
+
+    def merge(self, seeds: list, market: str, ideas):
+        '''
+        Merge response ideas of `seeds` chunk: ideas metrics are replaced, monthly searches are added to history.
+        '''
+        
+        now = time.time()
+        rows_ideas, rows_searches, last_month = [], [], None
+        for idea in ideas:
+            metrics = idea.keyword_idea_metrics
+            rows_ideas.append((idea.text, market, metrics.avg_monthly_searches, int(metrics.competition), metrics.competition_index, 
+                metrics.low_top_of_page_bid_micros, metrics.high_top_of_page_bid_micros, json.dumps([y.concept_group.name for y in idea.keyword_annotations.concepts]), now))
+            for y in metrics.monthly_search_volumes:
+                rows_searches.append((idea.text, market, month := f'{y.year}-{str(int(y.month)-1).zfill(2)}', y.monthly_searches))
+                if not last_month or month > last_month: last_month = month
+        with self.lock:
+            db = self.__db__()
+            db.executemany('''INSERT INTO ideas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (keyword, market) DO UPDATE SET 
+                avg_monthly_searches = excluded.avg_monthly_searches, competition = excluded.competition, competition_index = excluded.competition_index,
+                low_top_of_page_bid_micros = excluded.low_top_of_page_bid_micros, high_top_of_page_bid_micros = excluded.high_top_of_page_bid_micros,
+                annotations = excluded.annotations, updated = excluded.updated''', rows_ideas)
+            db.executemany('INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)', rows_searches)
+            db.executemany('DELETE FROM seed_ideas WHERE seed = ? AND market = ?', [(seed, market) for seed in seeds])
+            db.executemany('INSERT OR IGNORE INTO seed_ideas VALUES (?, ?, ?)', [(seed, market, row[0]) for seed in seeds for row in rows_ideas])
+            db.executemany('INSERT OR REPLACE INTO seeds VALUES (?, ?, ?, ?)', [(seed, market, last_month, now) for seed in seeds])
+            db.commit()
+
+    def ideas(self, session: "KeywordPlannerSession", seeds: list, market: str) -> list:
+        '''
+        Stored ideas of seeds (whole monthly searches history) as GenerateKeywordIdeaResult list.
+        '''
+        
+        res, by_keyword = [], {}
+        with self.lock:
+            db = self.__db__()
+            db.execute('DELETE FROM wanted')
+            db.executemany('INSERT OR IGNORE INTO wanted VALUES (?)', [(seed,) for seed in seeds])
+            keywords = 'SELECT DISTINCT keyword FROM seed_ideas JOIN wanted USING (seed) WHERE market = ?'
+            rows = db.execute(f'SELECT * FROM ideas WHERE market = ? AND keyword IN ({keywords}) ORDER BY rowid', (market, market)).fetchall()
+            months = db.execute(f'SELECT keyword, month, searches FROM searches WHERE market = ? AND keyword IN ({keywords}) ORDER BY keyword, month', (market, market)).fetchall()
+        for keyword, _, avg, competition, index, low, high, annotations, _ in rows:
+            idea = by_keyword[keyword] = session.client.get_type("GenerateKeywordIdeaResult")
+            idea.text = keyword
+            metrics = idea.keyword_idea_metrics
+            metrics.avg_monthly_searches, metrics.competition, metrics.competition_index = avg, competition, index
+            metrics.low_top_of_page_bid_micros, metrics.high_top_of_page_bid_micros = low, high
+            for name in json.loads(annotations or '[]'): 
+                concept = session.client.get_type("KeywordConcept")
+                concept.concept_group.name = name
+                idea.keyword_annotations.concepts.append(concept)
+            res.append(idea)
+        for keyword, month, searches in months:
+            volume = session.client.get_type("MonthlySearchVolume")
+            volume.year, volume.month, volume.monthly_searches = int(month[:4]), int(month[5:]) + 1, searches # MonthOfYear: JANUARY = 2
+            by_keyword[keyword].keyword_idea_metrics.monthly_search_volumes.append(volume)
+        return res
+
+    def close(self):
+        with self.lock:
+            if self.db: self.db.close()
+            self.db = None
+
+
+def __geo_names__(names: str | list | None) -> list:
+    if type(names) is str: names = names.split(',')
+    return sorted(set([str(n).strip().upper() for n in names or [] if str(n).strip()]))
+
+
+def __geo_cache_of__(**kwargs) -> "GeoTargetsCache | None":
+    return get_geo_cache() if kwargs.get('geo_cache') is None else kwargs.get('geo_cache')
+
+
+def __build_geo_request__(session: "KeywordPlannerSession", names: list, locale: str | None, country_code: str | None):
+    gtc_request = session.client.get_type("SuggestGeoTargetConstantsRequest")
     if locale: gtc_request.locale = locale
     if country_code: gtc_request.country_code = country_code
-
-    if type(names) is str: names = list(set([n.strip().upper() for n in names.split(',')]))
     gtc_request.location_names.names.extend(names)
-    results = gtc_service.suggest_geo_target_constants(gtc_request)
+    return gtc_request
 
-    res = []
+
+def __parse_geo_targets__(results, names: list, what: str | None) -> tuple:
+    '''
+    Pick geo target resource names from SuggestGeoTargetConstants response: returns (resource_names, by_country).
+    '''
+    
+    res, by_country = [], {}
     for suggestion in results.geo_target_constant_suggestions:
         tc = suggestion.geo_target_constant
         if what in [None,'','Any']: res.append(tc.resource_name)
         elif tc.target_type == what:
             if what == 'Country' and tc.country_code.upper() in names: 
                 res.append(tc.resource_name)
+                by_country.setdefault(tc.country_code.upper(), []).append(tc.resource_name)
         if __name__ == "__main__":
             print(f"- get_geo_targets: {tc.resource_name}: ({tc.name}, {tc.country_code}, {tc.target_type}, "
                   f"{tc.status}) -- locale `{suggestion.locale}` by `{suggestion.search_term}`.")
     
     if results.geo_target_constant_suggestions and __name__ == "__main__": print()
-    return res    
+    return res, by_country
 
 
-def get_keyword_ideas(geos: str | list = 'US,CA', lang: str = 'EN', keywords: str | list | None = 'dental implants, free implants', page_url: str | None = None, **kwargs) -> list | None:
+def get_geo_targets(client: "GoogleAdsClient | KeywordPlannerSession", names: str | list, what: str = 'Country', locale: str | None = None, country_code: str | None = None, **kwargs):
     '''
-    API Keyword Planner Call (Get Keyword Ideas).
-    @geos - countries ISO (ex: `US` or `US,CA` or `[US,CA]` ...) or other geo names
-    @lang - language code 2-symbols from ref (ex: `en` or `es` or `zh_CN`)
-    @keywords - keywords to search (ex: `dental implants` or `dental implants,free implants` or `[dental implants,free implants]`); max 10
-    @page_url - site to filter unrelated keywords (http://... or https://...)
+    Find out geos names.
+    @client - GoogleAdsClient or KeywordPlannerSession
+    @names - geo names (ex: `US` or `US,CA` or `[US,CA]` ...)    
+    @what - geo type (None or `Any` or `Country`)
+    @locale - lang locale (ex: None or `en` or `es` or `zh_CN` ...)
+    @country_code - country code 2-symbols iso (ex: `US` or `CA` ...)
     @kwargs:
-      MAIN:
-       - yaml_path - path to `./google-ads.yaml` file (use credintals instead of)      
-       - credintals - None|`file`|`env`|yaml_config_string|dict (Configuration data used to initialize a GoogleAdsClient, instead of yaml_path)
-       - customer_id - Google Ads Customer ID Account Number (format: XXXXXXXXXX not XXX-XXX-XXXX, instead of in credintals or yaml file)      
-       - out_as - `default` (returns google response as is) or `table` (returns pandas dataFrame) or `dict`|`list` (returns optimized dict array) or `compact` (returns compact dict array) or `text`
-      OPTINONAL:
-       - adult: True (include adult keywords)
-      DEPRECATED:
-       - with_annotations: True (include keywords annotations)
-      PROCESSING:
-       - with_null_geos: True (no pass DEFAULT_LOCATION_IDS if geos not found)      
-       - with_null_lang: True (no pass DEFAULT_LANGUAGE_ID if lang not found)   
-       - proccessing: dict for set out processing parameters
-      SAVE AS:
-       - csv_file - save to csv, uses with out_as = `table`
-       - excel_file - save to excel, uses with out_as = `table`
-       - html_file - save to html, uses with out_as = `table`
+     - geo_cache - GeoTargetsCache to use (default from `get_geo_cache`) or False (no cache)
+     - max_retries, rate_limiter - see `get_keyword_ideas`
     '''
     
-    # init GoogleAdsClient
+    names = __geo_names__(names)
+    if (cache := __geo_cache_of__(**kwargs)):
+        if (res := cache.get_targets(names, what, locale, country_code)) is not None: return res
+
+    session = __as_session__(client)
+    request = __build_geo_request__(session, names, locale, country_code)
+    results = __call_with_retry__(session, lambda: session.geo_service.suggest_geo_target_constants(request), **kwargs)
+    res, by_country = __parse_geo_targets__(results, names, what)
+    if cache: cache.set_targets(names, what, locale, country_code, res, by_country)
+    return res
+
+
+async def aget_geo_targets(client: "GoogleAdsClient | KeywordPlannerSession", names: str | list, what: str = 'Country', locale: str | None = None, country_code: str | None = None, **kwargs):
+    '''
+    Async `get_geo_targets` (over async gRPC channel of KeywordPlannerSession).
+    @kwargs - see `get_geo_targets`, plus:
+     - semaphore - asyncio.Semaphore to limit concurrent requests
+     - timeout - request timeout in seconds
+    '''
+    
+    names = __geo_names__(names)
+    if (cache := __geo_cache_of__(**kwargs)):
+        if (res := cache.get_targets(names, what, locale, country_code)) is not None: return res
+
+    session = __as_session__(client)
+    request = __build_geo_request__(session, names, locale, country_code)
+    results = await __acall_with_retry__(session, lambda: session.acall("GeoTargetConstantService", "SuggestGeoTargetConstants", 
+        request, "SuggestGeoTargetConstantsResponse", kwargs.get('timeout')), **kwargs)
+    res, by_country = __parse_geo_targets__(results, names, what)
+    if cache: cache.set_targets(names, what, locale, country_code, res, by_country)
+    return res
+
+def __init_client__(**kwargs) -> "GoogleAdsClient":
+    '''
+    Init GoogleAdsClient from `credintals` or `yaml_path` kwargs (see `get_keyword_ideas`).
+    '''
+    
+    from google.ads.googleads.client import GoogleAdsClient # google-ads (slow import, so on first client only)
     if (credintals := kwargs.get('credintals')) and not credintals in ['yaml','file']:
-        if credintals == 'env': gc = GoogleAdsClient.load_from_env(version="v17")
-        elif type(credintals) is str: gc = GoogleAdsClient.load_from_string(credintals,version="v17")
-        elif type(credintals) is dict: gc = GoogleAdsClient.load_from_dict(credintals,version="v17")
+        if credintals == 'env': gc = GoogleAdsClient.load_from_env(version=API_VERSION)
+        elif type(credintals) is str: gc = GoogleAdsClient.load_from_string(credintals,version=API_VERSION)
+        elif type(credintals) is dict: gc = GoogleAdsClient.load_from_dict(credintals,version=API_VERSION)
         else: raise Exception('Unknown credintals')
     else:
         yaml_path = kwargs.get("yaml_path",YAML_PATH)   
@@ -190,157 +718,1908 @@ def get_keyword_ideas(geos: str | list = 'US,CA', lang: str = 'EN', keywords: st
                 get_refresh_token()
                 sys.exit(2)
             raise Exception(f'Yaml Config not Found: {yaml_path}')
-        gc = GoogleAdsClient.load_from_storage(path=yaml_path,version="v17")          
+        gc = GoogleAdsClient.load_from_storage(path=yaml_path,version=API_VERSION)
+    return gc
 
-    # collect search parameters
-    customer_id = kwargs.get('customer_id') or gc.login_customer_id
-    geos = get_geo_targets(gc, geos) or get_geo_targets(gc, None if kwargs.get('with_null_geos') == True else DEFAULT_LOCATION_IDS)
-    if geos: geos = list(set(geos))
-    lang = get_lang_code(lang) or (None if kwargs.get('with_null_lang') == True else DEFAULT_LANGUAGE_ID) 
-    out_as = kwargs.get('out_as', DEFAULT_IDEAS_OUT_AS)
-    
-    # pass out parameters
-    if (pr := kwargs.get('proccessing')) and type(pr) is dict: 
-        pr['customer_id'] = customer_id
-        pr['geos'] = geos
-        pr['lang'] = lang
-        pr['keywords'] = keywords
-        pr['page_url'] = page_url
 
-    # get keyword ideas
-    list_keywords = __get_ideas__(gc, customer_id, geos, lang, keywords, page_url, **kwargs)    
+def __to_bytes__(message) -> bytes:
+    return type(message).serialize(message) if hasattr(type(message), 'serialize') else message.SerializeToString() # proto-plus or protobuf
 
-    if list_keywords and out_as == 'table': # as table grid (for console or sav to excel|csv|html)
-        import pandas as pd
-        if list_keywords.total_size == 0: return pd.DataFrame()
-        results = list_keywords.results        
-        list_to_out = []
-        for x in range(len(results)):
-            list_months = []
-            list_searches = []
-            list_annotations = []
-            for y in results[x].keyword_idea_metrics.monthly_search_volumes:
-                list_months.append(f'{y.year}-{str(y.month-1).zfill(2)}')
-                list_searches.append(y.monthly_searches)
-            for y in results[x].keyword_annotations.concepts:
-                list_annotations.append(y.concept_group.name) 
-            list_to_out.append([
-                     results[x].text, 
-                     results[x].keyword_idea_metrics.avg_monthly_searches, 
-                     str(results[x].keyword_idea_metrics.competition), 
-                     results[x].keyword_idea_metrics.competition_index, 
-                     ', '.join(str(i) for i in list_searches), 
-                     ', '.join(str(i) for i in list_months), 
-                     ', '.join(str(i) for i in list_annotations),
-                     results[x].keyword_idea_metrics.low_top_of_page_bid_micros,
-                     results[x].keyword_idea_metrics.high_top_of_page_bid_micros, ])
-        df = pd.DataFrame(list_to_out, columns = ["Keyword", "Avg Monthly Searches", "Competition Level", "Competition Index", "Searches Past Months", "Past Months", "List Annotations", "PBM Lo Top", "PBM Hi Top"])
-        if s2 := kwargs.get('excel_file'): df.to_excel(s2, header=True, index=False)
-        if s2 := kwargs.get('csv_file'): df.to_csv(s2, index=False)
-        if s2 := kwargs.get('html_file'): df.to_html(s2, index=False)
-        if kwargs.get('shortly', False) == True:
-            pd.set_option('display.max_rows', None)
-            pd.set_option('display.max_columns', None)
-            pd.set_option('display.width', 200)
-            pd.set_option('display.max_colwidth', None)
-            setattr(df, 'shortly', df.loc[:,["Keyword", "Avg Monthly Searches", "Competition Level", "Competition Index", "PBM Lo Top", "PBM Hi Top"]])
-        return df
+
+def __from_bytes__(message_class, data: bytes):
+    return message_class.deserialize(data) if hasattr(message_class, 'deserialize') else message_class.FromString(data) # proto-plus or protobuf
+
+
+def __ads_failure__(client: "GoogleAdsClient", error):
+    '''
+    GoogleAdsFailure from trailing metadata of gRPC error or None.
+    '''
     
-    if list_keywords and out_as in ['dict','list']: # optimized dict array
-        if list_keywords.total_size == 0: return None
-        results = list_keywords.results
-        list_to_out = []
-        for x in range(len(results)):
-            list_months = []
-            list_searches = []
-            list_annotations = []
-            for y in results[x].keyword_idea_metrics.monthly_search_volumes:
-                list_months.append(f'{y.year}-{str(y.month-1).zfill(2)}')
-                list_searches.append(y.monthly_searches)        
-            for y in results[x].keyword_annotations.concepts:
-                list_annotations.append(y.concept_group.name)                
-            list_to_out.append({
-                    "keyword":      results[x].text, 
-                    "avg_monthly_searches": results[x].keyword_idea_metrics.avg_monthly_searches, 
-                    "comp_level":   str(results[x].keyword_idea_metrics.competition), 
-                    "comp_index":   results[x].keyword_idea_metrics.competition_index, 
-                    "searches":     list_searches, 
-                    "past_months":  list_months, 
-                    "annotations":  list_annotations,
-                    "low_top_of_page_bid_micros": results[x].keyword_idea_metrics.low_top_of_page_bid_micros,
-                    "high_top_of_page_bid_micros": results[x].keyword_idea_metrics.high_top_of_page_bid_micros, })
-        return list_to_out        
-    
-    if list_keywords and out_as == 'compact': # compact optimized dict array
-        if list_keywords.total_size == 0: return None
-        results = list_keywords.results
-        list_to_out = []
-        for x in range(len(results)):
-            list_to_out.append({
-                    "keyword":      results[x].text, 
-                    "avg_monthly_searches": results[x].keyword_idea_metrics.avg_monthly_searches, 
-                    "comp_level":   str(results[x].keyword_idea_metrics.competition), 
-                    "comp_index":   results[x].keyword_idea_metrics.competition_index, })
-        return list_to_out
-    
-    if list_keywords and out_as == 'text': # text, keyword with info perline (for console)
-        if list_keywords.total_size == 0: return ''
-        results = list_keywords.results
-        text_to_out = ''
-        for idea in results:
-            text_to_out += f'- "{idea.text}" has "{idea.keyword_idea_metrics.avg_monthly_searches}" avg monthly searches & "{idea.keyword_idea_metrics.competition}" competition.\n'
-        return text_to_out
-
-    return list_keywords # google response as is (bad format)
-     
+    error = getattr(error, 'response', None) or error # google.api_core error wraps gRPC error
+    try: metadata = dict(tuple(error.trailing_metadata() or ()))
+    except Exception: return None
+    if not (data := metadata.get(f"google.ads.googleads.{API_VERSION}.errors.googleadsfailure-bin")): return None
+    try: return __from_bytes__(type(client.get_type("GoogleAdsFailure")), data)
+    except Exception: return None
 
-if __name__ == "__main__":
+
+def __as_ads_exception__(client: "GoogleAdsClient", error) -> Exception:
+    '''
+    Convert async gRPC error to GoogleAdsException (as GoogleAdsClient interceptors do for sync calls).
+    '''
     
-    parser = argparse.ArgumentParser(description="Generates keyword ideas from a list of seed keywords")
-    parser.add_argument("-g","--geos",type=str,required=True,help="Comma Separated ISO Country Codes",)
-    parser.add_argument("-l","--lang",type=str,required=True,help="2-Symbols language code",)
-    parser.add_argument("-k","--keywords",type=str,required=True,help="Comma Separated Keywords to search",)
-    parser.add_argument("-p","--page_url",type=str,required=False,help="Site to filter unrelated keywords",)
+    if (failure := __ads_failure__(client, error)) is None: return error
+    return __ads_exception_type__()(error, error, failure, dict(tuple(error.trailing_metadata() or ())).get("request-id"))
+
+
+class RateLimiter:
+    '''
+    Token bucket rate limiter, safe to share between threads and event loops.
+    @rate - requests per second (None - not limited)
+    @burst - requests allowed at once
+    '''
     
-    args = None
-    try: args = parser.parse_args()
-    except: print()
+    def __init__(self, rate: float | None = None, burst: int = 1):
+        self.lock = threading.Lock()
+        self.configure(rate, burst)
 
-    try: 
-        
-        if args:
-            started = datetime.datetime.utcnow()
-            proccessing = {'started': str(started)}
-            results = get_keyword_ideas(
-                    args.geos, args.lang, args.keywords, args.page_url,
-                    out_as='table', shortly=True, proccessing=proccessing,
-                    csv_file = f'./last_results.csv', )             
-            print()
-            if proccessing:
-                proccessing['finished'] = str(datetime.datetime.utcnow())
-                proccessing['elapsed'] = str(datetime.datetime.utcnow() - started)
-                print('Processing parameters:\n')
-                for k,v in proccessing.items(): print(f' - {k}: {v}')
-                print()
-            try: 
-                print(f'Results (see file `./last_results.csv`) {type(results)}:\n')
-                if results in [None,[],0,'']: print('RESULT IS EMPTY') 
-                else: raise Exception('')
-            except:
-                if type(results) is list: print(json.dumps(results,indent=1))
-                elif hasattr(results, 'shortly'): print(results.shortly)
-                else: print(results)
-                
-            print('\nTo call from code see `def get_keyword_ideas`')
+    def configure(self, rate: float | None, burst: int = 1):
+        with self.lock:
+            self.rate = rate
+            self.burst = max(1, int(burst or 1))
+            self.tokens = float(self.burst)
+            self.updated = time.monotonic()
 
-    except GoogleAdsException as ex:
+    def reserve(self) -> float:
+        '''
+        Take one token, returns seconds to wait before request.
+        '''
         
-        print(f'Request ID "{ex.request_id}" failed, status "{ex.error.code().name}", details:')
-        for error in ex.failure.errors:
-            print(f' - {error.message}')
-            if error.location:
-                for field_path_element in error.location.field_path_elements:
-                    print(f" - - on field: {field_path_element.field_name}")
+        with self.lock:
+            if not self.rate: return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - 1
+            self.updated = now
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self) -> float:
+        if (delay := self.reserve()) > 0: time.sleep(delay)
+        return delay
+
+    async def aacquire(self) -> float:
+        import asyncio # only async callers need it (slow import)
+        if (delay := self.reserve()) > 0: await asyncio.sleep(delay)
+        return delay
+
+
+class CallMetrics:
+    '''
+    Counters of API calls: calls, retries, failures, throttled_seconds (rate limiter waits), backoff_seconds (retry waits), statuses.
+    '''
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock: self.values = {'calls': 0, 'retries': 0, 'failures': 0, 'throttled_seconds': 0.0, 'backoff_seconds': 0.0, 'statuses': {}}
+
+    def add(self, name: str, value: float = 1, status: str | None = None):
+        with self.lock:
+            self.values[name] += value
+            if status: self.values['statuses'][status] = self.values['statuses'].get(status, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self.lock: return {**self.values, 'statuses': dict(self.values['statuses'])}
+
+
+RATE_LIMITER = RateLimiter(RATE_LIMIT_QPS, RATE_LIMIT_BURST) # shared by all calls in process
+CALL_METRICS = CallMetrics()
+
+
+def set_rate_limit(rate: float | None, burst: int = RATE_LIMIT_BURST):
+    '''
+    Set client-side rate limit for all calls in process.
+    @rate - requests per second (None - not limited)
+    @burst - requests allowed at once
+    '''
+    
+    RATE_LIMITER.configure(rate, burst)
+
+
+def get_call_metrics(reset: bool = False) -> dict:
+    '''
+    Get API calls counters (see CallMetrics).
+    @reset - reset counters after read
+    '''
+    
+    res = CALL_METRICS.snapshot()
+    if reset: CALL_METRICS.reset()
+    return res
+
+
+class StageMetrics:
+    '''
+    Per stage totals of `__stage__` events: count, errors, seconds, max_seconds, ideas.
+    '''
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock: self.values = {}
+
+    def add(self, event: dict):
+        with self.lock:
+            v = self.values.setdefault(event['stage'], {'count': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'ideas': 0})
+            v['count'] += 1
+            v['errors'] += 1 if 'error' in event else 0
+            v['seconds'] += event['seconds']
+            v['max_seconds'] = max(v['max_seconds'], event['seconds'])
+            v['ideas'] += event.get('ideas') or 0
+
+    def snapshot(self) -> dict:
+        with self.lock: return {k: dict(v) for k, v in self.values.items()}
+
+
+STAGE_METRICS = StageMetrics()
+STAGE_HOOKS   = [] # callbacks for every stage event of every call (see `add_stage_hook`)
+
+
+def add_stage_hook(hook):
+    '''
+    Call `hook(event)` after every stage in process (client_init, geo_resolve, lang_lookup, rpc, convert, export).
+    @hook - callable with one arg, event dict:
+       - stage, started (unix time), seconds, error (exception class name, if failed)
+       - stage attributes: ideas, geos, lang, out_as, files, method, cached, page, request_bytes, response_bytes, request_id
+    Exporters: `OTelStageExporter`, `PrometheusStageExporter`.
+    '''
+    
+    if hook not in STAGE_HOOKS: STAGE_HOOKS.append(hook)
+
+
+def remove_stage_hook(hook):
+    if hook in STAGE_HOOKS: STAGE_HOOKS.remove(hook)
+
+
+def get_stage_metrics(reset: bool = False) -> dict:
+    '''
+    Get per stage totals (see StageMetrics).
+    @reset - reset totals after read
+    '''
+    
+    res = STAGE_METRICS.snapshot()
+    if reset: STAGE_METRICS.reset()
+    return res
+
+
+def __traced__(**kwargs) -> bool:
+    '''
+    Someone listens stage events (so worth to compute payload sizes).
+    '''
+    
+    return bool(STAGE_HOOKS or kwargs.get('on_stage'))
+
+
+def __byte_size__(message) -> int | None:
+    message = getattr(message, '_response', message) # pager: current page
+    if hasattr(type(message), 'pb'): message = type(message).pb(message) # proto-plus
+    try: return message.ByteSize()
+    except Exception: return None
+
+
+@contextlib.contextmanager
+def __stage__(name: str, **kwargs):
+    '''
+    Time stage `name`, then pass event to STAGE_METRICS, STAGE_HOOKS and `on_stage` kwarg callback.
+    Yields event dict for stage attributes.
+    '''
+    
+    event = {'stage': name, 'started': time.time()}
+    started = time.perf_counter()
+    try: yield event
+    except BaseException as error:
+        event['error'] = type(error).__name__
+        if request_id := getattr(error, 'request_id', None): event['request_id'] = request_id
+        raise
+    finally:
+        event['seconds'] = time.perf_counter() - started
+        STAGE_METRICS.add(event)
+        for hook in [*STAGE_HOOKS, kwargs.get('on_stage')]:
+            if not hook: continue
+            try: hook(event)
+            except Exception as error: print(f'Stage hook {hook!r} failed: {error!r}', file=sys.stderr)
+
+
+class OTelStageExporter:
+    '''
+    Stage hook: OpenTelemetry span per stage (child of current span, if any).
+    @tracer - opentelemetry Tracer (default `trace.get_tracer('get_keyword_ideas')`)
+    Usage: `add_stage_hook(OTelStageExporter())`
+    '''
+    
+    def __init__(self, tracer=None):
+        from opentelemetry import trace # optional: pip install opentelemetry-api
+        self.tracer = tracer or trace.get_tracer('get_keyword_ideas')
+        self.error_status = trace.Status(trace.StatusCode.ERROR)
+
+    def __call__(self, event: dict):
+        started = int(event['started'] * 1e9)
+        span = self.tracer.start_span(f"keyword_ideas.{event['stage']}", start_time=started)
+        span.set_attributes({f'keyword_ideas.{k}': v for k, v in event.items() if k not in ['stage', 'started', 'seconds'] and type(v) in [str, int, float, bool]})
+        if 'error' in event: span.set_status(self.error_status)
+        span.end(end_time=started + int(event['seconds'] * 1e9))
+
+
+class PrometheusStageExporter:
+    '''
+    Stage hook: Prometheus metrics `<prefix>_stage_seconds{stage,status}` (histogram), 
+    `<prefix>_stage_ideas_total{stage}` and `<prefix>_payload_bytes_total{stage,direction}` (counters).
+    @registry - prometheus_client CollectorRegistry (default global REGISTRY)
+    @prefix - metrics names prefix
+    Usage: `add_stage_hook(PrometheusStageExporter())`, then `prometheus_client.start_http_server(port)`
+    '''
+    
+    def __init__(self, registry=None, prefix: str = 'keyword_ideas'):
+        import prometheus_client as prom # optional: pip install prometheus-client
+        registry = registry or prom.REGISTRY
+        self.seconds = prom.Histogram(f'{prefix}_stage_seconds', 'Keyword ideas stage duration, seconds', ['stage', 'status'], registry=registry)
+        self.ideas = prom.Counter(f'{prefix}_stage_ideas', 'Keyword ideas passed stage', ['stage'], registry=registry)
+        self.bytes = prom.Counter(f'{prefix}_payload_bytes', 'Keyword ideas API payload, bytes', ['stage', 'direction'], registry=registry)
+
+    def __call__(self, event: dict):
+        stage = event['stage']
+        self.seconds.labels(stage, 'error' if 'error' in event else 'ok').observe(event['seconds'])
+        if ideas := event.get('ideas'): self.ideas.labels(stage).inc(ideas)
+        if size := event.get('request_bytes'): self.bytes.labels(stage, 'request').inc(size)
+        if size := event.get('response_bytes'): self.bytes.labels(stage, 'response').inc(size)
+
+
+def __retry_status__(error) -> str | None:
+    rpc_error = error.error if isinstance(error, __ads_exception_type__()) else error
+    if (code := getattr(rpc_error, 'grpc_status_code', None)) is not None: return code.name # google.api_core error (sync service calls)
+    try: return rpc_error.code().name
+    except Exception: return None
+
+
+def __retry_delay__(session: "KeywordPlannerSession", error, attempt: int) -> float:
+    '''
+    Seconds to wait before retry: API hint (QuotaErrorDetails.retry_delay) if any, otherwise jittered exponential backoff.
+    '''
+    
+    failure = error.failure if isinstance(error, __ads_exception_type__()) else __ads_failure__(session.client, error)
+    for e in (failure.errors if failure is not None else []):
+        hint = e.details.quota_error_details.retry_delay # Duration or timedelta (proto-plus)
+        if (seconds := hint.total_seconds() if hasattr(hint, 'total_seconds') else hint.seconds + hint.nanos / 1e9) > 0:
+            return seconds + random.uniform(0, RETRY_BASE_DELAY)
+    return random.uniform(0.5, 1.0) * min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+
+
+def __call_with_retry__(session: "KeywordPlannerSession", call, /, **kwargs):
+    '''
+    Call API (`call` without args) under rate limiter, retry on RETRY_STATUSES.
+    @kwargs - `max_retries`, `rate_limiter`, `retry_statuses` (see `get_keyword_ideas`)
+    '''
+    
+    limiter = kwargs.get('rate_limiter') or RATE_LIMITER
+    max_retries = RETRY_ATTEMPTS if kwargs.get('max_retries') is None else int(kwargs.get('max_retries'))
+    statuses = RETRY_STATUSES if kwargs.get('retry_statuses') is None else kwargs['retry_statuses']
+    for attempt in range(max_retries + 1):
+        CALL_METRICS.add('throttled_seconds', limiter.acquire())
+        CALL_METRICS.add('calls')
+        try: return call()
+        except Exception as error:
+            if (status := __retry_status__(error)) is None: raise
+            CALL_METRICS.add('failures', status=status)
+            if status not in statuses or attempt >= max_retries: raise
+            CALL_METRICS.add('retries')
+            CALL_METRICS.add('backoff_seconds', delay := __retry_delay__(session, error, attempt))
+            time.sleep(delay)
+
+
+async def __acall_with_retry__(session: "KeywordPlannerSession", call, /, **kwargs):
+    '''
+    Async `__call_with_retry__`, `call` returns awaitable.
+    @kwargs - `max_retries`, `rate_limiter`, `retry_statuses`, `semaphore` (see `aget_keyword_ideas`)
+    '''
+    
+    import asyncio # only async callers need it (slow import)
+    limiter = kwargs.get('rate_limiter') or RATE_LIMITER
+    max_retries = RETRY_ATTEMPTS if kwargs.get('max_retries') is None else int(kwargs.get('max_retries'))
+    statuses = RETRY_STATUSES if kwargs.get('retry_statuses') is None else kwargs['retry_statuses']
+    for attempt in range(max_retries + 1):
+        async with kwargs.get('semaphore') or contextlib.nullcontext():
+            CALL_METRICS.add('throttled_seconds', await limiter.aacquire())
+            CALL_METRICS.add('calls')
+            try: return await call()
+            except Exception as error:
+                if (status := __retry_status__(error)) is None: raise
+                CALL_METRICS.add('failures', status=status)
+                if status not in statuses or attempt >= max_retries: raise
+                CALL_METRICS.add('retries')
+                CALL_METRICS.add('backoff_seconds', delay := __retry_delay__(session, error, attempt))
+        await asyncio.sleep(delay)
+
+
+__REQUEST_IDS__ = threading.local() # `last` - request-id of last successful sync call of thread (see `__request_id_interceptor__`)
+
+
+def __request_id_interceptor__():
+    '''
+    gRPC interceptor of service clients: keeps `request-id` of successful sync call in `__REQUEST_IDS__.last` (failures carry it in GoogleAdsException).
+    '''
+    
+    import grpc # google-ads dependency
+    
+    class RequestIdInterceptor(grpc.UnaryUnaryClientInterceptor):
+        def intercept_unary_unary(self, continuation, client_call_details, request):
+            response = continuation(client_call_details, request)
+            # request-id is sent in headers too (google-ads ExceptionInterceptor returns them as trailing metadata)
+            __REQUEST_IDS__.last = dict(tuple(response.initial_metadata() or ()) + tuple(response.trailing_metadata() or ())).get("request-id")
+            return response
+    
+    return RequestIdInterceptor()
+
+
+__CHANNEL_OPTIONS__ = [("grpc.max_metadata_size", 16 * 1024 * 1024), ("grpc.max_receive_message_length", 64 * 1024 * 1024)] # as google-ads channels
+
+
+class KeywordPlannerSession:
+    '''
+    Warm GoogleAdsClient with service stubs built once (KeywordPlanIdeaService, GeoTargetConstantService, GoogleAdsService).
+    Use `get_session` to share one session per credintals source, call `close` to release gRPC channels.
+    @client - already initialized GoogleAdsClient (optional)
+    @kwargs - `yaml_path`, `credintals` (see `get_keyword_ideas`), used if no client
+       - channel_target - `host:port` of plaintext gRPC endpoint instead of Google Ads API (ex: local fake server, see `bench_keyword_ideas.py`)
+    '''
+    
+    def __init__(self, client: "GoogleAdsClient | None" = None, **kwargs):
+        with __stage__('client_init', **kwargs):
+            self.client = client or __init_client__(**kwargs)
+            self.key = __session_key__(**kwargs) if not client else None
+            self.channel_target = kwargs.get('channel_target')
+            self.ideas_service = self.__service__("KeywordPlanIdeaService")
+            self.geo_service = self.__service__("GeoTargetConstantService")
+            self.ads_service = self.__service__("GoogleAdsService")
+        self.aio_channel = None # (event loop, grpc.aio.Channel), see `acall`
+        self.channel = None     # grpc.Channel without google-ads interceptors, see `call_bytes`
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def __service__(self, name: str):
+        '''
+        Service client, as `client.get_service` but over plaintext channel to `channel_target` if it is set.
+        '''
+        
+        if not self.channel_target: return self.client.get_service(name, interceptors=[__request_id_interceptor__()])
+        import grpc # google-ads dependency
+        from google.ads.googleads.interceptors import MetadataInterceptor, ExceptionInterceptor # google-ads
+        
+        service_class = getattr(self.client._get_api_services_by_version(API_VERSION), f'{name}Client')
+        channel = grpc.intercept_channel(grpc.insecure_channel(self.channel_target, options=__CHANNEL_OPTIONS__),
+            MetadataInterceptor(self.client.developer_token, self.client.login_customer_id, self.client.linked_customer_id, self.client.use_cloud_org_for_api_access),
+            ExceptionInterceptor(API_VERSION, use_proto_plus=self.client.use_proto_plus), __request_id_interceptor__())
+        return service_class(transport=service_class.get_transport_class()(channel=channel))
+
+    def __new_channel__(self, channels):
+        '''
+        New channel to API (OAuth call credentials) or to `channel_target`.
+        @channels - `grpc` or `grpc.aio` module
+        '''
+        
+        import grpc # google-ads dependency
+        from google.auth.transport.grpc import AuthMetadataPlugin # google-auth
+        from google.auth.transport.requests import Request # google-auth
+        
+        if self.channel_target: return channels.insecure_channel(self.channel_target, options=__CHANNEL_OPTIONS__)
+        credentials = grpc.composite_channel_credentials(grpc.ssl_channel_credentials(), grpc.metadata_call_credentials(AuthMetadataPlugin(self.client.credentials, Request())))
+        return channels.secure_channel(self.client.endpoint or "googleads.googleapis.com", credentials, options=__CHANNEL_OPTIONS__)
+
+    def open_aio_channel(self):
+        '''
+        Async gRPC channel of running event loop (opened on first call in loop), ex: to open it before serving requests.
+        '''
+        
+        import grpc # google-ads dependency
+        import asyncio
+        
+        loop = asyncio.get_running_loop()
+        if self.aio_channel and self.aio_channel[0] is loop: return self.aio_channel[1]
+        self.aio_channel = (loop, channel := self.__new_channel__(grpc.aio))
+        return channel
+
+    def __metadata__(self) -> list:
+        metadata = [("developer-token", self.client.developer_token)]
+        if self.client.login_customer_id: metadata.append(("login-customer-id", str(self.client.login_customer_id)))
+        if self.client.linked_customer_id: metadata.append(("linked-customer-id", str(self.client.linked_customer_id)))
+        return metadata
+
+    def call_bytes(self, service: str, method: str, request, timeout: float | None = None, stage: dict | None = None) -> bytes:
+        '''
+        Call Google Ads API method over sync gRPC channel without google-ads interceptors, response is returned serialized,
+        not parsed (ex: to parse it in other process).
+        @service - service name (ex: `KeywordPlanIdeaService`)
+        @method - method name (ex: `GenerateKeywordIdeas`)
+        @request - request message (from `client.get_type`)
+        @timeout - request timeout in seconds
+        @stage - stage event (see `add_stage_hook`) to set `request_id` of response
+        Raises GoogleAdsException for Google Ads API failures.
+        '''
+        
+        import grpc # google-ads dependency
+        
+        with self.lock:
+            if self.channel is None: self.channel = self.__new_channel__(grpc)
+        call = self.channel.unary_unary(f"/google.ads.googleads.{API_VERSION}.services.{service}/{method}", request_serializer=__to_bytes__)
+        try: response, call = call.with_call(request, metadata=self.__metadata__(), timeout=timeout)
+        except grpc.RpcError as error: raise __as_ads_exception__(self.client, error) from error
+        if stage is not None: stage['request_id'] = dict(tuple(call.initial_metadata() or ()) + tuple(call.trailing_metadata() or ())).get("request-id")
+        return response
+
+    async def acall(self, service: str, method: str, request, response_type: str, timeout: float | None = None, stage: dict | None = None):
+        '''
+        Call Google Ads API method over async gRPC channel (one per event loop).
+        @service - service name (ex: `KeywordPlanIdeaService`)
+        @method - method name (ex: `GenerateKeywordIdeas`)
+        @request - request message (from `client.get_type`)
+        @response_type - response type name (ex: `GenerateKeywordIdeaResponse`)
+        @timeout - request timeout in seconds
+        @stage - stage event (see `add_stage_hook`) to set `request_id` of response
+        Raises GoogleAdsException for Google Ads API failures.
+        '''
+        
+        import grpc # google-ads dependency
+        
+        response_class = type(self.client.get_type(response_type))
+        call = self.open_aio_channel().unary_unary(f"/google.ads.googleads.{API_VERSION}.services.{service}/{method}",
+            request_serializer=__to_bytes__, response_deserializer=lambda data: __from_bytes__(response_class, data))
+        call = call(request, metadata=self.__metadata__(), timeout=timeout)
+        try: response = await call
+        except grpc.aio.AioRpcError as error: raise __as_ads_exception__(self.client, error) from error
+        if stage is not None: stage['request_id'] = dict(tuple(await call.initial_metadata() or ()) + tuple(await call.trailing_metadata() or ())).get("request-id")
+        return response
+
+    async def aclose_aio_channel(self):
+        '''
+        Close async gRPC channel (session stays open, next async call opens new channel).
+        '''
+        
+        if self.aio_channel: await self.aio_channel[1].close()
+        self.aio_channel = None
+
+    async def aclose(self):
+        '''
+        Close async gRPC channel and session.
+        '''
+        
+        await self.aclose_aio_channel()
+        self.close()
+
+    def close(self):
+        '''
+        Close gRPC channels of service stubs and forget session in `get_session` registry.
+        '''
+        
+        if self.closed: return
+        self.closed = True
+        self.aio_channel = None # async channel is closed by `aclose`
+        if self.channel: self.channel.close()
+        self.channel = None
+        for service in [self.ideas_service, self.geo_service, self.ads_service]:
+            if (transport := getattr(service, 'transport', None)) and hasattr(transport, 'close'): transport.close()
+        with __SESSIONS_LOCK__:
+            if self.key and __SESSIONS__.get(self.key) is self: del __SESSIONS__[self.key]
+
+    def __enter__(self): 
+        return self
+
+    def __exit__(self, *args): 
+        self.close()
+
+
+__SESSIONS__ = {}
+__SESSIONS_LOCK__ = threading.Lock()
+
+
+def __session_key__(**kwargs) -> str:
+    '''
+    Credintals source key for `get_session` registry.
+    '''
+    
+    target = f'@{t}' if (t := kwargs.get('channel_target')) else ''
+    if (credintals := kwargs.get('credintals')) and not credintals in ['yaml','file']:
+        if type(credintals) is dict: return 'dict:' + json.dumps(credintals, sort_keys=True, default=str) + target
+        return f'str:{credintals}{target}'
+    return f'file:{Path(kwargs.get("yaml_path",YAML_PATH) or "").resolve()}{target}'
+
+
+def __as_session__(client: "GoogleAdsClient | KeywordPlannerSession") -> KeywordPlannerSession:
+    '''
+    Session of client: one per GoogleAdsClient, kept on the client itself (so it lives as long as client does, 
+    a WeakKeyDictionary would keep client alive by session's reference to it).
+    '''
+    
+    if isinstance(client, KeywordPlannerSession): return client
+    with __SESSIONS_LOCK__:
+        if (session := getattr(client, '__keyword_planner_session__', None)) is None or session.closed: 
+            session = KeywordPlannerSession(client)
+            setattr(client, '__keyword_planner_session__', session)
+    return session
+
+
+def get_session(**kwargs) -> KeywordPlannerSession:
+    '''
+    Get warm KeywordPlannerSession for credintals source (created once, reused by next calls).
+    @kwargs - `yaml_path`, `credintals` (see `get_keyword_ideas`)
+    '''
+    
+    key = __session_key__(**kwargs)
+    with __SESSIONS_LOCK__:
+        if not (session := __SESSIONS__.get(key)): session = __SESSIONS__[key] = KeywordPlannerSession(**kwargs)
+    return session
+
+
+async def aget_session(**kwargs) -> KeywordPlannerSession:
+    '''
+    Async `__session_of__`: warm session is returned at once, new one is built in thread, 
+    so client bootstrap (yaml, credintals, service stubs) does not block event loop.
+    @kwargs - `session`, `credential_pool`, `yaml_path`, `credintals` (see `get_keyword_ideas`)
+    '''
+    
+    import asyncio # only async callers need it (slow import)
+    if kwargs.get('session') or kwargs.get('credential_pool'): return __session_of__(**kwargs)
+    if (session := __SESSIONS__.get(__session_key__(**kwargs))) is not None: return session
+    return await asyncio.to_thread(get_session, **kwargs)
+
+
+def close_sessions():
+    '''
+    Close all sessions created by `get_session`.
+    '''
+    
+    with __SESSIONS_LOCK__: sessions = list(__SESSIONS__.values())
+    for session in sessions: session.close()
+
+
+class PoolAccount:
+    '''
+    Account of CredentialPool: warm session, customer id, own rate limiter and daily quota, load and cooldown state.
+    '''
+    
+    def __init__(self, index: int, name: str, session: KeywordPlannerSession, **kwargs):
+        self.index = index
+        self.name = name
+        self.session = session
+        self.customer_id = kwargs.get('customer_id')
+        self.limiter = RateLimiter(kwargs['qps'], kwargs.get('burst') or RATE_LIMIT_BURST) if kwargs.get('qps') else None
+        self.daily_quota = kwargs.get('daily_quota')
+        self.day, self.used = time.strftime('%Y-%m-%d', time.gmtime()), 0
+        self.inflight, self.requests, self.failures = 0, 0, 0
+        self.cooldown_until = 0.0 # time.monotonic() when account is back in rotation
+        self.error = None
+
+    def remaining(self) -> float:
+        '''
+        Requests left for today (UTC day), inf if no `daily_quota`.
+        '''
+        
+        if (day := time.strftime('%Y-%m-%d', time.gmtime())) != self.day: self.day, self.used = day, 0
+        return float('inf') if self.daily_quota is None else self.daily_quota - self.used
+
+    def snapshot(self) -> dict:
+        return {'name': self.name, 'customer_id': self.customer_id or self.session.client.login_customer_id, 'requests': self.requests, 'inflight': self.inflight, 
+                'failures': self.failures, 'remaining': None if self.daily_quota is None else max(0, self.remaining()),
+                'cooldown_seconds': round(max(0.0, self.cooldown_until - time.monotonic()), 3), 'error': str(self.error)[:300] if self.error else None}
+
+
+class CredentialPool:
+    '''
+    Several Google Ads accounts (one warm KeywordPlannerSession each) to spread requests over their quotas,
+    pass as `credential_pool` kwarg to `get_keyword_ideas`, `aget_keyword_ideas`, `get_keyword_ideas_batch` (every chunk is routed) etc.
+    Account gets out of rotation for a while after quota (RESOURCE_EXHAUSTED) or auth errors, request is repeated on next account.
+    @accounts - list (or comma separated string) of credintals sources: yaml file path, `env`, yaml config string, google-ads config dict,
+                KeywordPlannerSession or dict with POOL_ACCOUNT_KEYS: `yaml_path`|`credintals`|`session`|`client`, `name`, 
+                `customer_id`, `qps` and `burst` (own rate limit), `daily_quota` (requests per UTC day)
+    @strategy - `quota` (most requests left for today, then least loaded), `least_loaded` (fewest requests in flight) or `round_robin`
+    @kwargs:
+       - quota_cooldown - seconds out of rotation after RESOURCE_EXHAUSTED (default POOL_QUOTA_COOLDOWN)
+       - auth_cooldown - seconds out of rotation after auth errors (default POOL_AUTH_COOLDOWN)
+       - max_wait - max seconds to wait for account when all are out of rotation (default POOL_MAX_WAIT)
+       - channel_target - see `KeywordPlannerSession`
+    '''
+    
+    def __init__(self, accounts: str | list, strategy: str = 'quota', **kwargs):
+        if strategy not in POOL_STRATEGIES: raise ValueError(f'Unknown strategy: {strategy} (one of {", ".join(POOL_STRATEGIES)})')
+        if type(accounts) is str: accounts = [a.strip() for a in accounts.split(',') if a.strip()]
+        self.strategy = strategy
+        self.quota_cooldown = POOL_QUOTA_COOLDOWN if kwargs.get('quota_cooldown') is None else kwargs['quota_cooldown']
+        self.auth_cooldown = POOL_AUTH_COOLDOWN if kwargs.get('auth_cooldown') is None else kwargs['auth_cooldown']
+        self.max_wait = POOL_MAX_WAIT if kwargs.get('max_wait') is None else kwargs['max_wait']
+        self.lock = threading.Lock()
+        self.next = 0 # round robin position
+        self.accounts = [self.__account__(n, spec, **kwargs) for n, spec in enumerate(accounts or [])]
+        if not self.accounts: raise ValueError('At least one account is required for credential pool.')
+
+    @staticmethod
+    def __account__(index: int, spec, **kwargs) -> PoolAccount:
+        if isinstance(spec, KeywordPlannerSession): spec = {'session': spec}
+        elif type(spec) is str: spec = {'credintals': 'env'} if spec == 'env' else {'yaml_path': spec} if Path(spec).suffix.lower() in ['.yaml', '.yml'] else {'credintals': spec}
+        elif type(spec) is dict and not set(spec) & set(POOL_ACCOUNT_KEYS): spec = {'credintals': spec} # google-ads config dict
+        common = {k: kwargs[k] for k in ['channel_target'] if k in kwargs}
+        if not (session := spec.get('session')):
+            session = KeywordPlannerSession(spec['client'], **common) if spec.get('client') else get_session(**common, **{k: spec[k] for k in ['yaml_path', 'credintals'] if k in spec})
+        name = spec.get('name') or spec.get('yaml_path') or f'account-{index}'
+        return PoolAccount(index, str(name), session, **{k: spec[k] for k in ['customer_id', 'qps', 'burst', 'daily_quota'] if k in spec})
+
+    def __pick__(self) -> PoolAccount | None:
+        now = time.monotonic()
+        if not (ready := [a for a in self.accounts if a.cooldown_until <= now and a.remaining() > 0]): return None
+        if self.strategy == 'round_robin':
+            account = min(ready, key=lambda a: (a.index - self.next) % len(self.accounts))
+            self.next = account.index + 1
+        elif self.strategy == 'least_loaded': account = min(ready, key=lambda a: (a.inflight, a.requests))
+        else: account = max(ready, key=lambda a: (a.remaining(), -a.inflight, -a.requests))
+        account.inflight += 1
+        account.requests += 1
+        account.used += 1
+        return account
+
+    def __reserve__(self) -> tuple:
+        '''
+        Take account: returns (account, 0) or (None, seconds to wait for next account back in rotation).
+        '''
+        
+        with self.lock:
+            if account := self.__pick__(): return account, 0.0
+            if not (cooling := [a for a in self.accounts if a.remaining() > 0]): raise RuntimeError('Daily quota of all credential pool accounts is used.')
+            soonest = min(cooling, key=lambda a: a.cooldown_until)
+            if (wait := soonest.cooldown_until - time.monotonic()) > self.max_wait: 
+                raise soonest.error or RuntimeError('All credential pool accounts are out of rotation.')
+            return None, max(0.0, wait)
+
+    def acquire(self) -> PoolAccount:
+        '''
+        Take account for request (waits if all accounts are out of rotation), return it with `release`.
+        '''
+        
+        while (reserved := self.__reserve__())[0] is None: time.sleep(reserved[1])
+        return reserved[0]
+
+    async def aacquire(self) -> PoolAccount:
+        import asyncio # only async callers need it (slow import)
+        while (reserved := self.__reserve__())[0] is None: await asyncio.sleep(reserved[1])
+        return reserved[0]
+
+    def release(self, account: PoolAccount, error: Exception | None = None) -> bool:
+        '''
+        Return account after request, returns True if account is out of rotation because of `error` (quota or auth).
+        '''
+        
+        status = __retry_status__(error) if error is not None else None
+        if status == 'RESOURCE_EXHAUSTED': cooldown = max(self.quota_cooldown, __retry_delay__(account.session, error, 0))
+        elif status in POOL_AUTH_STATUSES or type(error).__name__ == 'RefreshError': cooldown = self.auth_cooldown # google.auth RefreshError
+        else: cooldown = None
+        with self.lock:
+            account.inflight -= 1
+            if error is not None: 
+                account.failures += 1
+                account.error = error
+            if cooldown is not None: account.cooldown_until = max(account.cooldown_until, time.monotonic() + cooldown)
+        return cooldown is not None
+
+    def __options__(self, account: PoolAccount, kwargs: dict) -> dict:
+        options = {k: v for k, v in kwargs.items() if k != 'credential_pool'}
+        options.update({'session': account.session, 'customer_id': account.customer_id or account.session.client.login_customer_id})
+        if account.limiter: options['rate_limiter'] = account.limiter
+        if len(self.accounts) > 1 and kwargs.get('retry_statuses') is None: # quota: next account instead of waiting
+            options['retry_statuses'] = [s for s in RETRY_STATUSES if s != 'RESOURCE_EXHAUSTED']
+        return options
+
+    def run(self, call, /, **kwargs):
+        '''
+        Returns `call(**kwargs)` made with account kwargs (`session`, `customer_id`, `rate_limiter`), on quota or auth error repeats it on next account.
+        '''
+        
+        for attempt in range(len(self.accounts)):
+            account = self.acquire()
+            try: res = call(**self.__options__(account, kwargs))
+            except Exception as error:
+                if not self.release(account, error) or attempt + 1 >= len(self.accounts): raise
+                continue
+            self.release(account)
+            return res
+
+    async def arun(self, call, /, **kwargs):
+        '''
+        Async `run`, `call` returns awaitable.
+        '''
+        
+        for attempt in range(len(self.accounts)):
+            account = await self.aacquire()
+            try: res = await call(**self.__options__(account, kwargs))
+            except Exception as error:
+                if not self.release(account, error) or attempt + 1 >= len(self.accounts): raise
+                continue
+            self.release(account)
+            return res
+
+    def session(self) -> KeywordPlannerSession:
+        '''
+        Session of first account in rotation (for geo and language lookups).
+        '''
+        
+        now = time.monotonic()
+        return next((a.session for a in self.accounts if a.cooldown_until <= now), self.accounts[0].session)
+
+    def stats(self) -> list:
+        '''
+        Accounts state: name, customer_id, requests, inflight, failures, remaining (daily quota), cooldown_seconds, error.
+        '''
+        
+        with self.lock: return [a.snapshot() for a in self.accounts]
+
+
+def __session_of__(**kwargs) -> KeywordPlannerSession:
+    '''
+    Session from `session`, `credential_pool` or `get_session` kwargs.
+    '''
+    
+    if session := kwargs.get('session'): return session
+    if pool := kwargs.get('credential_pool'): return pool.session()
+    return get_session(**kwargs)
+
+
+def __collect_params__(session: "KeywordPlannerSession", geos: str | list, lang: str, keywords: str | list | None, page_url: str | None, /, **kwargs) -> tuple:
+    '''
+    Collect search parameters: returns (customer_id, geo_targets, language_id).
+    '''
+    
+    customer_id = kwargs.get('customer_id') or session.client.login_customer_id
+    if 'geo_targets' in kwargs: geos = kwargs['geo_targets'] # already resolved by caller
+    else:
+        with __stage__('geo_resolve', **kwargs) as event:
+            geos = get_geo_targets(session, geos, **{k: kwargs[k] for k in ['geo_cache', 'max_retries', 'rate_limiter'] if k in kwargs})
+            event['geos'] = len(geos or [])
+    geos = geos or ([] if kwargs.get('with_null_geos') == True else __map_locations_ids_to_resource_names__(session, DEFAULT_LOCATION_IDS))
+    if geos: geos = list(set(geos))
+    with __stage__('lang_lookup', **kwargs) as event:
+        lang = event['lang'] = get_lang_code(lang) or (None if kwargs.get('with_null_lang') == True else DEFAULT_LANGUAGE_ID) 
+    
+    # pass out parameters
+    if (pr := kwargs.get('proccessing')) and type(pr) is dict: 
+        pr['customer_id'] = customer_id
+        pr['geos'] = geos
+        pr['lang'] = lang
+        pr['keywords'] = keywords
+        pr['page_url'] = page_url
+        
+    return customer_id, geos, lang
+
+
+TABLE_COLUMNS = ["Keyword", "Avg Monthly Searches", "Competition Level", "Competition Index", "Searches Past Months", "Past Months", "List Annotations", "PBM Lo Top", "PBM Hi Top"]
+
+
+def __ideas_to_columns__(ideas, with_months: bool = True) -> dict:
+    '''
+    Read ideas metrics in one pass to columns (numpy arrays for numbers), all output formats are built from them.
+    @with_months - read monthly searches and annotations (not needed for `compact` and `text`)
+    Returns dict:
+     - keyword, comp_level (interned str), annotations - lists
+     - avg_monthly_searches, comp_index, low_top_of_page_bid_micros, high_top_of_page_bid_micros - int64 arrays
+     - months - shared months axis (`YYYY-MM`), searches - int64 matrix [idea, month] (-1 if no data for month)
+     - uniform - True if all ideas have searches for all months of axis
+    '''
+    
+    import numpy as np
+    
+    keywords, comp_levels, numbers, annotations, rows_volumes, rows_searches, rows_spans = [], [], [], [], [], [], []
+    levels = {} # competition enum -> str
+    for idea in ideas:
+        metrics = idea.keyword_idea_metrics
+        keywords.append(idea.text)
+        level = metrics.competition
+        comp_levels.append(levels.get(level) or levels.setdefault(level, str(level)))
+        numbers.append((metrics.avg_monthly_searches, metrics.competition_index, metrics.low_top_of_page_bid_micros, metrics.high_top_of_page_bid_micros))
+        if not with_months: continue
+        volumes = metrics.monthly_search_volumes
+        rows_volumes.append(volumes)
+        rows_searches.append([y.monthly_searches for y in volumes])
+        # months go in a row, so same first, last and count means same months
+        rows_spans.append((volumes[0].year, volumes[0].month, volumes[-1].year, volumes[-1].month, len(volumes)) if volumes else None)
+        concepts = idea.keyword_annotations.concepts
+        annotations.append([y.concept_group.name for y in concepts] if concepts else [])
+
+    count = len(keywords)
+    numbers = np.array(numbers, dtype=np.int64).reshape(count, 4)
+    if (uniform := len(spans := set(rows_spans)) <= 1): # as usual all ideas have same months
+        axis = tuple([(y.year, y.month) for y in rows_volumes[0]]) if spans and rows_volumes[0] else ()
+        searches = np.array(rows_searches, dtype=np.int64).reshape(count if with_months else 0, len(axis))
+    else:
+        rows_months = [[(y.year, y.month) for y in volumes] for volumes in rows_volumes]
+        axis = tuple(sorted(set([m for months in rows_months for m in months])))
+        index = {m: i for i, m in enumerate(axis)}
+        searches = np.full((count, len(axis)), -1, dtype=np.int64)
+        for row, (months, values) in enumerate(zip(rows_months, rows_searches)):
+            if months: searches[row, [index[m] for m in months]] = values
+    
+    return {
+        "keyword":      keywords,
+        "avg_monthly_searches": numbers[:, 0],
+        "comp_level":   comp_levels,
+        "comp_index":   numbers[:, 1],
+        "months":       [f'{year}-{str(month-1).zfill(2)}' for year, month in axis],
+        "searches":     searches,
+        "annotations":  annotations,
+        "low_top_of_page_bid_micros": numbers[:, 2],
+        "high_top_of_page_bid_micros": numbers[:, 3], 
+        "uniform":      uniform, }
+
+
+def __columns_searches__(columns: dict) -> tuple:
+    '''
+    Per idea searches and months lists from columns: returns (searches, past_months).
+    '''
+    
+    months, matrix = columns['months'], columns['searches']
+    if columns['uniform']: return matrix.tolist(), [list(months) for _ in range(len(matrix))]
+    searches, past_months = [], []
+    for row in matrix.tolist():
+        searches.append([v for v in row if v >= 0])
+        past_months.append([m for m, v in zip(months, row) if v >= 0])
+    return searches, past_months
+
+
+def __columns_to_table__(columns: dict):
+    import pandas as pd
+    
+    searches, past_months = __columns_searches__(columns)
+    if columns['uniform']: past_months = [', '.join(columns['months'])] * len(searches)
+    else: past_months = [', '.join(m) for m in past_months]
+    return pd.DataFrame({
+        "Keyword":              columns['keyword'], 
+        "Avg Monthly Searches": columns['avg_monthly_searches'], 
+        "Competition Level":    columns['comp_level'], 
+        "Competition Index":    columns['comp_index'], 
+        "Searches Past Months": [', '.join(map(str, row)) for row in searches], 
+        "Past Months":          past_months, 
+        "List Annotations":     [', '.join(a) for a in columns['annotations']], 
+        "PBM Lo Top":           columns['low_top_of_page_bid_micros'], 
+        "PBM Hi Top":           columns['high_top_of_page_bid_micros'], 
+        **{title: columns[k] for k, title in TREND_COLUMNS.items() if k in columns}, }, columns=TABLE_COLUMNS + [title for k, title in TREND_COLUMNS.items() if k in columns])
+
+
+def __columns_to_dicts__(columns: dict) -> list:
+    searches, past_months = __columns_searches__(columns)
+    if trends := [k for k in TREND_COLUMNS if k in columns]: # derived metrics (NaN - None)
+        values = list(zip(*[[None if v != v else v for v in columns[k].tolist()] for k in trends]))
+        return [{**row, **dict(zip(trends, row_trends))} for row, row_trends in zip(__columns_to_dicts__({k: v for k, v in columns.items() if k not in trends}), values)]
+    return [{
+        "keyword":      keyword, 
+        "avg_monthly_searches": avg, 
+        "comp_level":   level, 
+        "comp_index":   index, 
+        "searches":     row_searches, 
+        "past_months":  row_months, 
+        "annotations":  list(annotations),
+        "low_top_of_page_bid_micros": lo,
+        "high_top_of_page_bid_micros": hi, } for keyword, avg, level, index, row_searches, row_months, annotations, lo, hi in zip(
+            columns['keyword'], columns['avg_monthly_searches'].tolist(), columns['comp_level'], columns['comp_index'].tolist(), 
+            searches, past_months, columns['annotations'], columns['low_top_of_page_bid_micros'].tolist(), columns['high_top_of_page_bid_micros'].tolist())]
+
+
+def __columns_to_compact__(columns: dict) -> list:
+    return [{
+        "keyword":      keyword, 
+        "avg_monthly_searches": avg, 
+        "comp_level":   level, 
+        "comp_index":   index, } for keyword, avg, level, index in zip(
+            columns['keyword'], columns['avg_monthly_searches'].tolist(), columns['comp_level'], columns['comp_index'].tolist())]
+
+
+def __columns_to_text__(columns: dict) -> str:
+    return ''.join([f'- "{keyword}" has "{avg}" avg monthly searches & "{level}" competition.\n' 
+        for keyword, avg, level in zip(columns['keyword'], columns['avg_monthly_searches'].tolist(), columns['comp_level'])])
+
+
+def __ideas_to_text__(ideas) -> list:
+    '''
+    Ideas to `text` lines in one pass (same as `__columns_to_text__`, without columns): competition enum is formatted once per level.
+    '''
+    
+    levels = {} # competition enum -> str
+    lines = []
+    for idea in ideas:
+        metrics = idea.keyword_idea_metrics
+        level = metrics.competition
+        lines.append(f'- "{idea.text}" has "{metrics.avg_monthly_searches}" avg monthly searches & "{levels.get(level) or levels.setdefault(level, str(level))}" competition.\n')
+    return lines
+
+
+def __columns_trends__(columns: dict) -> dict:
+    '''
+    Derived metrics of monthly searches for all ideas at once (float64 arrays, NaN if not enough months):
+     - yoy - last month of axis vs same month year before (needs 13 months of data), as fraction (0.25 is +25%)
+     - three_month - last month vs 3 months before, as fraction
+     - trend - least squares slope of monthly searches divided by mean (growth per month, as fraction)
+     - seasonality - coefficient of variation of monthly searches (std / mean)
+     - peak_month - month number (1-12) with most searches (0 - no data)
+    '''
+    
+    import numpy as np
+    
+    months, matrix = columns['months'], columns['searches']
+    count = len(columns['keyword'])
+    if len(matrix) != count or not months: # no monthly searches read
+        nan = np.full(count, np.nan)
+        return {'yoy': nan, 'three_month': nan.copy(), 'trend': nan.copy(), 'seasonality': nan.copy(), 'peak_month': np.zeros(count, dtype=np.int64)}
+    
+    valid = matrix >= 0
+    values = np.where(valid, matrix, 0).astype(np.float64)
+    index = {m: i for i, m in enumerate(months)}
+    year, month = int(months[-1][:4]), int(months[-1][5:7])
+    
+    def change(back: int):
+        y, m = divmod(year * 12 + month - 1 - back, 12)
+        if (col := index.get(f'{y}-{str(m + 1).zfill(2)}')) is None: return np.full(count, np.nan)
+        base = np.where(valid[:, col], values[:, col], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'): 
+            return np.where(valid[:, -1] & (base > 0), values[:, -1] / base - 1, np.nan)
+    
+    n = valid.sum(axis=1)
+    x = np.arange(len(months), dtype=np.float64)
+    sx, sy = (valid * x).sum(axis=1), values.sum(axis=1)
+    sxx, sxy, syy = (valid * x * x).sum(axis=1), (values * x).sum(axis=1), (values * values).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sy / n
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        trend = np.where((n >= 2) & (mean > 0), slope / mean, np.nan)
+        seasonality = np.where((n >= 2) & (mean > 0), np.sqrt(np.maximum(syy / n - mean * mean, 0)) / mean, np.nan)
+    month_numbers = np.array([int(m[5:7]) for m in months], dtype=np.int64)
+    peak_month = np.where(n > 0, month_numbers[np.where(valid, matrix, -1).argmax(axis=1)], 0)
+    return {'yoy': change(12), 'three_month': change(3), 'trend': trend, 'seasonality': seasonality, 'peak_month': peak_month}
+
+
+def __sort_columns__(**kwargs) -> list:
+    sort_by = kwargs.get('sort_by') or []
+    return [k.strip().lstrip('-') for k in (sort_by.split(',') if type(sort_by) is str else sort_by) if k.strip()]
+
+
+def __needs_months__(**kwargs) -> bool:
+    '''
+    True if filter kwargs need monthly searches (trend metrics).
+    '''
+    
+    return bool(kwargs.get('trends')) or any(kwargs.get(f'{b}_{k}') is not None for k in ['yoy', 'trend', 'seasonality'] for b in ['min', 'max']) or bool(set(__sort_columns__(**kwargs)) & set(TREND_COLUMNS))
+
+
+def __history_months__(**kwargs) -> int:
+    '''
+    Months of monthly searches to request: `history_months` kwarg, at least TREND_HISTORY_MONTHS if `yoy` is filtered, sorted by 
+    or added with `trends` (same month a year before is out of API default 12 months), 0 - by API default.
+    '''
+    
+    months = int(kwargs.get('history_months') or 0)
+    if kwargs.get('trends') or kwargs.get('min_yoy') is not None or kwargs.get('max_yoy') is not None or 'yoy' in __sort_columns__(**kwargs): 
+        months = max(months, TREND_HISTORY_MONTHS)
+    return min(months, MAX_HISTORY_MONTHS)
+
+
+def __filter_columns__(columns: dict, **kwargs) -> dict:
+    '''
+    Filter and rank ideas columns (see `__ideas_to_columns__`) with vectorized operations, before any output format is built.
+    @kwargs (see FILTER_KWARGS):
+       - min_searches, max_searches - avg monthly searches range
+       - min_comp_index, max_comp_index - competition index range (0-100)
+       - min_bid_micros, max_bid_micros - high top of page bid range (micros)
+       - min_yoy, max_yoy, min_trend, max_trend, min_seasonality, max_seasonality - derived metrics ranges (see `__columns_trends__`)
+       - include, exclude - substrings (list or comma separated, case insensitive): keep ideas with any of `include` and none of `exclude`
+       - include_regex, exclude_regex - regular expressions (case insensitive) for same
+       - sort_by - column or list of columns of SORT_COLUMNS (`-` prefix - descending), ex: `-avg_monthly_searches` or `-yoy,keyword`
+       - top - keep first N ideas (after sort)
+       - trends - add derived metrics columns to results
+    '''
+    
+    import numpy as np
+    
+    if not any(kwargs.get(k) is not None for k in FILTER_KWARGS) or not columns['keyword']: return columns
+    if unknown := [k for k in __sort_columns__(**kwargs) if k not in SORT_COLUMNS]: 
+        raise ValueError(f"Unknown sort_by column(s): {', '.join(unknown)}; valid: {', '.join(SORT_COLUMNS)}")
+    columns = {**columns, **(__columns_trends__(columns) if __needs_months__(**kwargs) else {})}
+    mask = np.ones(len(columns['keyword']), dtype=bool)
+    for name, column in [('searches', 'avg_monthly_searches'), ('comp_index', 'comp_index'), ('bid_micros', 'high_top_of_page_bid_micros'), 
+                         ('yoy', 'yoy'), ('trend', 'trend'), ('seasonality', 'seasonality')]:
+        if (low := kwargs.get(f'min_{name}')) is not None: mask &= columns[column] >= low # NaN never passes
+        if (high := kwargs.get(f'max_{name}')) is not None: mask &= columns[column] <= high
+    
+    split = lambda value: [v.strip() for v in (value.split(',') if type(value) is str else value) if v.strip()]
+    patterns = {k: v for k, v in {
+        'include': '|'.join([re.escape(v) for v in split(kwargs.get('include') or [])]) or None,
+        'exclude': '|'.join([re.escape(v) for v in split(kwargs.get('exclude') or [])]) or None,
+        'include_regex': kwargs.get('include_regex'), 'exclude_regex': kwargs.get('exclude_regex'), }.items() if v}
+    if patterns:
+        import pandas as pd
+        keywords = pd.Series(columns['keyword'], dtype=object)
+        for k, pattern in patterns.items():
+            found = keywords.str.contains(pattern, case=False, regex=True, na=False).to_numpy(dtype=bool)
+            mask &= found if k.startswith('include') else ~found
+    indexes = np.flatnonzero(mask)
+    
+    if sort_by := kwargs.get('sort_by'):
+        keys = []
+        for name in reversed(split(sort_by)): # np.lexsort: last key is primary (names are checked above)
+            values = np.asarray(columns[name.lstrip('-')])[indexes]
+            if name.startswith('-'): values = -values if values.dtype.kind in 'if' else -np.unique(values, return_inverse=True)[1]
+            keys.append(values)
+        indexes = indexes[np.lexsort(keys)]
+    if (top := kwargs.get('top')) is not None: indexes = indexes[:int(top)]
+    
+    res, selected = dict(columns), indexes.tolist()
+    for k, v in columns.items():
+        if k in ['months', 'uniform'] or len(v) != len(mask): continue # axis, flag and empty `annotations`, `searches` (no months read)
+        if type(v) is list: res[k] = [v[i] for i in selected]
+        else: res[k] = v[indexes] # numpy arrays, rows of `searches` matrix
+    if (pr := kwargs.get('proccessing')) and type(pr) is dict: pr['filtered'] = f'{len(indexes)} of {len(mask)}'
+    return res
+
+
+class KeywordIdea(Mapping):
+    '''
+    Read only idea of KeywordIdeas: dict-like (`idea['keyword']`, `idea.get(...)`, `dict(idea)`, `idea == {...}`) 
+    and attribute access (`idea.keyword`), same keys and values as `dict` format.
+    '''
+    
+    __slots__ = ('ideas', 'index')
+    
+    def __init__(self, ideas: "KeywordIdeas", index: int):
+        self.ideas = ideas
+        self.index = index
+
+    def __getitem__(self, key: str):
+        if (field := __IDEA_FIELDS__.get(key)) is None: raise KeyError(key)
+        return field(self.ideas, self.index)
+
+    def __getattr__(self, name: str):
+        if (field := __IDEA_FIELDS__.get(name)) is None: raise AttributeError(name)
+        return field(self.ideas, self.index)
+
+    def __iter__(self): 
+        return iter(__IDEA_FIELDS__)
+
+    def __len__(self): 
+        return len(__IDEA_FIELDS__)
+
+    def __repr__(self): 
+        return repr(dict(self))
+
+
+class KeywordIdeas(Sequence):
+    '''
+    Compact ideas container (`out_as='ideas'`), struct of arrays instead of dict per idea:
+     - avg_monthly_searches, comp_index, bids - numpy int64 arrays
+     - searches - numpy int64 matrix [idea, month] on one months axis for all ideas (-1 if no data for month)
+     - comp_codes - numpy uint8 codes of shared competition level strings `comp_levels`
+     - annotations - tuples (one shared empty tuple for ideas without annotations)
+    Items are KeywordIdea views with `dict` format keys, so code for `dict` format keeps working.
+    @columns - see `__ideas_to_columns__` (None - no ideas)
+    '''
+    
+    __slots__ = ('keyword', 'avg_monthly_searches', 'comp_codes', 'comp_levels', 'comp_index', 'months', 'searches', 'annotations', 
+                 'low_top_of_page_bid_micros', 'high_top_of_page_bid_micros', 'uniform')
+    
+    def __init__(self, columns: dict | None = None):
+        import numpy as np
+        
+        count = len(columns['keyword']) if columns else 0
+        self.keyword = list(columns['keyword']) if columns else []
+        self.comp_levels = tuple(sorted(set(columns['comp_level']))) if columns else ()
+        codes = {level: code for code, level in enumerate(self.comp_levels)}
+        self.comp_codes = np.array([codes[level] for level in columns['comp_level']] if columns else [], dtype=np.uint8)
+        for name in ['avg_monthly_searches', 'comp_index', 'low_top_of_page_bid_micros', 'high_top_of_page_bid_micros']:
+            setattr(self, name, np.asarray(columns[name], dtype=np.int64) if columns else np.zeros(0, dtype=np.int64))
+        self.months = tuple(columns['months']) if columns else ()
+        self.searches = columns['searches'] if columns and len(columns['searches']) == count else np.zeros((count, 0), dtype=np.int64)
+        self.annotations = [tuple(a) if a else () for a in columns['annotations']] if columns and columns['annotations'] else [()] * count
+        self.uniform = columns['uniform'] if columns else True
+
+    def __len__(self) -> int:
+        return len(self.keyword)
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice): return self.take(range(*index.indices(len(self))))
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self): raise IndexError('KeywordIdeas index out of range')
+        return KeywordIdea(self, index)
+
+    def __repr__(self) -> str:
+        return f'KeywordIdeas({len(self)} ideas, {len(self.months)} months)'
+
+    def take(self, indexes) -> "KeywordIdeas":
+        '''
+        New container with ideas at `indexes` (list, range or numpy array of positions or bool mask).
+        '''
+        
+        import numpy as np
+        
+        indexes = np.asarray(indexes)
+        indexes = np.flatnonzero(indexes) if indexes.dtype == bool else indexes.astype(np.int64)
+        res = object.__new__(KeywordIdeas)
+        res.keyword = [self.keyword[i] for i in indexes.tolist()]
+        res.annotations = [self.annotations[i] for i in indexes.tolist()]
+        for name in ['avg_monthly_searches', 'comp_codes', 'comp_index', 'searches', 'low_top_of_page_bid_micros', 'high_top_of_page_bid_micros']:
+            setattr(res, name, getattr(self, name)[indexes])
+        res.comp_levels, res.months = self.comp_levels, self.months
+        res.uniform = self.uniform or bool((res.searches >= 0).all())
+        return res
+
+    def columns(self) -> dict:
+        '''
+        Ideas as columns (see `__ideas_to_columns__`).
+        '''
+        
+        return {
+            "keyword":      self.keyword,
+            "avg_monthly_searches": self.avg_monthly_searches,
+            "comp_level":   [self.comp_levels[code] for code in self.comp_codes.tolist()],
+            "comp_index":   self.comp_index,
+            "months":       list(self.months),
+            "searches":     self.searches,
+            "annotations":  self.annotations,
+            "low_top_of_page_bid_micros": self.low_top_of_page_bid_micros,
+            "high_top_of_page_bid_micros": self.high_top_of_page_bid_micros, 
+            "uniform":      self.uniform, }
+
+    def to_dicts(self) -> list:
+        '''
+        Ideas in `dict` format (list of dict).
+        '''
+        
+        return __columns_to_dicts__(self.columns())
+
+    def to_table(self):
+        '''
+        Ideas in `table` format (pandas dataFrame).
+        '''
+        
+        return __columns_to_table__(self.columns())
+
+    @staticmethod
+    def concat(items: list) -> "KeywordIdeas":
+        '''
+        One container from several (ex: results of many runs), months axes are merged.
+        '''
+        
+        import numpy as np
+        
+        items = [item for item in items if len(item)]
+        if not items: return KeywordIdeas()
+        months = tuple(sorted(set([m for item in items for m in item.months])))
+        index = {m: i for i, m in enumerate(months)}
+        levels = tuple(sorted(set([level for item in items for level in item.comp_levels])))
+        codes = {level: code for code, level in enumerate(levels)}
+        res = object.__new__(KeywordIdeas)
+        res.keyword = [kw for item in items for kw in item.keyword]
+        res.annotations = [a for item in items for a in item.annotations]
+        for name in ['avg_monthly_searches', 'comp_index', 'low_top_of_page_bid_micros', 'high_top_of_page_bid_micros']:
+            setattr(res, name, np.concatenate([getattr(item, name) for item in items]))
+        res.comp_codes = np.concatenate([np.array([codes[level] for level in item.comp_levels], dtype=np.uint8)[item.comp_codes] if item.comp_levels else item.comp_codes for item in items])
+        res.comp_levels, res.months = levels, months
+        res.searches = np.full((len(res.keyword), len(months)), -1, dtype=np.int64)
+        row = 0
+        for item in items:
+            res.searches[row:row + len(item), [index[m] for m in item.months]] = item.searches
+            row += len(item)
+        res.uniform = bool((res.searches >= 0).all())
+        return res
+
+
+def __idea_searches__(ideas: KeywordIdeas, i: int) -> list:
+    row = ideas.searches[i].tolist()
+    return row if ideas.uniform else [v for v in row if v >= 0]
+
+
+def __idea_months__(ideas: KeywordIdeas, i: int) -> list:
+    if ideas.uniform: return list(ideas.months)
+    return [m for m, v in zip(ideas.months, ideas.searches[i].tolist()) if v >= 0]
+
+
+# KeywordIdea keys (as `dict` format) -> value getter
+__IDEA_FIELDS__ = {
+    "keyword":      lambda ideas, i: ideas.keyword[i],
+    "avg_monthly_searches": lambda ideas, i: int(ideas.avg_monthly_searches[i]),
+    "comp_level":   lambda ideas, i: ideas.comp_levels[ideas.comp_codes[i]],
+    "comp_index":   lambda ideas, i: int(ideas.comp_index[i]),
+    "searches":     __idea_searches__,
+    "past_months":  __idea_months__,
+    "annotations":  lambda ideas, i: list(ideas.annotations[i]),
+    "low_top_of_page_bid_micros": lambda ideas, i: int(ideas.low_top_of_page_bid_micros[i]),
+    "high_top_of_page_bid_micros": lambda ideas, i: int(ideas.high_top_of_page_bid_micros[i]), }
+
+
+class IdeasExporter:
+    '''
+    Incremental ideas writer to JSON lines (append mode), parquet and arrow IPC files; parquet and arrow need `pyarrow`.
+    Columns are typed: numbers as int64, `searches`, `past_months`, `annotations` as lists.
+    @jsonl_file, @parquet_file, @arrow_file - output files (None - skip)
+    @export_extra - dict of constant columns added to each row
+    '''
+    
+    def __init__(self, jsonl_file: str | None = None, parquet_file: str | None = None, arrow_file: str | None = None, export_extra: dict | None = None, **kwargs):
+        self.extra = dict(export_extra or {})
+        self.jsonl = open(jsonl_file, 'a', encoding='utf-8') if jsonl_file else None
+        self.parquet_file, self.arrow_file = parquet_file, arrow_file
+        self.parquet = self.arrow = self.schema = None
+        self.count = 0
+
+    def __schema__(self):
+        import pyarrow as pa # optional: pip install pyarrow
+        
+        if self.schema is None:
+            self.schema = pa.schema([
+                ("keyword", pa.string()), ("avg_monthly_searches", pa.int64()), ("comp_level", pa.string()), ("comp_index", pa.int64()),
+                ("searches", pa.list_(pa.int64())), ("past_months", pa.list_(pa.string())), ("annotations", pa.list_(pa.string())),
+                ("low_top_of_page_bid_micros", pa.int64()), ("high_top_of_page_bid_micros", pa.int64()), ] + 
+                [(k, pa.string()) for k in self.extra])
+        return self.schema
+
+    def write_columns(self, columns: dict, extra: dict | None = None):
+        '''
+        Write ideas columns (see `__ideas_to_columns__`).
+        @extra - values of `export_extra` columns for these ideas
+        '''
+        
+        if not columns['keyword']: return
+        searches, past_months = __columns_searches__(columns)
+        self.__write__({
+            "keyword": columns['keyword'], "avg_monthly_searches": columns['avg_monthly_searches'], "comp_level": columns['comp_level'], 
+            "comp_index": columns['comp_index'], "searches": searches, "past_months": past_months, "annotations": columns['annotations'],
+            "low_top_of_page_bid_micros": columns['low_top_of_page_bid_micros'], "high_top_of_page_bid_micros": columns['high_top_of_page_bid_micros'], }, extra)
+
+    def write_rows(self, rows: list, extra: dict | None = None):
+        '''
+        Write ideas as dicts (`dict` format of `get_keyword_ideas`).
+        @extra - values of `export_extra` columns for these ideas
+        '''
+        
+        if not rows: return
+        names = ["keyword", "avg_monthly_searches", "comp_level", "comp_index", "searches", "past_months", "annotations", "low_top_of_page_bid_micros", "high_top_of_page_bid_micros"]
+        self.__write__({name: [row.get(name) for row in rows] for name in names}, extra)
+
+    def __write__(self, data: dict, extra: dict | None = None):
+        count = len(data['keyword'])
+        for k, v in self.extra.items(): 
+            v = (extra or {}).get(k, v)
+            data[k] = [None if v is None else str(v)] * count
+        if self.jsonl:
+            lists = {k: v.tolist() if hasattr(v, 'tolist') else v for k, v in data.items()}
+            self.jsonl.write(''.join([json.dumps(dict(zip(lists, row)), ensure_ascii=False) + '\n' for row in zip(*lists.values())]))
+            self.jsonl.flush()
+        if self.parquet_file or self.arrow_file:
+            import pyarrow as pa # optional: pip install pyarrow
+            import pyarrow.parquet as pq
+            
+            batch = pa.record_batch([pa.array(data[field.name], type=field.type) for field in self.__schema__()], schema=self.__schema__())
+            if self.parquet_file:
+                if self.parquet is None: self.parquet = pq.ParquetWriter(self.parquet_file, self.__schema__())
+                self.parquet.write_batch(batch)
+            if self.arrow_file:
+                if self.arrow is None: self.arrow = pa.ipc.new_file(self.arrow_file, self.__schema__())
+                self.arrow.write_batch(batch)
+        self.count += count
+
+    def close(self):
+        if self.jsonl: self.jsonl.close()
+        if self.parquet: self.parquet.close()
+        if self.arrow: self.arrow.close()
+        self.jsonl = self.parquet = self.arrow = None
+
+    def __enter__(self): 
+        return self
+
+    def __exit__(self, *args): 
+        self.close()
+
+
+def export_keyword_ideas(ideas, **kwargs) -> int:
+    '''
+    Write ideas stream to files batch by batch, without building whole result in memory.
+    @ideas - iterable of ideas: dicts (ex: `iter_keyword_ideas(..., out_as='dict')`) or GenerateKeywordIdeaResult
+    @kwargs:
+       - jsonl_file, parquet_file, arrow_file, export_extra - see `IdeasExporter`
+       - batch_size - ideas per written batch (default EXPORT_BATCH_SIZE)
+    Returns number of written ideas.
+    '''
+    
+    batch_size = max(1, int(kwargs.get('batch_size') or EXPORT_BATCH_SIZE))
+    with IdeasExporter(**kwargs) as exporter:
+        batch = []
+        for idea in ideas:
+            batch.append(idea)
+            if len(batch) >= batch_size:
+                __export_batch__(exporter, batch)
+                batch = []
+        __export_batch__(exporter, batch)
+        return exporter.count
+
+
+def __export_batch__(exporter: IdeasExporter, batch: list):
+    if not batch: return
+    if isinstance(batch[0], dict): exporter.write_rows(batch)
+    else: exporter.write_columns(__ideas_to_columns__(batch))
+
+
+def __convert_ideas__(list_keywords, **kwargs):
+    '''
+    Convert GenerateKeywordIdeas response to `out_as` format (see `get_keyword_ideas`).
+    '''
+    
+    out_as = kwargs.get('out_as', DEFAULT_IDEAS_OUT_AS)
+    exports = any([kwargs.get(k) for k in EXPORT_KWARGS])
+    if not list_keywords or (out_as not in IDEAS_OUT_AS and not exports): return list_keywords # google response as is (bad format)
+    with __stage__('convert', **kwargs) as event:
+        if out_as == 'text' and not exports and not any(kwargs.get(k) is not None for k in FILTER_KWARGS): # no columns needed, one pass to str
+            lines = __ideas_to_text__(__all_ideas__(list_keywords)) if list_keywords.total_size != 0 else []
+            event.update({'out_as': out_as, 'ideas': len(lines)})
+            return ''.join(lines)
+        columns = __ideas_to_columns__(__all_ideas__(list_keywords), exports or out_as not in ['compact', 'text'] or __needs_months__(**kwargs)) if list_keywords.total_size != 0 else None
+        if columns is not None: columns = __filter_columns__(columns, **kwargs)
+        res = __columns_to_out_as__(columns, **kwargs) if out_as in IDEAS_OUT_AS else list_keywords
+        event.update({'out_as': out_as, 'ideas': 0 if columns is None else len(columns['keyword'])})
+    
+    files = [kwargs[k] for k in (EXPORT_KWARGS if exports else []) + (['excel_file', 'csv_file', 'html_file'] if out_as == 'table' else []) if kwargs.get(k)]
+    if files and columns is not None:
+        with __stage__('export', **kwargs) as event:
+            event.update({'files': ', '.join(str(f) for f in files), 'ideas': len(columns['keyword'])})
+            if exports:
+                with IdeasExporter(**kwargs) as exporter: exporter.write_columns(columns)
+            if out_as == 'table': 
+                if s2 := kwargs.get('excel_file'): res.to_excel(s2, header=True, index=False)
+                if s2 := kwargs.get('csv_file'): res.to_csv(s2, index=False)
+                if s2 := kwargs.get('html_file'): res.to_html(s2, index=False)
+    return res
+
+
+def __columns_to_out_as__(columns: dict | None, **kwargs):
+    '''
+    Ideas columns (None - no ideas) to `out_as` format (see `get_keyword_ideas`).
+    '''
+    
+    out_as = kwargs.get('out_as', DEFAULT_IDEAS_OUT_AS)
+    if out_as == 'table': # as table grid (for console or sav to excel|csv|html)
+        import pandas as pd
+        if columns is None: return pd.DataFrame()
+        df = __columns_to_table__(columns)
+        if kwargs.get('shortly', False) == True:
+            pd.set_option('display.max_rows', None)
+            pd.set_option('display.max_columns', None)
+            pd.set_option('display.width', 200)
+            pd.set_option('display.max_colwidth', None)
+            setattr(df, 'shortly', df.loc[:,["Keyword", "Avg Monthly Searches", "Competition Level", "Competition Index", "PBM Lo Top", "PBM Hi Top"] + [c for c in TREND_COLUMNS.values() if c in df]])
+        return df
+    
+    if out_as in ['dict','list']: # optimized dict array
+        return __columns_to_dicts__(columns) if columns is not None else None
+    
+    if out_as == 'compact': # compact optimized dict array
+        return __columns_to_compact__(columns) if columns is not None else None
+    
+    if out_as == 'text': # text, keyword with info perline (for console)
+        return __columns_to_text__(columns) if columns is not None else ''
+    
+    if out_as == 'ideas': # compact container (struct of arrays)
+        return KeywordIdeas(columns)
+
+
+def get_keyword_ideas(geos: str | list = 'US,CA', lang: str = 'EN', keywords: str | list | None = 'dental implants, free implants', page_url: str | None = None, **kwargs) -> list | None:
+    '''
+    API Keyword Planner Call (Get Keyword Ideas).
+    @geos - countries ISO (ex: `US` or `US,CA` or `[US,CA]` ...) or other geo names
+    @lang - language code 2-symbols from ref (ex: `en` or `es` or `zh_CN`)
+    @keywords - keywords to search (ex: `dental implants` or `dental implants,free implants` or `[dental implants,free implants]`); max 10
+    @page_url - site to filter unrelated keywords (http://... or https://...)
+    @kwargs:
+      MAIN:
+       - yaml_path - path to `./google-ads.yaml` file (use credintals instead of)      
+       - credintals - None|`file`|`env`|yaml_config_string|dict (Configuration data used to initialize a GoogleAdsClient, instead of yaml_path)
+       - customer_id - Google Ads Customer ID Account Number (format: XXXXXXXXXX not XXX-XXX-XXXX, instead of in credintals or yaml file)      
+       - session - KeywordPlannerSession to use (instead of yaml_path/credintals; by default warm session from `get_session`)
+       - channel_target - `host:port` of plaintext gRPC endpoint instead of Google Ads API (see `KeywordPlannerSession`)
+       - out_as - `default` (returns google response as is) or `table` (returns pandas dataFrame) or `dict`|`list` (returns optimized dict array) or `compact` (returns compact dict array) or `text` or `ideas` (returns KeywordIdeas)
+      OPTINONAL:
+       - adult: True (include adult keywords)
+      DEPRECATED:
+       - with_annotations: True (include keywords annotations)
+      PROCESSING:
+       - with_null_geos: True (no pass DEFAULT_LOCATION_IDS if geos not found)      
+       - with_null_lang: True (no pass DEFAULT_LANGUAGE_ID if lang not found)   
+       - geo_cache: GeoTargetsCache to resolve geos with (default from `get_geo_cache`) or False (no cache)
+       - ideas_cache: True (use default IdeasCache from `get_ideas_cache`) or IdeasCache to reuse responses for same requests
+      QUOTA:
+       - max_retries: retries on RETRY_STATUSES with exponential backoff (default RETRY_ATTEMPTS, 0 - no retries)
+       - rate_limiter: RateLimiter to use instead of shared one (see `set_rate_limit`)
+       - retry_statuses: statuses to retry instead of RETRY_STATUSES
+       - credential_pool: CredentialPool to spread requests over several accounts (instead of session/yaml_path/credintals)
+       - proccessing: dict for set out processing parameters
+      INSTRUMENTATION:
+       - on_stage: callback(event) for this call stages, same events as for `add_stage_hook` hooks (totals - `get_stage_metrics()`)
+      FILTER (vectorized, applied before any out_as except `default` and before saving; see `__filter_columns__`):
+       - min_searches, max_searches, min_comp_index, max_comp_index, min_bid_micros, max_bid_micros - ranges of idea metrics
+       - min_yoy, max_yoy, min_trend, max_trend, min_seasonality, max_seasonality - ranges of metrics derived from monthly searches
+       - include, exclude, include_regex, exclude_regex - keyword text filters (case insensitive)
+       - sort_by - column(s) to sort by, `-` prefix - descending (ex: `-avg_monthly_searches`)
+       - top - keep first N ideas
+       - trends: True (add derived metrics `yoy`, `three_month`, `trend`, `seasonality`, `peak_month` to `table`|`dict`|`list`)
+       - history_months - months of monthly searches to request (default by API - 12, TREND_HISTORY_MONTHS if `yoy` is needed)
+      SAVE AS:
+       - csv_file - save to csv, uses with out_as = `table`
+       - excel_file - save to excel, uses with out_as = `table`
+       - html_file - save to html, uses with out_as = `table`
+       - jsonl_file - append to JSON lines file, any out_as
+       - parquet_file - save to parquet (needs `pyarrow`), any out_as
+       - arrow_file - save to arrow IPC file (needs `pyarrow`), any out_as
+       - export_extra - dict of constant columns to add to jsonl/parquet/arrow rows (ex: {'run': '2024-07'})
+    '''
+    
+    session = __session_of__(**kwargs)
+    customer_id, geos, lang = __collect_params__(session, geos, lang, keywords, page_url, **kwargs)
+
+    # get keyword ideas
+    list_keywords = __get_ideas__(session, customer_id, geos, lang, keywords, page_url, **kwargs)    
+    return __convert_ideas__(list_keywords, **kwargs)
+
+
+def __idea_to_dict__(idea) -> dict:
+    metrics = idea.keyword_idea_metrics
+    return {
+        "keyword":      idea.text, 
+        "avg_monthly_searches": metrics.avg_monthly_searches, 
+        "comp_level":   str(metrics.competition), 
+        "comp_index":   metrics.competition_index, 
+        "searches":     [y.monthly_searches for y in metrics.monthly_search_volumes], 
+        "past_months":  [f'{y.year}-{str(y.month-1).zfill(2)}' for y in metrics.monthly_search_volumes], 
+        "annotations":  [y.concept_group.name for y in idea.keyword_annotations.concepts],
+        "low_top_of_page_bid_micros": metrics.low_top_of_page_bid_micros,
+        "high_top_of_page_bid_micros": metrics.high_top_of_page_bid_micros, }
+
+
+def __idea_to_compact__(idea) -> dict:
+    metrics = idea.keyword_idea_metrics
+    return {
+        "keyword":      idea.text, 
+        "avg_monthly_searches": metrics.avg_monthly_searches, 
+        "comp_level":   str(metrics.competition), 
+        "comp_index":   metrics.competition_index, }
+
+
+def __idea_to_text__(idea) -> str:
+    return f'- "{idea.text}" has "{idea.keyword_idea_metrics.avg_monthly_searches}" avg monthly searches & "{idea.keyword_idea_metrics.competition}" competition.\n'
+
+
+# per idea converters for `iter_keyword_ideas`
+__IDEA_CONVERTERS__ = {'dict': __idea_to_dict__, 'list': __idea_to_dict__, 'compact': __idea_to_compact__, 'text': __idea_to_text__}
+
+
+def iter_keyword_ideas(geos: str | list = 'US,CA', lang: str = 'EN', keywords: str | list | None = 'dental implants, free implants', page_url: str | None = None, **kwargs):
+    '''
+    Streaming API Keyword Planner Call (Get Keyword Ideas): yields ideas one by one while response pages arrive,
+    next page is requested when previous one is consumed, so whole result is never kept in memory.
+    @geos, @lang, @keywords, @page_url - see `get_keyword_ideas`
+    @kwargs - see `get_keyword_ideas`, plus:
+       - out_as - `dict`|`list` (yields dict), `compact` (yields compact dict), `text` (yields line) or `default` (yields GenerateKeywordIdeaResult as is)
+       - page_size - ideas per page (default ITER_PAGE_SIZE, 0 - by API default)
+    '''
+    
+    session = __session_of__(**kwargs)
+    customer_id, geos, lang = __collect_params__(session, geos, lang, keywords, page_url, **kwargs)
+    if kwargs.get('page_size') is None: kwargs['page_size'] = ITER_PAGE_SIZE
+    convert = __IDEA_CONVERTERS__.get(kwargs.get('out_as', DEFAULT_IDEAS_OUT_AS))
+    for idea in __all_ideas__(__get_ideas__(session, customer_id, geos, lang, keywords, page_url, **{**kwargs, 'stream_pages': True})):
+        yield convert(idea) if convert else idea
+
+
+async def aget_keyword_ideas(geos: str | list = 'US,CA', lang: str = 'EN', keywords: str | list | None = 'dental implants, free implants', page_url: str | None = None, **kwargs) -> list | None:
+    '''
+    Async API Keyword Planner Call (Get Keyword Ideas) over async gRPC channel; cancel the task to cancel the call.
+    @geos, @lang, @keywords, @page_url - see `get_keyword_ideas`
+    @kwargs - see `get_keyword_ideas`, plus:
+       - semaphore - asyncio.Semaphore to limit concurrent requests (shared by geo and ideas requests)
+       - timeout - timeout in seconds for each request
+    '''
+    
+    session = await aget_session(**kwargs)
+    with __stage__('geo_resolve', **kwargs) as event:
+        geo_targets = await aget_geo_targets(session, geos, **{k: kwargs[k] for k in ['geo_cache', 'semaphore', 'timeout', 'max_retries', 'rate_limiter'] if k in kwargs})
+        event['geos'] = len(geo_targets or [])
+    customer_id, geos, lang = __collect_params__(session, geos, lang, keywords, page_url, **{**kwargs, 'geo_targets': geo_targets})
+
+    # get keyword ideas, all pages to one response
+    list_keywords = await __aget_ideas__(session, customer_id, geos, lang, keywords, page_url, **kwargs)
+    return __convert_ideas__(list_keywords, **kwargs)
+
+
+async def __aget_ideas__(session: "KeywordPlannerSession", customer_id: str, geo_targets: str | list, language_id: int, keywords: str | list | None, page_url: str | None, /, **kwargs):
+    '''
+    Async `__get_ideas__`: all pages to one GenerateKeywordIdeaResponse.
+    @kwargs - see `aget_keyword_ideas`
+    '''
+    
+    request = __build_ideas_request__(session, customer_id, geo_targets, language_id, keywords, page_url, **kwargs)
+    if (cache := __ideas_cache_of__(**kwargs)) and (cached := cache.get_response(session, request)) is not None: return cached
+    if pool := kwargs.get('credential_pool'): # account of pool only on cache miss
+        list_keywords = await pool.arun(lambda **options: __aget_ideas__(options['session'], options['customer_id'], geo_targets, language_id, keywords, page_url, **options), **{**kwargs, 'ideas_cache': None})
+        return cache.set_response(session, request, list_keywords) if cache else list_keywords
+    list_keywords, traced = None, __traced__(**kwargs)
+    for page in range(sys.maxsize):
+        with __stage__('rpc', **kwargs) as event:
+            event.update({'method': 'GenerateKeywordIdeas', 'page': page})
+            if traced: event['request_bytes'] = __byte_size__(request)
+            response = await __acall_with_retry__(session, lambda: session.acall("KeywordPlanIdeaService", "GenerateKeywordIdeas", 
+                request, "GenerateKeywordIdeaResponse", kwargs.get('timeout'), event), **kwargs)
+            event['ideas'] = len(response.results)
+            if traced: event['response_bytes'] = __byte_size__(response)
+        if list_keywords is None: list_keywords = response
+        else: list_keywords.results.extend(response.results)
+        if not response.next_page_token: break
+        request.page_token = response.next_page_token
+    request.page_token = ''
+    if cache: cache.set_response(session, request, list_keywords)
+    return list_keywords
+
+
+def __chunk_seeds__(seeds: str | list, chunk_size: int = MAX_SEED_KEYWORDS):
+    '''
+    Split seeds iterable to unique (case insensitive) keyword chunks.
+    @seeds - keywords (ex: `dental implants,free implants` or any iterable; read lazily)
+    @chunk_size - keywords per chunk (max MAX_SEED_KEYWORDS)
+    '''
+    
+    if type(seeds) is str: seeds = seeds.split(',')
+    chunk_size = max(1, min(int(chunk_size or MAX_SEED_KEYWORDS), MAX_SEED_KEYWORDS))
+    seen, chunk = set(), []
+    for kw in seeds:
+        if not (kw := str(kw).strip()) or (key := kw.lower()) in seen: continue
+        seen.add(key)
+        chunk.append(kw)
+        if len(chunk) == chunk_size: 
+            yield chunk
+            chunk = []
+    if chunk: yield chunk
+
+
+def get_keyword_ideas_batch(seeds: str | list, geos: str | list = 'US,CA', lang: str = 'EN', page_url: str | None = None, **kwargs) -> list | None:
+    '''
+    API Keyword Planner Batch Call (Get Keyword Ideas for any number of seeds).
+    Seeds are split to chunks of MAX_SEED_KEYWORDS, chunks are requested in parallel,
+    duplicate ideas across chunks are removed and merged into one result.
+    @seeds - keywords to search (ex: `dental implants,free implants` or list or any iterable, ex: opened file)
+    @geos, @lang, @page_url - see `get_keyword_ideas`
+    @kwargs - see `get_keyword_ideas`, plus:
+       - max_workers - parallel requests (default DEFAULT_BATCH_WORKERS)
+       - chunk_size - keywords per request (default and max MAX_SEED_KEYWORDS)
+    '''
+    
+    session = __session_of__(**kwargs)
+    customer_id, geos, lang = __collect_params__(session, geos, lang, None, page_url, **kwargs)
+    max_workers = max(1, int(kwargs.get('max_workers') or DEFAULT_BATCH_WORKERS))
+
+    def get_chunk(chunk: list) -> list:
+        return list(__all_ideas__(__get_ideas__(session, customer_id, geos, lang, chunk, page_url, **kwargs)))
+
+    merged, seen = [], set()
+    def merge(ideas: list):
+        for idea in ideas:
+            if idea.text in seen: continue
+            seen.add(idea.text)
+            merged.append(idea)
+
+    # keep at most 2 chunks per worker in flight, so seeds are read lazily and in order
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for chunk in __chunk_seeds__(seeds, kwargs.get('chunk_size', MAX_SEED_KEYWORDS)):
+            in_flight.append(executor.submit(get_chunk, chunk))
+            if len(in_flight) >= max_workers * 2: merge(in_flight.popleft().result())
+        while in_flight: merge(in_flight.popleft().result())
+        
+    if (pr := kwargs.get('proccessing')) and type(pr) is dict: 
+        pr['keywords'] = seeds if type(seeds) in [str, list] else type(seeds).__name__
+        pr['ideas'] = len(merged)
+
+    return __convert_ideas__(__ideas_response__(session, merged), **kwargs)
+
+
+def __ideas_response__(session: KeywordPlannerSession, ideas: list):
+    '''
+    GenerateKeywordIdeaResponse with given ideas.
+    '''
+    
+    list_keywords = session.client.get_type("GenerateKeywordIdeaResponse")
+    list_keywords.results.extend(ideas)
+    list_keywords.total_size = len(ideas)
+    return list_keywords
+
+
+def __parse_markets__(markets: str | list | dict) -> list:
+    '''
+    Markets to list of (geos, lang): `US,CA:en;DE:de` or [(`US,CA`, `en`), ...] or {`US,CA`: `en`, ...}.
+    '''
+    
+    if type(markets) is str: markets = [m.split(':', 1) for m in markets.split(';') if m.strip()]
+    elif type(markets) is dict: markets = list(markets.items())
+    res = []
+    for market in markets:
+        geos, lang = [x.strip() if type(x) is str else x for x in market] if len(market) == 2 else (None, None)
+        if not geos or not lang: raise ValueError(f"Bad market {':'.join(map(str, market))!r}: expected `GEOS:lang` (ex: `US,CA:en`)")
+        res.append((geos, lang))
+    return res
+
+
+def __resolve_countries__(session: KeywordPlannerSession, names: list, /, **kwargs) -> dict:
+    '''
+    Resolve countries to geo target resource names with one SuggestGeoTargetConstants request for all not cached ones.
+    Returns dict: country code -> resource names.
+    '''
+    
+    by_country, missing = {}, []
+    cache = __geo_cache_of__(**kwargs)
+    for name in names:
+        if cache and (res := cache.get_targets([name], 'Country')) is not None: by_country[name] = res
+        else: missing.append(name)
+    if missing:
+        with __stage__('geo_resolve', **kwargs) as event:
+            request = __build_geo_request__(session, missing, None, None)
+            results = __call_with_retry__(session, lambda: session.geo_service.suggest_geo_target_constants(request), **kwargs)
+            res, found = __parse_geo_targets__(results, missing, 'Country')
+            if cache: cache.set_targets(missing, 'Country', None, None, res, found)
+            by_country.update({name: found.get(name, []) for name in missing})
+            event['geos'] = len(res)
+    return by_country
+
+
+def get_keyword_ideas_matrix(markets: str | list | dict, keywords: str | list | None = 'dental implants, free implants', page_url: str | None = None, **kwargs):
+    '''
+    API Keyword Planner Multi-Market Call: same seeds for many (geos, lang) markets in parallel.
+    All markets geos are resolved with one SuggestGeoTargetConstants request, every market (and every chunk
+    of MAX_SEED_KEYWORDS seeds) is a separate request, markets are requested concurrently.
+    @markets - (geos, lang) pairs: `US,CA:en;DE:de;FR:fr` or [(`US,CA`, `en`), (`DE`, `de`)] or {`US,CA`: `en`, `DE`: `de`}
+    @keywords, @page_url - see `get_keyword_ideas` (keywords may be more than MAX_SEED_KEYWORDS)
+    @kwargs - see `get_keyword_ideas`, plus:
+       - out_as - `table` (default; one pandas dataFrame with `Market` column) or any other `get_keyword_ideas` format (dict: market -> result)
+       - max_workers - parallel requests (default DEFAULT_BATCH_WORKERS)
+       - jsonl_file, parquet_file, arrow_file - one file for all markets with `market` column
+    Market key is `GEOS:lang` (ex: `CA,US:en`).
+    '''
+    
+    markets = __parse_markets__(markets) # before session: bad markets fail fast
+    session = __session_of__(**kwargs)
+    max_workers = max(1, int(kwargs.get('max_workers') or DEFAULT_BATCH_WORKERS))
+    out_as = kwargs.get('out_as', 'table')
+    chunks = list(__chunk_seeds__(keywords or [], kwargs.get('chunk_size', MAX_SEED_KEYWORDS))) or [None]
+    
+    # resolve all geos at once
+    names = {key: __geo_names__(geos) for geos, _ in markets for key in [geos if type(geos) is str else ','.join(geos)]}
+    by_country = __resolve_countries__(session, sorted(set([n for market in names.values() for n in market])), **kwargs)
+    
+    params, keys = {}, []
+    for geos, lang in markets:
+        market = names[geos if type(geos) is str else ','.join(geos)]
+        key = f'{",".join(market)}:{lang}'
+        if key in params: continue
+        geo_targets = [t for name in market for t in by_country.get(name, [])]
+        params[key] = __collect_params__(session, geos, lang, None, page_url, **{**kwargs, 'geo_targets': geo_targets, 'proccessing': None})
+        keys.append(key)
+
+    def get_chunk(key: str, chunk: list | None) -> list:
+        customer_id, geo_targets, lang = params[key]
+        return list(__all_ideas__(__get_ideas__(session, customer_id, geo_targets, lang, chunk, page_url, **kwargs)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(key, executor.submit(get_chunk, key, chunk)) for key in keys for chunk in chunks]
+        merged = {key: {} for key in keys} # market -> idea text -> idea (first one)
+        for key, future in futures:
+            for idea in future.result(): merged[key].setdefault(idea.text, idea)
+    
+    if (pr := kwargs.get('proccessing')) and type(pr) is dict: 
+        pr['markets'] = {key: {'geos': params[key][1], 'lang': params[key][2], 'ideas': len(merged[key])} for key in keys}
+        pr['keywords'] = keywords
+        pr['page_url'] = page_url
+    
+    convert_kwargs = {k: v for k, v in kwargs.items() if k not in EXPORT_KWARGS + ['excel_file', 'csv_file', 'html_file', 'shortly']}
+    exports = {k: kwargs[k] for k in EXPORT_KWARGS if kwargs.get(k)}
+    results, frames = {}, []
+    with IdeasExporter(**exports, export_extra={'market': None, **(kwargs.get('export_extra') or {})}) if exports else contextlib.nullcontext() as exporter:
+        for key in keys:
+            if not (ideas := list(merged[key].values())): 
+                results[key] = __convert_ideas__(__ideas_response__(session, []), **convert_kwargs)
+                continue
+            columns = __filter_columns__(__ideas_to_columns__(ideas), **{**kwargs, 'proccessing': None})
+            if exporter: exporter.write_columns(columns, {'market': key})
+            if out_as == 'table': 
+                frame = __columns_to_table__(columns)
+                frame.insert(0, 'Market', key)
+                frames.append(frame)
+            else: results[key] = __convert_ideas__(__ideas_response__(session, ideas), **convert_kwargs)
+    
+    if out_as != 'table': return results
+    
+    import pandas as pd
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Market'] + TABLE_COLUMNS)
+    if s2 := kwargs.get('excel_file'): df.to_excel(s2, header=True, index=False)
+    if s2 := kwargs.get('csv_file'): df.to_csv(s2, index=False)
+    if s2 := kwargs.get('html_file'): df.to_html(s2, index=False)
+    if kwargs.get('shortly', False) == True:
+        pd.set_option('display.max_rows', None)
+        pd.set_option('display.max_columns', None)
+        pd.set_option('display.width', 200)
+        pd.set_option('display.max_colwidth', None)
+        setattr(df, 'shortly', df.loc[:,["Market", "Keyword", "Avg Monthly Searches", "Competition Level", "Competition Index", "PBM Lo Top", "PBM Hi Top"] + [c for c in TREND_COLUMNS.values() if c in df]])
+    return df
+
+
+
+def __latest_month__() -> str:
+    '''
+    Latest month keyword planner may have data for: previous calendar month (`YYYY-MM`).
+    '''
+    
+    month = datetime.date.today().replace(day=1) - datetime.timedelta(days=1)
+    return f'{month.year}-{str(month.month).zfill(2)}'
+
+
+def refresh_keyword_ideas(seeds: str | list, geos: str | list = 'US,CA', lang: str = 'EN', page_url: str | None = None, **kwargs):
+    '''
+    Incremental API Keyword Planner Call: only seeds whose stored metrics miss the latest month are requested,
+    new months are merged to stored history, ideas of all seeds are returned from MetricsStore (whole history of months).
+    @seeds - keywords, any count (see `get_keyword_ideas_batch`)
+    @geos, @lang, @page_url - see `get_keyword_ideas`
+    @kwargs - see `get_keyword_ideas_batch`, plus:
+       - metrics_store - MetricsStore or SQLite file path (default METRICS_STORE_PATH)
+       - latest_month - latest month API has data for (`YYYY-MM`, default previous calendar month)
+       - recheck - seconds before asking again seeds which got no latest month yet (default METRICS_RECHECK)
+       - force - request all seeds
+    '''
+    
+    session = __session_of__(**kwargs)
+    store = MetricsStore(path) if type(path := kwargs.get('metrics_store') or METRICS_STORE_PATH) is str else path
+    try:
+        customer_id, geos, lang = __collect_params__(session, geos, lang, None, page_url, **kwargs)
+        market = f'{",".join(sorted(geos or []))}:{lang}' + (f':{page_url}' if page_url else '')
+        seeds = [kw.lower() for chunk in __chunk_seeds__(seeds) for kw in chunk]
+        if not seeds: raise ValueError("At least one seed keyword is required.")
+        latest_month = kwargs.get('latest_month') or __latest_month__()
+        stale = seeds if kwargs.get('force') else store.stale_seeds(seeds, market, latest_month, kwargs.get('recheck', METRICS_RECHECK))
+        chunks = list(__chunk_seeds__(stale, kwargs.get('chunk_size', MAX_SEED_KEYWORDS)))
+        
+        # request stale seeds, every chunk is stored as soon as it arrives
+        error = None
+        with ThreadPoolExecutor(max_workers=max(1, int(kwargs.get('max_workers') or DEFAULT_BATCH_WORKERS))) as executor:
+            futures = {executor.submit(lambda chunk: list(__all_ideas__(__get_ideas__(session, customer_id, geos, lang, chunk, page_url, **kwargs))), chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try: store.merge(futures[future], market, future.result())
+                except Exception as e: error = error or e
+        if error: raise error
+        
+        ideas = store.ideas(session, seeds, market)
+    finally:
+        if store is not kwargs.get('metrics_store'): store.close()
+    
+    if (pr := kwargs.get('proccessing')) and type(pr) is dict: 
+        pr.update({'seeds': len(seeds), 'requested_seeds': len(stale), 'requests': len(chunks), 'latest_month': latest_month, 'ideas': len(ideas)})
+    return __convert_ideas__(__ideas_response__(session, ideas), **kwargs)
+
+
+if __name__ == "__main__":
+    
+    parser = argparse.ArgumentParser(description="Generates keyword ideas from a list of seed keywords")
+    parser.add_argument("-g","--geos",type=str,required=False,help="Comma Separated ISO Country Codes",)
+    parser.add_argument("-l","--lang",type=str,required=False,help="2-Symbols language code",)
+    parser.add_argument("-m","--markets",type=str,required=False,help="Markets instead of -g/-l: `GEOS:lang;GEOS:lang` (ex: `US,CA:en;DE:de`)",)
+    parser.add_argument("-k","--keywords",type=str,required=False,help="Comma Separated Keywords to search",)
+    parser.add_argument("-p","--page_url",type=str,required=False,help="Site to filter unrelated keywords",)
+    parser.add_argument("-f","--file",type=str,required=False,help="File with Keywords to search (one per line, any count; batch mode)",)
+    parser.add_argument("-w","--workers",type=int,required=False,default=DEFAULT_BATCH_WORKERS,help="Parallel requests in batch mode",)
+    parser.add_argument("-o","--out",type=str,required=False,help="Also save results to file: .jsonl (append), .parquet or .arrow",)
+    parser.add_argument("-r","--refresh",action="store_true",help=f"Incremental mode: request only seeds without latest month in `{METRICS_STORE_PATH}`",)
+    parser.add_argument("-q","--qps",type=float,required=False,default=RATE_LIMIT_QPS,help="Max requests per second (client-side rate limit)",)
+    parser.add_argument("-a","--accounts",type=str,required=False,help="Comma Separated google-ads yaml files to spread requests over (credential pool)",)
+    parser.add_argument("--strategy",type=str,required=False,default='quota',choices=POOL_STRATEGIES,help="Account routing of credential pool",)
+    parser.add_argument("--min_searches",type=int,required=False,help="Filter: min avg monthly searches",)
+    parser.add_argument("--max_searches",type=int,required=False,help="Filter: max avg monthly searches",)
+    parser.add_argument("--min_comp_index",type=int,required=False,help="Filter: min competition index (0-100)",)
+    parser.add_argument("--max_comp_index",type=int,required=False,help="Filter: max competition index (0-100)",)
+    parser.add_argument("--min_bid_micros",type=int,required=False,help="Filter: min high top of page bid (micros)",)
+    parser.add_argument("--max_bid_micros",type=int,required=False,help="Filter: max high top of page bid (micros)",)
+    parser.add_argument("--min_yoy",type=float,required=False,help="Filter: min year over year change (0.25 is +25%%)",)
+    parser.add_argument("--max_yoy",type=float,required=False,help="Filter: max year over year change",)
+    parser.add_argument("--min_trend",type=float,required=False,help="Filter: min monthly growth (slope / mean)",)
+    parser.add_argument("--max_trend",type=float,required=False,help="Filter: max monthly growth (slope / mean)",)
+    parser.add_argument("--min_seasonality",type=float,required=False,help="Filter: min seasonality (std / mean)",)
+    parser.add_argument("--max_seasonality",type=float,required=False,help="Filter: max seasonality (std / mean)",)
+    parser.add_argument("--include",type=str,required=False,help="Filter: Comma Separated substrings, keyword must have any",)
+    parser.add_argument("--exclude",type=str,required=False,help="Filter: Comma Separated substrings, keyword must have none",)
+    parser.add_argument("--include_regex",type=str,required=False,help="Filter: regex keyword must match",)
+    parser.add_argument("--exclude_regex",type=str,required=False,help="Filter: regex keyword must not match",)
+    parser.add_argument("--sort_by",type=str,required=False,help="Comma Separated columns to sort by, `-` prefix - descending (ex: `-yoy,keyword`)",)
+    parser.add_argument("--top",type=int,required=False,help="Keep first N ideas (after sort)",)
+    parser.add_argument("--trends",action="store_true",default=None,help="Add derived metrics columns (YoY, Trend, Seasonality ...)",)
+    
+    args = None
+    try: 
+        args = parser.parse_args()
+        if not args.markets and not (args.geos and args.lang): parser.error('-g/--geos and -l/--lang (or -m/--markets) are required')
+        if not args.keywords and not args.file: parser.error('-k/--keywords (or -f/--file) is required')
+    except: 
+        args = None
+        print()
+
+    try: 
+        
+        if args:
+            started = datetime.datetime.utcnow()
+            proccessing = {'started': str(started)}
+            set_rate_limit(args.qps)
+            exports = {f'{Path(args.out).suffix.lower().lstrip(".")}_file': args.out} if args.out else {}
+            if exports and not set(exports) & set(EXPORT_KWARGS): raise ValueError(f'Unknown output file type: {args.out}')
+            pool = {'credential_pool': CredentialPool(args.accounts, args.strategy)} if args.accounts else {}
+            filters = {k: v for k in FILTER_KWARGS if (v := getattr(args, k)) is not None}
+            if args.markets:
+                seeds = args.keywords
+                if args.file:
+                    with open(args.file, encoding='utf-8') as f: seeds = [line for line in f]
+                results = get_keyword_ideas_matrix(
+                        args.markets, seeds, args.page_url, max_workers=args.workers,
+                        out_as='table', shortly=True, proccessing=proccessing,
+                        csv_file = f'./last_results.csv', **exports, **pool, **filters, )
+            elif args.refresh:
+                seeds = args.keywords
+                if args.file:
+                    with open(args.file, encoding='utf-8') as f: seeds = [line for line in f]
+                results = refresh_keyword_ideas(
+                        seeds, args.geos, args.lang, args.page_url, max_workers=args.workers,
+                        out_as='table', shortly=True, proccessing=proccessing,
+                        csv_file = f'./last_results.csv', **exports, **pool, **filters, )
+            elif args.file:
+                with open(args.file, encoding='utf-8') as seeds:
+                    results = get_keyword_ideas_batch(
+                            seeds, args.geos, args.lang, args.page_url, max_workers=args.workers,
+                            out_as='table', shortly=True, proccessing=proccessing,
+                            csv_file = f'./last_results.csv', **exports, **pool, **filters, )
+            else:
+                results = get_keyword_ideas(
+                        args.geos, args.lang, args.keywords, args.page_url,
+                        out_as='table', shortly=True, proccessing=proccessing,
+                        csv_file = f'./last_results.csv', **exports, **pool, **filters, )             
+            print()
+            if proccessing:
+                proccessing['finished'] = str(datetime.datetime.utcnow())
+                proccessing['elapsed'] = str(datetime.datetime.utcnow() - started)
+                proccessing['calls'] = get_call_metrics()
+                if pool: proccessing['accounts'] = pool['credential_pool'].stats()
+                proccessing['stages'] = {k: f"{v['count']} x {v['seconds']:.3f}s (max {v['max_seconds']:.3f}s, ideas {v['ideas']}, errors {v['errors']})" for k, v in get_stage_metrics().items()}
+                print('Processing parameters:\n')
+                for k,v in proccessing.items(): print(f' - {k}: {v}')
+                print()
+            try: 
+                print(f'Results (see file `./last_results.csv`) {type(results)}:\n')
+                if results in [None,[],0,'']: print('RESULT IS EMPTY') 
+                else: raise Exception('')
+            except:
+                if type(results) is list: print(json.dumps(results,indent=1))
+                elif hasattr(results, 'shortly'): print(results.shortly)
+                else: print(results)
+                
+            print('\nTo call from code see `def get_keyword_ideas`')
+
+    except Exception as ex:
+        
+        if not isinstance(ex, __ads_exception_type__()): raise
+        print(f'Request ID "{ex.request_id}" failed, status "{ex.error.code().name}", details:')
+        for error in ex.failure.errors:
+            print(f' - {error.message}')
+            if error.location:
+                for field_path_element in error.location.field_path_elements:
+                    print(f" - - on field: {field_path_element.field_name}")
+        
+    finally: close_sessions()
         
     print()
     input('Press Enter to Exit')
\ No newline at end of file
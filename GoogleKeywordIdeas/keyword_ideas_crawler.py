@@ -0,0 +1,333 @@
+### HELP cmd line args:
+###
+###  -g "US" -l "EN" -k "dental implants" -d 3 -n 10 -o "./dental_map.jsonl"
+###  -g "DE" -l "DE" -f "./seeds.txt" -d 2 -n 20 --min_searches 100 -o "./de_map.parquet"
+###  -g "US" -l "EN" -k "dental implants" -d 4 --bloom 50000000 -P 4
+###
+### SEE `how_to.md`
+
+import sys
+import math
+import json
+import sqlite3
+import hashlib
+import argparse
+import importlib
+import threading
+import contextlib
+
+from pathlib import Path
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import get_keyword_ideas as gki
+
+
+CRAWL_PATH        = "./keyword_ideas_crawl.db" # SQLite frontier, visited seeds and found ideas (crawl is resumed from it)
+CRAWL_DEPTH       = 2                          # expansion rounds (1 - seeds only, 2 - seeds and their top ideas, ...)
+CRAWL_FANOUT      = 10                         # new seeds taken from ideas of each expanded seed (most avg monthly searches first)
+CRAWL_CHUNK_SIZE  = 1                          # seeds per request (ideas of several seeds come mixed in one response, so fanout is per chunk then)
+CRAWL_WORKERS     = 4                          # parallel requests
+CRAWL_PROCESSES   = 2                          # processes parsing responses (0 - parse in request threads)
+CRAWL_BATCH       = 1000                       # frontier seeds read from disk at once
+CRAWL_BLOOM_ERROR = 0.001                      # false positive rate of Bloom filter visited set at its capacity
+CRAWL_OUT_FORMATS = ['jsonl', 'parquet', 'arrow']
+
+
+class BloomFilter:
+    '''
+    Fixed memory set of strings: no false negatives, about `error` false positives when `capacity` items are added
+    (~1.8 bytes per item at 0.1%).
+    @capacity - expected items
+    @error - false positive rate at capacity
+    '''
+
+    def __init__(self, capacity: int, error: float = CRAWL_BLOOM_ERROR):
+        self.size = max(64, int(-capacity * math.log(error) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / max(1, capacity) * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __positions__(self, item: str) -> list:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        a, b = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(a + i * b) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> bool:
+        '''
+        Add item, returns False if it was (probably) added before.
+        '''
+
+        new = False
+        for p in self.__positions__(item):
+            if not self.bits[p >> 3] & (1 << (p & 7)):
+                self.bits[p >> 3] |= 1 << (p & 7)
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self.__positions__(item))
+
+
+class CrawlStore:
+    '''
+    SQLite crawl state: seeds (frontier and visited set: depth, parent, expanded flag), found ideas (first found, raw protobuf)
+    and crawl parameters; written by crawl thread only, so crawl is resumed after crash or Ctrl+C.
+    @path - SQLite file
+    @bloom - Bloom filter capacity for visited seeds (0 - exact check in SQLite only); repeated ideas are skipped without
+             disk lookups, but rare false positives are never expanded
+    '''
+
+    def __init__(self, path: str = CRAWL_PATH, bloom: int = 0):
+        self.path = path
+        self.bloom = BloomFilter(bloom) if bloom else None
+        self.lock = threading.RLock()
+        self.db = None
+
+    def __db__(self) -> sqlite3.Connection:
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS seeds (keyword TEXT PRIMARY KEY, depth INTEGER, parent TEXT, expanded INTEGER DEFAULT 0)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS seeds_frontier ON seeds (depth, expanded)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS ideas (keyword TEXT PRIMARY KEY, depth INTEGER, seed TEXT, avg_monthly_searches INTEGER, idea BLOB)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS ideas_depth ON ideas (depth)')
+            self.db.commit()
+            if self.bloom is not None: # visited seeds of previous runs
+                for (keyword,) in self.db.execute('SELECT keyword FROM seeds'): self.bloom.add(keyword)
+        return self.db
+
+    def start(self, market: str, seeds: list):
+        '''
+        Check crawl parameters of existing file and add seeds (depth 0).
+        '''
+
+        with self.lock:
+            db = self.__db__()
+            if (row := db.execute("SELECT value FROM meta WHERE key='market'").fetchone()) and row[0] != market:
+                raise ValueError(f'Crawl file {self.path} is for other market: {row[0]}')
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('market', ?)", (market,))
+            self.__add_seeds__(db, [(kw.lower(), 0, None) for kw in seeds])
+            db.commit()
+
+    def __add_seeds__(self, db: sqlite3.Connection, rows: list) -> int:
+        if self.bloom is not None: rows = [row for row in rows if self.bloom.add(row[0])]
+        before = db.total_changes
+        db.executemany('INSERT OR IGNORE INTO seeds (keyword, depth, parent) VALUES (?, ?, ?)', rows)
+        return db.total_changes - before
+
+    def frontier(self, depth: int, batch: int = CRAWL_BATCH):
+        '''
+        Not expanded seeds of depth, read from disk by `batch`.
+        '''
+
+        last = 0
+        while True:
+            with self.lock:
+                rows = self.__db__().execute('SELECT rowid, keyword FROM seeds WHERE depth=? AND expanded=0 AND rowid>? ORDER BY rowid LIMIT ?', (depth, last, batch)).fetchall()
+            if not rows: return
+            last = rows[-1][0]
+            yield from [kw for _, kw in rows]
+
+    def store(self, chunk: list, depth: int, rows: list, fanout: int, min_searches: int = 0) -> int:
+        '''
+        Save ideas of expanded seeds chunk, queue top `fanout * len(chunk)` not visited ideas of chunk response as seeds of next depth
+        (ideas are not attributed to seeds of chunk, so it is top `fanout` per seed only for one seed chunks, see CRAWL_CHUNK_SIZE).
+        @rows - (keyword, avg monthly searches, idea bytes), most searches first
+        Returns count of queued seeds.
+        '''
+
+        with self.lock:
+            db = self.__db__()
+            parent = chunk[0] if len(chunk) == 1 else ','.join(chunk)
+            db.executemany('INSERT OR IGNORE INTO ideas VALUES (?, ?, ?, ?, ?)', [(kw, depth + 1, parent, avg, data) for kw, avg, data in rows])
+            queued, limit, seen = 0, fanout * len(chunk), set(chunk)
+            candidates = [(kw, depth + 1, parent) for kw, avg, _ in rows if avg >= min_searches and kw not in seen]
+            while queued < limit and candidates: # most searched first, until `limit` not visited seeds
+                take, candidates = candidates[:limit - queued], candidates[limit - queued:]
+                queued += self.__add_seeds__(db, take)
+            db.executemany('UPDATE seeds SET expanded=1 WHERE keyword=?', [(kw,) for kw in chunk])
+            db.commit()
+            return queued
+
+    def counts(self) -> dict:
+        '''
+        Per depth: seeds, expanded seeds, ideas.
+        '''
+
+        with self.lock:
+            db = self.__db__()
+            res = {depth: {'seeds': seeds, 'expanded': expanded, 'ideas': 0} for depth, seeds, expanded in db.execute('SELECT depth, COUNT(*), SUM(expanded) FROM seeds GROUP BY depth')}
+            for depth, ideas in db.execute('SELECT depth, COUNT(*) FROM ideas GROUP BY depth'): res.setdefault(depth, {'seeds': 0, 'expanded': 0, 'ideas': 0})['ideas'] = ideas
+            return dict(sorted(res.items()))
+
+    def ideas(self, session: gki.KeywordPlannerSession, depth: int | None = None, batch: int = gki.EXPORT_BATCH_SIZE):
+        '''
+        Found ideas (GenerateKeywordIdeaResult) of depth (None - all), read from disk by `batch`.
+        '''
+
+        idea_class = type(session.client.get_type("GenerateKeywordIdeaResult"))
+        last, where = '', '' if depth is None else f' AND depth={int(depth)}'
+        while True:
+            with self.lock:
+                rows = self.__db__().execute(f'SELECT keyword, idea FROM ideas WHERE keyword>?{where} ORDER BY keyword LIMIT ?', (last, batch)).fetchall()
+            if not rows: return
+            last = rows[-1][0]
+            yield from [gki.__from_bytes__(idea_class, data) for _, data in rows]
+
+    def close(self):
+        with self.lock:
+            if self.db is not None: self.db.close()
+            self.db = None
+
+
+__RESPONSE_CLASS__ = None
+
+
+def __crawl_rows__(data: bytes) -> tuple:
+    '''
+    Parse GenerateKeywordIdeaResponse page bytes (in worker process): ([(keyword, avg monthly searches, idea bytes)], next page token).
+    '''
+
+    global __RESPONSE_CLASS__
+    if __RESPONSE_CLASS__ is None: # protobuf class without GoogleAdsClient
+        __RESPONSE_CLASS__ = importlib.import_module(f'google.ads.googleads.{gki.API_VERSION}.services.types.keyword_plan_idea_service').GenerateKeywordIdeaResponse.pb()
+    response = __RESPONSE_CLASS__.FromString(data)
+    return [(idea.text.lower(), idea.keyword_idea_metrics.avg_monthly_searches, idea.SerializeToString()) for idea in response.results], response.next_page_token
+
+
+def __frontier_chunks__(frontier, chunk_size: int):
+    '''
+    Split frontier to chunks of `chunk_size` (max MAX_SEED_KEYWORDS) keeping nothing of read ones: its seeds are unique (primary key), 
+    so memory does not grow with depth size.
+    '''
+
+    frontier, chunk_size = iter(frontier), max(1, min(int(chunk_size), gki.MAX_SEED_KEYWORDS))
+    while chunk := list(islice(frontier, chunk_size)): yield chunk
+
+
+def crawl_keyword_ideas(seeds: str | list, geos: str | list = 'US,CA', lang: str = 'EN', page_url: str | None = None, **kwargs) -> dict:
+    '''
+    Snowball Keyword Planner Crawl: breadth-first, ideas of seeds (one seed per request by default) are requested in parallel,
+    top `fanout` new ideas of every seed become seeds of next round, up to `depth` rounds. Frontier, visited seeds and
+    found ideas are kept in SQLite file (bounded memory, resumed by next call with the same file; seeds of last round stay
+    in frontier, so next call with bigger `depth` continues), responses are parsed in worker processes, so request threads 
+    are not blocked by conversion.
+    @seeds - keywords to start from (ex: `dental implants,free implants` or list or any iterable, ex: opened file)
+    @geos, @lang, @page_url - see `get_keyword_ideas`
+    @kwargs - see `get_keyword_ideas` (session, credential_pool, geo_cache, max_retries, rate_limiter, on_stage ...), plus:
+       - crawl_file - SQLite file (default CRAWL_PATH), or `crawl_store` - CrawlStore
+       - depth - expansion rounds (default CRAWL_DEPTH)
+       - fanout - new seeds per expanded seed (default CRAWL_FANOUT)
+       - chunk_size - seeds per request (default CRAWL_CHUNK_SIZE, max MAX_SEED_KEYWORDS - less requests, but `fanout` is per chunk: 
+         top `fanout * seeds` ideas of chunk response, one popular seed can take them all)
+       - min_searches - min avg monthly searches of idea to become seed
+       - max_workers - parallel requests (default CRAWL_WORKERS)
+       - processes - processes parsing responses (default CRAWL_PROCESSES, 0 - in request threads)
+       - bloom - Bloom filter capacity for visited seeds (default 0 - exact check in SQLite)
+       - jsonl_file, parquet_file, arrow_file - write found ideas with `depth` column at the end (see `IdeasExporter`)
+    Returns per depth counts: seeds, expanded, ideas.
+    '''
+
+    session = gki.__session_of__(**kwargs)
+    customer_id, geo_targets, language = gki.__collect_params__(session, geos, lang, None, page_url, **kwargs)
+    market = f'{",".join(sorted(geo_targets or []))}:{language}' + (f':{page_url}' if page_url else '')
+    depth_max = max(1, int(kwargs.get('depth') or CRAWL_DEPTH))
+    fanout = CRAWL_FANOUT if kwargs.get('fanout') is None else int(kwargs['fanout'])
+    max_workers = max(1, int(kwargs.get('max_workers') or CRAWL_WORKERS))
+    processes = CRAWL_PROCESSES if kwargs.get('processes') is None else int(kwargs['processes'])
+    store = kwargs.get('crawl_store') or CrawlStore(kwargs.get('crawl_file') or CRAWL_PATH, kwargs.get('bloom') or 0)
+    options = {k: v for k, v in kwargs.items() if k not in gki.EXPORT_KWARGS + ['proccessing']}
+
+    def fetch(parse, chunk: list, /, **options) -> list:
+        # raw page bytes go to `parse` as is, request thread does not build response messages
+        if pool := options.get('credential_pool'): return pool.run(lambda **account: fetch(parse, chunk, **account), **options)
+        account = options.get('session') or session
+        request = gki.__build_ideas_request__(account, options.get('customer_id') or customer_id, geo_targets, language, chunk, page_url, **options)
+        rows = []
+        for page in range(sys.maxsize):
+            with gki.__stage__('rpc', **options) as event:
+                event.update({'method': 'GenerateKeywordIdeas', 'page': page})
+                data = gki.__call_with_retry__(account, lambda: account.call_bytes("KeywordPlanIdeaService", "GenerateKeywordIdeas", request, options.get('timeout'), event), **options)
+                event['response_bytes'] = len(data)
+            page_rows, request.page_token = parse(data)
+            rows.extend(page_rows)
+            if not request.page_token: break
+        rows.sort(key=lambda row: -row[1]) # most searches first
+        return rows
+
+    try:
+        store.start(market, [kw for chunk in gki.__chunk_seeds__(seeds) for kw in chunk])
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, (ProcessPoolExecutor(processes) if processes else contextlib.nullcontext()) as parsers:
+            parse = (lambda data: parsers.submit(__crawl_rows__, data).result()) if processes else __crawl_rows__
+            in_flight, errors = deque(), []
+            def store_first(depth: int):
+                chunk, future = in_flight.popleft()
+                try: store.store(chunk, depth, future.result(), fanout, kwargs.get('min_searches') or 0)
+                except Exception as error: errors.append(error)
+            
+            for depth in range(depth_max):
+                # keep at most 2 chunks per worker in flight, frontier is read from disk lazily
+                for chunk in __frontier_chunks__(store.frontier(depth), kwargs.get('chunk_size') or CRAWL_CHUNK_SIZE):
+                    in_flight.append((chunk, executor.submit(fetch, parse, chunk, **options)))
+                    if len(in_flight) >= max_workers * 2: store_first(depth)
+                    if errors: break
+                while in_flight: store_first(depth)
+                if errors: raise errors[0] # failed seeds stay in frontier for next run
+
+        if exports := {k: kwargs[k] for k in gki.EXPORT_KWARGS if kwargs.get(k)}:
+            with gki.IdeasExporter(**exports, export_extra={'depth': None, **(kwargs.get('export_extra') or {})}) as exporter:
+                for depth in store.counts():
+                    batch = []
+                    for idea in store.ideas(session, depth):
+                        batch.append(idea)
+                        if len(batch) >= gki.EXPORT_BATCH_SIZE: exporter.write_columns(gki.__ideas_to_columns__(batch), {'depth': depth}); batch = []
+                    if batch: exporter.write_columns(gki.__ideas_to_columns__(batch), {'depth': depth})
+        res = store.counts()
+    finally:
+        if store is not kwargs.get('crawl_store'): store.close()
+
+    if (pr := kwargs.get('proccessing')) and type(pr) is dict:
+        pr.update({'market': market, 'depth': depth_max, 'fanout': fanout, 'crawl': res, 'ideas': sum([v['ideas'] for v in res.values()])})
+    return res
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Snowball keyword ideas crawl: ideas of seeds become seeds of next round (breadth-first, resumable)")
+    parser.add_argument("-g","--geos",type=str,required=True,help="Comma Separated ISO Country Codes",)
+    parser.add_argument("-l","--lang",type=str,required=True,help="2-Symbols language code",)
+    parser.add_argument("-k","--keywords",type=str,required=False,help="Comma Separated Keywords to start from",)
+    parser.add_argument("-f","--file",type=str,required=False,help="File with Keywords to start from (one per line, any count)",)
+    parser.add_argument("-p","--page_url",type=str,required=False,help="Site to filter unrelated keywords",)
+    parser.add_argument("-d","--depth",type=int,required=False,default=CRAWL_DEPTH,help="Expansion rounds (1 - seeds only)",)
+    parser.add_argument("-n","--fanout",type=int,required=False,default=CRAWL_FANOUT,help="New seeds per expanded seed",)
+    parser.add_argument("-c","--chunk_size",type=int,required=False,default=CRAWL_CHUNK_SIZE,help=f"Seeds per request (up to {gki.MAX_SEED_KEYWORDS}, fanout is per chunk then)",)
+    parser.add_argument("--min_searches",type=int,required=False,default=0,help="Min avg monthly searches of idea to become seed",)
+    parser.add_argument("-w","--workers",type=int,required=False,default=CRAWL_WORKERS,help="Parallel requests",)
+    parser.add_argument("-P","--processes",type=int,required=False,default=CRAWL_PROCESSES,help="Processes parsing responses (0 - in request threads)",)
+    parser.add_argument("--bloom",type=int,required=False,default=0,help="Bloom filter capacity for visited seeds (0 - exact check in SQLite)",)
+    parser.add_argument("-s","--store",type=str,required=False,default=CRAWL_PATH,help="Crawl SQLite file (crawl is resumed from it)",)
+    parser.add_argument("-o","--out",type=str,required=False,help=f"Write found ideas to file: {', '.join(CRAWL_OUT_FORMATS)}",)
+    parser.add_argument("-q","--qps",type=float,required=False,default=gki.RATE_LIMIT_QPS,help="Max requests per second (client-side rate limit)",)
+    parser.add_argument("-a","--accounts",type=str,required=False,help="Comma Separated google-ads yaml files to spread requests over (credential pool)",)
+    args = parser.parse_args()
+
+    seeds = args.keywords
+    if args.file:
+        with open(args.file, encoding='utf-8') as f: seeds = [line for line in f]
+    if (suffix := Path(args.out).suffix.lower().lstrip('.') if args.out else None) and suffix not in CRAWL_OUT_FORMATS: parser.error(f'Unknown output file type: {args.out}')
+    gki.set_rate_limit(args.qps)
+    pool = {'credential_pool': gki.CredentialPool(args.accounts)} if args.accounts else {}
+    proccessing = {'seeds': seeds if type(seeds) is str else len(seeds or [])}
+    try:
+        crawl_keyword_ideas(seeds, args.geos, args.lang, args.page_url, depth=args.depth, fanout=args.fanout, chunk_size=args.chunk_size, min_searches=args.min_searches,
+            max_workers=args.workers, processes=args.processes, bloom=args.bloom, crawl_file=args.store, proccessing=proccessing,
+            **({f'{suffix}_file': args.out} if suffix else {}), **pool)
+    finally: gki.close_sessions()
+    proccessing['calls'] = gki.get_call_metrics()
+    print(json.dumps(proccessing, indent=1, default=str))
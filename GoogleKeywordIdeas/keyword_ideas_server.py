@@ -0,0 +1,326 @@
+### HELP cmd line args:
+###
+###  --port 8080 -w 8
+###  --host 0.0.0.0 --port 8080 -q 5 --max_queue 200
+###
+###  curl "http://127.0.0.1:8080/ideas?geos=US,CA&lang=en&keywords=dental+implants,free+dentist"
+###  curl "http://127.0.0.1:8080/ideas.ndjson?geos=DE&lang=de&keywords=zahnimplantate&out_as=compact"
+###  curl -d '{"geos": "US", "lang": "en", "keywords": ["dental implants"]}' "http://127.0.0.1:8080/ideas"
+###  curl "http://127.0.0.1:8080/stats"
+###
+### SEE `how_to.md`
+
+import json
+import time
+import signal
+import asyncio
+import argparse
+
+from collections import deque
+from urllib.parse import urlsplit, parse_qsl
+
+import get_keyword_ideas as gki
+
+
+SERVER_HOST          = "127.0.0.1"
+SERVER_PORT          = 8080
+SERVER_UPSTREAM      = 8                      # upstream GenerateKeywordIdeas calls at once (others wait in queue)
+SERVER_MAX_QUEUE     = 100                    # upstream calls waiting in queue, then new requests get 503 (None - not limited)
+SERVER_TIMEOUT       = 120.0                  # timeout in seconds of each upstream request
+SERVER_STREAM_BATCH  = 500                    # ideas converted and written per chunk of streamed response
+SERVER_LATENCY_WINDOW = 10000                 # last requests used for latency percentiles in `/stats`
+SERVER_MAX_HEADERS   = 64 * 1024              # max size of request line and headers
+SERVER_MAX_BODY      = 1024 * 1024            # max size of request body
+SERVER_OUT_AS        = ['dict', 'list', 'compact', 'text']
+SERVER_PARAMS        = ['geos', 'lang', 'keywords', 'page_url', 'out_as', 'adult', 'page_size'] # request parameters (query string or JSON body)
+
+__REASONS__ = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+               500: 'Internal Server Error', 502: 'Bad Gateway', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class HttpError(Exception):
+    '''
+    Error returned to client as JSON `{"error": message}` with HTTP `status`.
+    '''
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ServerStats:
+    '''
+    Counters of server (one event loop, no locks): requests, active, coalesced (requests served by another request's upstream call),
+    upstream (upstream calls), queued (upstream calls waiting for slot), inflight (upstream calls running), rejected (503), errors,
+    plus latency percentiles of last `window` requests and upstream calls.
+    '''
+
+    def __init__(self, window: int = SERVER_LATENCY_WINDOW):
+        self.started = time.time()
+        self.values = {'requests': 0, 'active': 0, 'coalesced': 0, 'upstream': 0, 'queued': 0, 'inflight': 0, 'max_queued': 0, 'rejected': 0, 'errors': 0}
+        self.latency = deque(maxlen=window)
+        self.upstream_latency = deque(maxlen=window)
+
+    def add(self, name: str, value: int = 1):
+        self.values[name] += value
+        if name == 'queued': self.values['max_queued'] = max(self.values['max_queued'], self.values['queued'])
+
+    @staticmethod
+    def __percentiles__(values) -> dict:
+        if not values: return {'count': 0}
+        values = sorted(values)
+        pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 3)
+        return {'count': len(values), 'p50_ms': pick(0.5), 'p90_ms': pick(0.9), 'p99_ms': pick(0.99), 'max_ms': round(values[-1] * 1000, 3)}
+
+    def snapshot(self) -> dict:
+        return {**self.values, 'uptime_seconds': round(time.time() - self.started, 3),
+                'latency': self.__percentiles__(self.latency), 'upstream_latency': self.__percentiles__(self.upstream_latency)}
+
+
+def __request_params__(query: str, body: bytes) -> dict:
+    '''
+    Request parameters from query string and JSON body (body wins).
+    '''
+
+    params = {k: v for k, v in parse_qsl(query) if k in SERVER_PARAMS}
+    if body.strip():
+        try: data = json.loads(body)
+        except ValueError as error: raise HttpError(400, f'Bad JSON body: {error}')
+        if type(data) is not dict: raise HttpError(400, 'JSON body must be object')
+        params.update({k: v for k, v in data.items() if k in SERVER_PARAMS})
+    if not (params.get('keywords') or params.get('page_url')): raise HttpError(400, 'keywords or page_url is required')
+    if (out_as := params.setdefault('out_as', gki.DEFAULT_IDEAS_OUT_AS)) not in SERVER_OUT_AS:
+        raise HttpError(400, f'out_as must be one of: {", ".join(SERVER_OUT_AS)}')
+    if 'adult' in params: params['adult'] = str(params['adult']).lower() in ['1', 'true', 'yes']
+    if 'page_size' in params:
+        try: params['page_size'] = int(params['page_size'])
+        except ValueError: raise HttpError(400, 'page_size must be integer')
+    return params
+
+
+def __coalesce_key__(params: dict) -> tuple:
+    '''
+    Key of identical upstream requests: geos and seeds in any order and case of codes give the same response.
+    '''
+
+    split = lambda value: value.split(',') if type(value) is str else list(value or [])
+    return (tuple(sorted(set([g.strip().upper() for g in split(params.get('geos', 'US,CA'))]))), str(params.get('lang', 'EN')).strip().lower(),
+            tuple(sorted(set([kw.strip() for kw in split(params.get('keywords'))]))), params.get('page_url') or None,
+            bool(params.get('adult')), params.get('page_size') or 0)
+
+
+class KeywordIdeasServer:
+    '''
+    Async HTTP front-end of `aget_keyword_ideas` (stdlib asyncio, HTTP/1.1 with keep-alive):
+     - GET|POST `/ideas` - JSON array (`text` - plain text), GET|POST `/ideas.ndjson` - one idea per line
+     - GET `/stats` - queue depth, latency percentiles, API calls and stages counters; GET `/health`
+    Identical requests in flight share one upstream call (`__coalesce_key__`), each one converts to its own `out_as`.
+    Responses are chunked and written while ideas are converted (`SERVER_STREAM_BATCH` per chunk), once all upstream pages are read:
+    response is shared by coalesced requests and upstream errors get own status (502, 504) before any ideas are sent.
+    @kwargs - see `get_keyword_ideas` (yaml_path, credintals, session, credential_pool, customer_id, geo_cache, ideas_cache, max_retries, rate_limiter, on_stage ...), plus:
+       - upstream - upstream calls at once (default SERVER_UPSTREAM)
+       - max_queue - upstream calls waiting for slot, then 503 (default SERVER_MAX_QUEUE, None - not limited)
+       - timeout - timeout in seconds of each upstream request (default SERVER_TIMEOUT)
+    '''
+
+    def __init__(self, **kwargs):
+        self.upstream = max(1, int(kwargs.get('upstream') or SERVER_UPSTREAM))
+        self.max_queue = kwargs.get('max_queue', SERVER_MAX_QUEUE)
+        self.kwargs = {k: v for k, v in kwargs.items() if k not in ['upstream', 'max_queue']}
+        self.kwargs.setdefault('timeout', SERVER_TIMEOUT)
+        self.session = None
+        self.slots = None
+        self.inflight = {} # coalesce key -> asyncio.Task of upstream call
+        self.stats = ServerStats()
+        self.server = None
+
+    async def start(self, host: str = SERVER_HOST, port: int = SERVER_PORT):
+        '''
+        Warm session (client, stubs and async channel) and start listening, returns asyncio.Server.
+        '''
+
+        self.session = await gki.aget_session(**self.kwargs)
+        pool = self.kwargs.get('credential_pool')
+        for session in set([self.session] + ([a.session for a in pool.accounts] if pool else [])): session.open_aio_channel() # async channels of this event loop
+        self.slots = asyncio.Semaphore(self.upstream)
+        self.server = await asyncio.start_server(self.__connection__, host, port, limit=SERVER_MAX_HEADERS)
+        return self.server
+
+    async def close(self):
+        '''
+        Stop listening, cancel upstream calls and close async channels (sessions stay in `get_session` registry).
+        '''
+
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in list(self.inflight.values()): task.cancel()
+        pool = self.kwargs.get('credential_pool')
+        for session in set(([self.session] if self.session else []) + ([a.session for a in pool.accounts] if pool else [])): await session.aclose_aio_channel()
+
+    async def __upstream__(self, params: dict):
+        try: await self.slots.acquire() # queued by `get_response`
+        finally: self.stats.add('queued', -1)
+        self.stats.add('inflight')
+        started = time.perf_counter()
+        try:
+            return await gki.aget_keyword_ideas(params.get('geos', 'US,CA'), params.get('lang', 'EN'), params.get('keywords'), params.get('page_url'),
+                **{**self.kwargs, **{k: params[k] for k in ['adult', 'page_size'] if k in params}, 'session': self.session, 'out_as': 'default'})
+        finally:
+            self.stats.upstream_latency.append(time.perf_counter() - started)
+            self.stats.add('inflight', -1)
+            self.slots.release()
+
+    async def get_response(self, params: dict):
+        '''
+        GenerateKeywordIdeas response (all pages) for request parameters, shared by identical requests in flight.
+        '''
+
+        key = __coalesce_key__(params)
+        if (task := self.inflight.get(key)) is None:
+            if self.max_queue is not None and len(self.inflight) >= self.upstream + self.max_queue: # all slots busy and queue is full
+                self.stats.add('rejected')
+                raise HttpError(503, 'Too many queued requests')
+            self.stats.add('upstream')
+            self.stats.add('queued')
+            task = self.inflight[key] = asyncio.get_running_loop().create_task(self.__upstream__(params))
+            task.add_done_callback(lambda _: self.inflight.pop(key, None) if self.inflight.get(key) is task else None)
+        else: self.stats.add('coalesced')
+        return await asyncio.shield(task) # client gone - upstream call continues for others
+
+    async def __connection__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try: head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError): break
+                if not await self.__request__(head, reader, writer): break
+        except (ConnectionError, asyncio.CancelledError): pass
+        finally:
+            writer.close()
+            try: await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError): pass
+
+    async def __request__(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        '''
+        Handle one request, returns True to keep connection.
+        '''
+
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, version = (lines[0].split(' ') + ['', '', ''])[:3]
+        headers = {k.strip().lower(): v.strip() for k, _, v in [line.partition(':') for line in lines[1:] if line]}
+        keep = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        started = time.perf_counter()
+        self.stats.add('requests')
+        self.stats.add('active')
+        try:
+            length = int(headers.get('content-length') or 0)
+            if length > SERVER_MAX_BODY:
+                keep = False
+                raise HttpError(413, 'Request body is too large')
+            body = await reader.readexactly(length) if length else b''
+            path, _, query = target.partition('?')
+            path = urlsplit(path).path.rstrip('/') or '/'
+            if path in ['/ideas', '/ideas.ndjson']:
+                if method not in ['GET', 'POST']: raise HttpError(405, 'Use GET or POST')
+                ndjson = path.endswith('.ndjson') or 'application/x-ndjson' in headers.get('accept', '')
+                await self.__ideas__(writer, __request_params__(query, body), ndjson, keep)
+            elif path == '/stats': await self.__send__(writer, 200, self.get_stats(), keep)
+            elif path == '/health': await self.__send__(writer, 200, {'status': 'ok'}, keep)
+            else: raise HttpError(404, f'Not found: {path}')
+        except HttpError as error:
+            await self.__send__(writer, error.status, {'error': str(error)}, keep)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            keep = False
+        except Exception as error:
+            self.stats.add('errors')
+            status = 504 if isinstance(error, asyncio.TimeoutError) or gki.__retry_status__(error) == 'DEADLINE_EXCEEDED' else \
+                     400 if isinstance(error, ValueError) else 502 if gki.__retry_status__(error) or isinstance(error, gki.__ads_exception_type__()) else 500
+            if writer.transport.is_closing(): keep = False
+            else: await self.__send__(writer, status, {'error': f'{gki.__retry_status__(error) or type(error).__name__}: {error}'[:1000]}, keep)
+        finally:
+            self.stats.latency.append(time.perf_counter() - started)
+            self.stats.add('active', -1)
+        return keep
+
+    @staticmethod
+    async def __send__(writer: asyncio.StreamWriter, status: int, data, keep: bool):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        close = '' if keep else 'Connection: close\r\n'
+        writer.write(f'HTTP/1.1 {status} {__REASONS__.get(status, "")}\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n{close}\r\n'.encode('latin-1') + body)
+        await writer.drain()
+
+    async def __ideas__(self, writer: asyncio.StreamWriter, params: dict, ndjson: bool, keep: bool):
+        response = await self.get_response(params)
+        out_as = params['out_as']
+        content_type = 'text/plain' if out_as == 'text' else 'application/x-ndjson' if ndjson else 'application/json'
+        close = '' if keep else 'Connection: close\r\n'
+        writer.write(f'HTTP/1.1 200 OK\r\nContent-Type: {content_type}; charset=utf-8\r\nTransfer-Encoding: chunked\r\n{close}\r\n'.encode('latin-1'))
+
+        convert, first = gki.__IDEA_CONVERTERS__[out_as], True
+        ideas = list(gki.__all_ideas__(response)) if response else []
+        if not ideas and not ndjson and out_as != 'text': self.__chunk__(writer, '[]')
+        for start in range(0, len(ideas), SERVER_STREAM_BATCH):
+            batch = [convert(idea) for idea in ideas[start:start + SERVER_STREAM_BATCH]]
+            if out_as == 'text': text = ''.join(batch)
+            elif ndjson: text = ''.join([json.dumps(x, ensure_ascii=False) + '\n' for x in batch])
+            else:
+                text = ('[' if first else ',') + ','.join([json.dumps(x, ensure_ascii=False) for x in batch])
+                if start + SERVER_STREAM_BATCH >= len(ideas): text += ']'
+            first = False
+            self.__chunk__(writer, text)
+            await writer.drain() # back pressure and turn for other requests
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    @staticmethod
+    def __chunk__(writer: asyncio.StreamWriter, text: str):
+        data = text.encode('utf-8')
+        if data: writer.write(f'{len(data):X}\r\n'.encode('latin-1') + data + b'\r\n')
+
+    def get_stats(self) -> dict:
+        '''
+        Server counters and latency percentiles (see ServerStats), API calls (see `get_call_metrics`), stages (see `get_stage_metrics`)
+        and accounts of `credential_pool` (see `CredentialPool.stats`).
+        '''
+
+        res = {'server': {**self.stats.snapshot(), 'upstream_slots': self.upstream, 'max_queue': self.max_queue},
+               'calls': gki.get_call_metrics(), 'stages': gki.get_stage_metrics()}
+        if pool := self.kwargs.get('credential_pool'): res['accounts'] = pool.stats()
+        return res
+
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, **kwargs):
+    '''
+    Run `KeywordIdeasServer` until cancelled (SIGINT / SIGTERM in cmd line).
+    @kwargs - see `KeywordIdeasServer`
+    '''
+
+    server = KeywordIdeasServer(**kwargs)
+    listener = await server.start(host, port)
+    stop = asyncio.Event()
+    for sig in [signal.SIGINT, signal.SIGTERM]:
+        try: asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError): pass # windows
+    print(f'Serving keyword ideas on http://{host}:{listener.sockets[0].getsockname()[1]} (upstream {server.upstream}, max queue {server.max_queue})')
+    try: await stop.wait()
+    finally: await server.close()
+    return server.get_stats()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="HTTP JSON/NDJSON endpoint of keyword ideas (one warm client, identical requests coalesced)")
+    parser.add_argument("--host",type=str,required=False,default=SERVER_HOST,help="Listen address",)
+    parser.add_argument("--port",type=int,required=False,default=SERVER_PORT,help="Listen port",)
+    parser.add_argument("-w","--upstream",type=int,required=False,default=SERVER_UPSTREAM,help="Upstream calls at once",)
+    parser.add_argument("--max_queue",type=int,required=False,default=SERVER_MAX_QUEUE,help="Upstream calls waiting in queue before 503",)
+    parser.add_argument("-q","--qps",type=float,required=False,default=gki.RATE_LIMIT_QPS,help="Max requests per second (client-side rate limit)",)
+    parser.add_argument("--timeout",type=float,required=False,default=SERVER_TIMEOUT,help="Timeout in seconds of each upstream request",)
+    parser.add_argument("-a","--accounts",type=str,required=False,help="Comma Separated google-ads yaml files to spread requests over (credential pool)",)
+    parser.add_argument("--strategy",type=str,required=False,default='quota',choices=gki.POOL_STRATEGIES,help="Account routing of credential pool",)
+    args = parser.parse_args()
+
+    gki.set_rate_limit(args.qps)
+    pool = {'credential_pool': gki.CredentialPool(args.accounts, args.strategy)} if args.accounts else {}
+    try: print(f'Stats: {json.dumps(asyncio.run(serve(args.host, args.port, upstream=args.upstream, max_queue=args.max_queue, timeout=args.timeout, **pool))["server"])}')
+    finally: gki.close_sessions()
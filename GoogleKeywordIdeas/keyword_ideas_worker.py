@@ -0,0 +1,365 @@
+### HELP cmd line args:
+###
+###  add -g "US,CA" -l "EN" -k "dental implants, free dentist" -o "./results/dental.csv"
+###  add -g "DE" -l "DE" -f "./seeds.txt" -o "./results/de.parquet"
+###  run -w 4 -q 5
+###  run --once
+###  status
+###
+### SEE `how_to.md`
+
+import json
+import time
+import signal
+import sqlite3
+import argparse
+import threading
+
+from pathlib import Path
+
+import get_keyword_ideas as gki
+
+
+JOBS_SPOOL_PATH  = "./keyword_ideas_jobs.db" # SQLite jobs queue and checkpoints
+JOBS_RESULTS_DIR = "./results"               # default folder for job results (`job_<id>.csv`)
+JOBS_WORKERS     = 4                         # jobs processed concurrently
+JOBS_POLL        = 5.0                       # seconds to wait for new jobs when queue is empty
+JOBS_LEASE       = 600.0                     # seconds job is owned by worker without progress, then it is taken again (crashed worker)
+JOBS_MAX_TRIES   = 3                         # tries of job on transient errors (UNAVAILABLE, DEADLINE_EXCEEDED, ...) before it fails
+JOBS_QUOTA_PAUSE = 300.0                     # seconds all workers wait after RESOURCE_EXHAUSTED (retries of `get_keyword_ideas` exhausted)
+JOBS_OUT_FORMATS = ['csv', 'xlsx', 'html', 'json', 'jsonl', 'parquet', 'arrow']
+
+
+class JobSpool:
+    '''
+    SQLite jobs queue with per chunk checkpoints (safe for several threads and worker processes).
+    @path - SQLite file
+    @lease - seconds job is owned by worker without progress
+    '''
+
+    def __init__(self, path: str = JOBS_SPOOL_PATH, lease: float = JOBS_LEASE):
+        self.path = path
+        self.lease = lease
+        self.lock = threading.RLock()
+        self.db = None
+
+    def __db__(self) -> sqlite3.Connection:
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            self.db.row_factory = sqlite3.Row
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('''CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, params TEXT, out_file TEXT,
+                status TEXT, tries INTEGER DEFAULT 0, chunks INTEGER DEFAULT 0, chunks_done INTEGER DEFAULT 0, ideas INTEGER DEFAULT 0,
+                error TEXT, lease_until REAL, created REAL, updated REAL)''')
+            self.db.execute('CREATE TABLE IF NOT EXISTS checkpoints (job_id INTEGER, chunk INTEGER, response BLOB, PRIMARY KEY (job_id, chunk))')
+        return self.db
+
+    def add(self, params: dict, out_file: str | None = None) -> int:
+        '''
+        Queue job, returns job id.
+        @params - `get_keyword_ideas` args: keywords, geos, lang, page_url and options (adult, customer_id, ...)
+        @out_file - results file (default `JOBS_RESULTS_DIR/job_<id>.csv`), format by suffix (see JOBS_OUT_FORMATS)
+        '''
+
+        if out_file and (suffix := Path(out_file).suffix.lower().lstrip('.')) not in JOBS_OUT_FORMATS: raise ValueError(f'Unknown results file type: {suffix}')
+        now = time.time()
+        with self.lock:
+            job_id = self.__db__().execute('INSERT INTO jobs (params, out_file, status, created, updated) VALUES (?, ?, ?, ?, ?)',
+                (json.dumps(params), out_file, 'queued', now, now)).lastrowid
+            if not out_file: self.__db__().execute('UPDATE jobs SET out_file = ? WHERE id = ?', (f'{JOBS_RESULTS_DIR}/job_{job_id}.csv', job_id))
+        return job_id
+
+    def claim(self) -> dict | None:
+        '''
+        Take next queued job (or job of crashed worker with expired lease), returns job dict or None.
+        '''
+
+        now = time.time()
+        with self.lock:
+            db = self.__db__()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute("SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+                if row: db.execute("UPDATE jobs SET status = 'running', tries = tries + 1, lease_until = ?, updated = ? WHERE id = ?", (now + self.lease, now, row['id']))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        return {**dict(row), 'params': json.loads(row['params']), 'tries': row['tries'] + 1} if row else None
+
+    def checkpoints(self, job_id: int) -> dict:
+        '''
+        Saved chunks responses of job: chunk number -> serialized GenerateKeywordIdeaResponse.
+        '''
+
+        with self.lock:
+            return {row['chunk']: row['response'] for row in self.__db__().execute('SELECT chunk, response FROM checkpoints WHERE job_id = ?', (job_id,))}
+
+    def checkpoint(self, job_id: int, chunk: int, response: bytes, chunks: int):
+        '''
+        Save chunk response and extend job lease.
+        '''
+
+        now = time.time()
+        with self.lock:
+            db = self.__db__()
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('INSERT OR REPLACE INTO checkpoints (job_id, chunk, response) VALUES (?, ?, ?)', (job_id, chunk, response))
+            db.execute('UPDATE jobs SET chunks = ?, chunks_done = (SELECT COUNT(*) FROM checkpoints WHERE job_id = ?), lease_until = ?, updated = ? WHERE id = ?',
+                (chunks, job_id, now + self.lease, now, job_id))
+            db.execute('COMMIT')
+
+    def finish(self, job_id: int, ideas: int):
+        '''
+        Mark job done and drop its checkpoints.
+        '''
+
+        with self.lock:
+            db = self.__db__()
+            db.execute('BEGIN IMMEDIATE')
+            db.execute("UPDATE jobs SET status = 'done', ideas = ?, error = NULL, lease_until = NULL, updated = ? WHERE id = ?", (ideas, time.time(), job_id))
+            db.execute('DELETE FROM checkpoints WHERE job_id = ?', (job_id,))
+            db.execute('COMMIT')
+
+    def release(self, job_id: int, error: str | None = None, failed: bool = False, tried: bool = True):
+        '''
+        Return job to queue (checkpoints are kept) or mark it failed.
+        @tried - False if job did not fail (quota pause, worker stop): its claim is not counted in `tries`
+        '''
+
+        with self.lock:
+            self.__db__().execute('UPDATE jobs SET status = ?, error = ?, tries = tries - ?, lease_until = NULL, updated = ? WHERE id = ?',
+                ('failed' if failed else 'queued', error, 0 if tried else 1, time.time(), job_id))
+
+    def retry(self, job_id: int | None = None):
+        '''
+        Queue failed job (None - all failed jobs) again.
+        '''
+
+        with self.lock:
+            self.__db__().execute("UPDATE jobs SET status = 'queued', tries = 0, updated = ? WHERE status = 'failed' AND (? IS NULL OR id = ?)", (time.time(), job_id, job_id))
+
+    def jobs(self, status: str | None = None) -> list:
+        with self.lock:
+            rows = self.__db__().execute('SELECT id, status, tries, chunks, chunks_done, ideas, out_file, error, created, updated FROM jobs WHERE ? IS NULL OR status = ? ORDER BY id', (status, status))
+            return [dict(row) for row in rows]
+
+    def close(self):
+        with self.lock:
+            if self.db: self.db.close()
+            self.db = None
+
+
+def add_job(keywords: str | list | None, geos: str | list = 'US,CA', lang: str = 'EN', page_url: str | None = None, out_file: str | None = None, spool: str = JOBS_SPOOL_PATH, **kwargs) -> int:
+    '''
+    Queue keyword ideas job for `run_worker`, returns job id.
+    @keywords - seeds, any count (split to requests by MAX_SEED_KEYWORDS)
+    @geos, @lang, @page_url - see `get_keyword_ideas`
+    @out_file - results file, format by suffix: csv, xlsx, html, json, jsonl, parquet, arrow (default `./results/job_<id>.csv`)
+    @spool - jobs SQLite file
+    @kwargs - `get_keyword_ideas` request options: adult, customer_id, with_null_geos, with_null_lang, page_size
+    '''
+
+    if type(keywords) is str: keywords = keywords.split(',')
+    keywords = [kw for chunk in gki.__chunk_seeds__(keywords or []) for kw in chunk]
+    if not (keywords or page_url): raise ValueError("At least one of keywords or page URL is required, but neither was specified.")
+    options = {k: kwargs[k] for k in ['adult', 'customer_id', 'with_null_geos', 'with_null_lang', 'page_size'] if k in kwargs}
+    jobs = JobSpool(spool)
+    try: return jobs.add({'keywords': keywords, 'geos': geos, 'lang': lang, 'page_url': page_url, **options}, out_file)
+    finally: jobs.close()
+
+
+def __write_results__(session: gki.KeywordPlannerSession, response, out_file: str):
+    '''
+    Write job results to `out_file` (replaced, format by suffix).
+    '''
+
+    path = Path(out_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True) # jsonl is appended by exporter, results of previous try must go
+    suffix = path.suffix.lower().lstrip('.')
+    if not len(response.results): # no ideas: `__convert_ideas__` writes no files, job still gets its (empty) file
+        if suffix == 'jsonl': path.touch()
+        elif suffix in ['parquet', 'arrow']:
+            import pyarrow as pa # optional: pip install pyarrow
+            import pyarrow.parquet as pq
+            schema = gki.IdeasExporter().__schema__()
+            if suffix == 'parquet': pq.write_table(schema.empty_table(), out_file)
+            else: pa.ipc.new_file(out_file, schema).close()
+        elif suffix == 'json': path.write_text('[]', encoding='utf-8')
+        else:
+            import pandas as pd
+            df = pd.DataFrame(columns=gki.TABLE_COLUMNS)
+            {'csv': lambda: df.to_csv(out_file, index=False), 'xlsx': lambda: df.to_excel(out_file, header=True, index=False), 
+             'html': lambda: df.to_html(out_file, index=False)}[suffix]()
+    elif suffix in ['jsonl', 'parquet', 'arrow']:
+        gki.__convert_ideas__(response, out_as='default', **{f'{suffix}_file': out_file})
+    elif suffix == 'json':
+        path.write_text(json.dumps(gki.__convert_ideas__(response, out_as='dict') or [], ensure_ascii=False), encoding='utf-8')
+    else:
+        gki.__convert_ideas__(response, out_as='table', **{{'csv': 'csv_file', 'xlsx': 'excel_file', 'html': 'html_file'}[suffix]: out_file})
+
+
+def process_job(jobs: JobSpool, job: dict, stop: threading.Event | None = None, **kwargs) -> bool:
+    '''
+    Run job chunk by chunk, every chunk response is checkpointed, so next try requests only not done chunks.
+    Returns True if job is done, False if stopped (job is returned to queue).
+    @kwargs - see `get_keyword_ideas` (session, geo_cache, max_retries, rate_limiter, ...)
+    '''
+
+    session = gki.__session_of__(**kwargs)
+    params = job['params']
+    options = {**kwargs, **{k: v for k, v in params.items() if k not in ['keywords', 'geos', 'lang', 'page_url']}}
+    chunks = list(gki.__chunk_seeds__(params['keywords'] or [])) or [None]
+    done = jobs.checkpoints(job['id'])
+    if len(done) < len(chunks):
+        customer_id, geos, lang = gki.__collect_params__(session, params['geos'], params['lang'], None, params['page_url'], **options)
+        for n, chunk in enumerate(chunks):
+            if n in done: continue
+            if stop is not None and stop.is_set():
+                jobs.release(job['id'], tried=False)
+                return False
+            keyword_ideas = gki.__get_ideas__(session, customer_id, geos, lang, chunk, params['page_url'], **options)
+            response = done[n] = gki.__to_bytes__(gki.__pages_to_response__(session, keyword_ideas))
+            jobs.checkpoint(job['id'], n, response, len(chunks))
+
+    # merge chunks, first idea wins
+    response_class = type(session.client.get_type("GenerateKeywordIdeaResponse"))
+    merged = {}
+    for n in sorted(done):
+        for idea in gki.__from_bytes__(response_class, done[n]).results: merged.setdefault(idea.text, idea)
+    __write_results__(session, gki.__ideas_response__(session, list(merged.values())), job['out_file'])
+    jobs.finish(job['id'], len(merged))
+    return True
+
+
+class JobsWorker:
+    '''
+    Long running jobs processor: one warm session, `workers` jobs at once, shared pause on quota exhaustion.
+    @spool - jobs SQLite file
+    @workers - jobs processed concurrently
+    @kwargs - see `get_keyword_ideas` (yaml_path, credintals, session, credential_pool, geo_cache, ideas_cache, max_retries, rate_limiter, on_stage ...), plus:
+       - poll - seconds to wait for new jobs (default JOBS_POLL)
+       - once - exit when queue is empty
+       - max_tries - tries of job on transient errors (default JOBS_MAX_TRIES)
+       - quota_pause - seconds to wait after RESOURCE_EXHAUSTED (default JOBS_QUOTA_PAUSE)
+       - lease - seconds job is owned without progress (default JOBS_LEASE)
+    '''
+
+    def __init__(self, spool: str = JOBS_SPOOL_PATH, workers: int = JOBS_WORKERS, **kwargs):
+        self.jobs = JobSpool(spool, kwargs.get('lease') or JOBS_LEASE)
+        self.workers = max(1, int(workers or JOBS_WORKERS))
+        self.poll = kwargs.get('poll') or JOBS_POLL
+        self.once = bool(kwargs.get('once'))
+        self.max_tries = kwargs.get('max_tries') or JOBS_MAX_TRIES
+        self.quota_pause = JOBS_QUOTA_PAUSE if kwargs.get('quota_pause') is None else kwargs['quota_pause']
+        self.kwargs = {k: v for k, v in kwargs.items() if k not in ['poll', 'once', 'max_tries', 'quota_pause', 'lease']}
+        self.stop = threading.Event()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.counts = {'done': 0, 'failed': 0, 'requeued': 0}
+
+    def __count__(self, name: str):
+        with self.lock: self.counts[name] += 1
+
+    def __wait__(self, seconds: float):
+        self.stop.wait(max(0.0, seconds))
+
+    def __loop__(self, session: gki.KeywordPlannerSession):
+        while not self.stop.is_set():
+            if (pause := self.paused_until - time.time()) > 0:
+                self.__wait__(pause)
+                continue
+            if not (job := self.jobs.claim()):
+                if self.once: return
+                self.__wait__(self.poll)
+                continue
+            try:
+                if process_job(self.jobs, job, self.stop, **{**self.kwargs, 'session': session}): self.__count__('done')
+            except Exception as error:
+                status = gki.__retry_status__(error)
+                message = f'{status or type(error).__name__}: {error}'[:1000]
+                if status == 'RESOURCE_EXHAUSTED': # quota: wait and resume from checkpoints, not a job failure
+                    with self.lock: self.paused_until = max(self.paused_until, time.time() + self.quota_pause)
+                    self.jobs.release(job['id'], message, tried=False)
+                    self.__count__('requeued')
+                elif status in gki.RETRY_STATUSES and job['tries'] < self.max_tries:
+                    self.jobs.release(job['id'], message)
+                    self.__count__('requeued')
+                else:
+                    self.jobs.release(job['id'], message, failed=True)
+                    self.__count__('failed')
+
+    def run(self) -> dict:
+        '''
+        Process jobs until `stop` (or queue is empty with `once`), returns counts: done, failed, requeued.
+        '''
+
+        session = gki.__session_of__(**self.kwargs)
+        threads = [threading.Thread(target=self.__loop__, args=(session,), name=f'jobs-worker-{x}', daemon=True) for x in range(self.workers)]
+        for thread in threads: thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive(): thread.join(0.5) # interruptible by signals in main thread
+        finally:
+            self.stop.set()
+            for thread in threads: thread.join()
+            self.jobs.close()
+        return dict(self.counts)
+
+
+def run_worker(spool: str = JOBS_SPOOL_PATH, workers: int = JOBS_WORKERS, **kwargs) -> dict:
+    '''
+    Process queued jobs (see `JobsWorker`), returns counts: done, failed, requeued.
+    '''
+
+    return JobsWorker(spool, workers, **kwargs).run()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Queue and process keyword ideas jobs (resumable, one warm client)")
+    parser.add_argument("-s","--spool",type=str,required=False,default=JOBS_SPOOL_PATH,help="Jobs SQLite file",)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Queue job")
+    add.add_argument("-g","--geos",type=str,required=True,help="Comma Separated ISO Country Codes",)
+    add.add_argument("-l","--lang",type=str,required=True,help="2-Symbols language code",)
+    add.add_argument("-k","--keywords",type=str,required=False,help="Comma Separated Keywords to search",)
+    add.add_argument("-f","--file",type=str,required=False,help="File with Keywords to search (one per line, any count)",)
+    add.add_argument("-p","--page_url",type=str,required=False,help="Site to filter unrelated keywords",)
+    add.add_argument("-o","--out",type=str,required=False,help=f"Results file: {', '.join(JOBS_OUT_FORMATS)} (default {JOBS_RESULTS_DIR}/job_<id>.csv)",)
+
+    run = commands.add_parser("run", help="Process jobs")
+    run.add_argument("-w","--workers",type=int,required=False,default=JOBS_WORKERS,help="Jobs processed concurrently",)
+    run.add_argument("-q","--qps",type=float,required=False,default=gki.RATE_LIMIT_QPS,help="Max requests per second (client-side rate limit)",)
+    run.add_argument("--poll",type=float,required=False,default=JOBS_POLL,help="Seconds to wait for new jobs",)
+    run.add_argument("--once",action="store_true",help="Exit when queue is empty",)
+    run.add_argument("-a","--accounts",type=str,required=False,help="Comma Separated google-ads yaml files to spread requests over (credential pool)",)
+
+    status = commands.add_parser("status", help="Show jobs")
+    status.add_argument("--retry",action="store_true",help="Queue failed jobs again",)
+
+    args = parser.parse_args()
+
+    if args.command == "add":
+        keywords = args.keywords
+        if args.file:
+            with open(args.file, encoding='utf-8') as f: keywords = [line for line in f]
+        print(f'Job {add_job(keywords, args.geos, args.lang, args.page_url, args.out, args.spool)} queued')
+
+    elif args.command == "run":
+        gki.set_rate_limit(args.qps)
+        pool = {'credential_pool': gki.CredentialPool(args.accounts)} if args.accounts else {}
+        worker = JobsWorker(args.spool, args.workers, poll=args.poll, once=args.once, **pool)
+        for sig in [signal.SIGINT, signal.SIGTERM]: signal.signal(sig, lambda *_: worker.stop.set()) # finish current chunks, keep checkpoints
+        try: print(f'Jobs: {worker.run()}, calls: {gki.get_call_metrics()}')
+        finally: gki.close_sessions()
+
+    elif args.command == "status":
+        jobs = JobSpool(args.spool)
+        if args.retry: jobs.retry()
+        for job in jobs.jobs():
+            print(f' - {job["id"]}: {job["status"]}, chunks {job["chunks_done"]}/{job["chunks"]}, ideas {job["ideas"]}, tries {job["tries"]}, {job["out_file"]}'
+                  + (f', error: {job["error"]}' if job["error"] else ''))
+        jobs.close()